@@ -1,15 +1,174 @@
-from flask import Flask, request, jsonify
+import os
+import json
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
-from chessEngine import ChessEngine
+from chess_engine import ChessEngine, search_depth
+from parallel_search import RootSearchPool
+from opening_book import DEFAULT_BOOK_PATH, open_book
+from search_stats import SearchMetrics
+from fen import STARTING_FEN, engine_from_fen, engine_to_fen, parse_fen, board_to_fen_placement, check_board_state
+from game_sessions import SessionStore, DEFAULT_MAX_SESSIONS, DEFAULT_TTL_SECONDS, DEFAULT_SESSION_TT_MEGABYTES
+from search_jobs import SearchJobQueue, JobQueueFull
+from result_cache import cache_from_environment
+from pondering import Ponderer, DEFAULT_PONDER_DEPTH, DEFAULT_MAX_PONDERERS, limit_ponderers, stop_ponderers
+from batch_analysis import BatchAnalyser, read_positions
+
+#worker processes for the root search; 1 keeps the single-core search
+SEARCH_WORKERS = int(os.environ.get('CHESS_SEARCH_WORKERS', '1'))
+root_search_pool = None
+#latency budget of an ai_move search in seconds: it goes as deep as search_depth but, when that
+#takes longer, plays the move of the last depth it finished in time (0: no limit)
+MOVE_TIME_LIMIT = float(os.environ.get('CHESS_MOVE_TIME_LIMIT', '2')) or None
+
+#opening book built with opening_book.py; without it every move is searched
+OPENING_BOOK_PATH = os.environ.get('CHESS_OPENING_BOOK', DEFAULT_BOOK_PATH)
+opening_book = open_book(OPENING_BOOK_PATH) if os.path.exists(OPENING_BOOK_PATH) else None
+
+#CHESS_PROFILE=1 times the engine's hot methods on every search (adds overhead)
+PROFILE_SEARCH = os.environ.get('CHESS_PROFILE', '0') == '1'
+#totals over every search served, exported on /metrics
+search_metrics = SearchMetrics()
+
+#best moves of positions already searched; CHESS_RESULT_CACHE=<file> shares them between
+#processes (see result_cache.py for the other settings)
+result_cache = cache_from_environment()
+
+#games kept between requests (engine + warm transposition table), bounded and idle-evicted;
+#each game's table takes CHESS_SESSION_TT_MB megabytes
+game_sessions = SessionStore(
+    int(os.environ.get('CHESS_MAX_SESSIONS', DEFAULT_MAX_SESSIONS)),
+    float(os.environ.get('CHESS_SESSION_TTL', DEFAULT_TTL_SECONDS)),
+    float(os.environ.get('CHESS_SESSION_TT_MB', DEFAULT_SESSION_TT_MEGABYTES)),
+)
+#table of a one-off /api/ai_move engine, which lives for one search: small, so allocating it
+#costs well under a millisecond
+ONE_SHOT_TT_MEGABYTES = 1
+
+#CHESS_PONDER=1 makes games search on the opponent's time unless they ask otherwise
+#("ponder": false); a ponder search stops by itself at CHESS_PONDER_DEPTH
+PONDER_DEFAULT = os.environ.get('CHESS_PONDER', '0') == '1'
+PONDER_DEPTH = int(os.environ.get('CHESS_PONDER_DEPTH', DEFAULT_PONDER_DEPTH))
+#ponder searches share this process's GIL with the requests being served, so only
+#CHESS_MAX_PONDERERS games ponder at once, and only until a request for another game comes in
+limit_ponderers(int(os.environ.get('CHESS_MAX_PONDERERS', DEFAULT_MAX_PONDERERS)))
+
+#background search jobs: worker processes (default: CPU cores) and how many jobs may be
+#queued or running before new ones get a 429 (default: 4 per worker)
+JOB_WORKERS = int(os.environ.get('CHESS_JOB_WORKERS', '0')) or None
+JOB_MAX_PENDING = int(os.environ.get('CHESS_JOB_MAX_PENDING', '0')) or None
+#longest a poll may wait for its job with ?wait=seconds
+MAX_JOB_WAIT = 30
+#largest search one job or batch request may ask for: a bigger "timeLimit" (seconds) or "depth"
+#gets a 400, and a search given only a depth still stops after CHESS_MAX_TIME_LIMIT seconds
+MAX_TIME_LIMIT = float(os.environ.get('CHESS_MAX_TIME_LIMIT', '10'))
+MAX_DEPTH = int(os.environ.get('CHESS_MAX_DEPTH', '8'))
+search_jobs = None
+
+#batch analysis: worker processes of its own (default: CPU cores)
+BATCH_WORKERS = int(os.environ.get('CHESS_BATCH_WORKERS', '0')) or None
+batch_analyser = None
 
 app = Flask(__name__)
 #allow requests from frontend
 CORS(app, resources={r"/api/*": {"origins": "*"}})
 
+def get_root_search_pool() -> RootSearchPool:
+    #started on first use so the debug reloader's watcher process doesn't spawn workers too
+    global root_search_pool
+    if root_search_pool is None:
+        root_search_pool = RootSearchPool(SEARCH_WORKERS)
+    return root_search_pool
+
+def get_search_jobs() -> SearchJobQueue:
+    #started on first use, like the root search pool
+    global search_jobs
+    if search_jobs is None:
+        search_jobs = SearchJobQueue(
+            JOB_WORKERS,
+            JOB_MAX_PENDING,
+            book_path=OPENING_BOOK_PATH if opening_book is not None else None,
+            profile=PROFILE_SEARCH,
+            on_finished=search_metrics.record,
+        )
+    return search_jobs
+
+def get_batch_analyser() -> BatchAnalyser:
+    #started on first use, like the root search pool
+    global batch_analyser
+    if batch_analyser is None:
+        batch_analyser = BatchAnalyser(
+            BATCH_WORKERS,
+            book_path=OPENING_BOOK_PATH if opening_book is not None else None,
+            on_finished=search_metrics.record,
+        )
+    return batch_analyser
+
+def search_move(engine: ChessEngine, ai_color: str) -> tuple[str, str]:
+    #best move for ai_color on the single-core or the parallel search, within MOVE_TIME_LIMIT;
+    #the stats go to /metrics
+    if SEARCH_WORKERS > 1:
+        best_move = get_root_search_pool().find_best_move(engine, ai_color, search_depth, MOVE_TIME_LIMIT)
+    else:
+        best_move = engine.find_best_move(ai_color=ai_color, time_limit=MOVE_TIME_LIMIT, max_depth=search_depth)
+    search_metrics.record(engine.stats)
+    return best_move
+
+def search_budget(options) -> tuple[int | None, float | None]:
+    #(max_depth, time_limit) from a request's "depth" and "timeLimit"; ValueError unless they are
+    #numbers within MAX_DEPTH / MAX_TIME_LIMIT
+    try:
+        max_depth = int(options['depth']) if options.get('depth') else None
+        time_limit = float(options['timeLimit']) if options.get('timeLimit') else None
+    except (TypeError, ValueError):
+        raise ValueError("depth and timeLimit must be numbers") from None
+    if max_depth is not None and not 1 <= max_depth <= MAX_DEPTH:
+        raise ValueError(f"depth must be between 1 and {MAX_DEPTH}")
+    if time_limit is not None and not 0 < time_limit <= MAX_TIME_LIMIT:
+        raise ValueError(f"timeLimit must be above 0 and at most {MAX_TIME_LIMIT:g} seconds")
+    if max_depth is not None and time_limit is None:
+        time_limit = MAX_TIME_LIMIT
+    return max_depth, time_limit
+
+def game_state(session) -> dict:
+    engine = session.engine
+    return {
+        "gameId": session.id,
+        "fen": engine_to_fen(engine),
+        "sideToMove": engine.side_to_move,
+        "gameStatus": engine.get_game_status(engine.side_to_move),
+        "isWhiteInCheck": engine.is_in_check('w'),
+        "isBlackInCheck": engine.is_in_check('b'),
+        "pondering": session.ponderer is not None and session.ponderer.active,
+    }
+
+def unknown_game():
+    return jsonify({"status": "error", "message": "Unknown or expired game"}), 404
+
+@app.before_request
+def stop_other_ponderers():
+    #a ponder search slows down every request this process serves, so an API request stops all
+    #but the pondering of the game it is for
+    if not request.path.startswith('/api/'):
+        return
+    game_id = (request.view_args or {}).get('game_id')
+    session = game_sessions.get(game_id) if game_id else None
+    stop_ponderers(keep=session.ponderer if session is not None else None)
+
 @app.route("/")
 def home():
     return "Chess AI backend is running...."
 
+@app.route("/metrics")
+def metrics():
+    #Prometheus text format
+    text = search_metrics.render()
+    cache_stats = result_cache.stats()
+    for name in ("hits", "misses", "evictions"):
+        text += (f"# TYPE chess_result_cache_{name}_total counter\n"
+                 f"chess_result_cache_{name}_total {cache_stats[name]}\n")
+    text += f"# TYPE chess_result_cache_entries gauge\nchess_result_cache_entries {cache_stats['entries']}\n"
+    return text, 200, {"Content-Type": "text/plain; version=0.0.4"}
+
 #--- API Route placeholder
 @app.route('/api/ai_move', methods=['POST', 'OPTIONS'])
 def get_ai_move():
@@ -30,10 +189,15 @@ def get_ai_move():
         AI_COLOR = 'b'
 
         #initialize the Engine
-        engine = ChessEngine(board_state)
+        engine = ChessEngine(
+            board_state, tt_megabytes=ONE_SHOT_TT_MEGABYTES, opening_book=opening_book,
+            profile=PROFILE_SEARCH, result_cache=result_cache,
+        )
 
         #Calculate the Best move using Minimax
-        from_sq, to_sq = engine.find_best_move(ai_color=AI_COLOR)
+        from_sq, to_sq = search_move(engine, AI_COLOR)
+        #"includeStats": true in the request adds what the search did to the response
+        stats = engine.stats.to_dict() if data.get('includeStats') else None
         
         if from_sq and to_sq:
         	#Return the move coordinates to the frontend
@@ -41,7 +205,7 @@ def get_ai_move():
             white_in_check = engine.is_in_check('w')
             black_in_check = engine.is_in_check('b')
             
-            return jsonify({
+            response = {
         		"status": "move_found",
         		"from_square": from_sq,
         		"to_square": to_sq,
@@ -49,18 +213,239 @@ def get_ai_move():
                 "isWhiteInCheck": white_in_check,
                 "isBlackInCheck": black_in_check,
         		"message": f"AI played: {from_sq} to {to_sq}"
-        	}), 200
+        	}
 
         else:
-        	return jsonify({
+        	response = {
         		"Status": "game_over",
         		"message": "AI found no legal moves."
-        	}), 200
+        	}
+
+        if stats is not None:
+            response["stats"] = stats
+        return jsonify(response), 200
 
     except Exception as e:   
         app.logger.error(f"Error in get_ai_move: {e}")
         return jsonify({"status": "error", "message": f"server error: {e}"}), 500
 
+#--- Game sessions: the server keeps the engine, the client sends one move at a time
+@app.route('/api/games', methods=['POST'])
+def create_game():
+    #starts a game from "fen", "boardState" (no castling / en passant) or the initial position
+    data = request.get_json(silent=True) or {}
+    try:
+        if data.get('boardState'):
+            side_to_move = data.get('sideToMove', 'w')
+            if side_to_move not in ('w', 'b'):
+                raise ValueError(f"Invalid side to move: {side_to_move!r}")
+            engine = ChessEngine(
+                data['boardState'], tt_megabytes=game_sessions.tt_megabytes, opening_book=opening_book,
+                profile=PROFILE_SEARCH, result_cache=result_cache,
+            )
+            engine.side_to_move = side_to_move
+        else:
+            engine = engine_from_fen(
+                data.get('fen') or STARTING_FEN, tt_megabytes=game_sessions.tt_megabytes,
+                opening_book=opening_book, profile=PROFILE_SEARCH, result_cache=result_cache,
+            )
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+
+    session = game_sessions.create(engine)
+    if data.get('ponder', PONDER_DEFAULT):
+        session.ponderer = Ponderer(engine, PONDER_DEPTH)
+    response = game_state(session)
+    response["boardState"] = engine.to_board_state()
+    return jsonify(response), 201
+
+@app.route('/api/games/<game_id>', methods=['GET'])
+def get_game(game_id):
+    session = game_sessions.get(game_id)
+    if session is None:
+        return unknown_game()
+    with session.lock:
+        response = game_state(session)
+        response["boardState"] = session.engine.to_board_state()
+    return jsonify(response), 200
+
+@app.route('/api/games/<game_id>', methods=['DELETE'])
+def delete_game(game_id):
+    if not game_sessions.remove(game_id):
+        return unknown_game()
+    return jsonify({"status": "deleted"}), 200
+
+@app.route('/api/games/<game_id>/moves', methods=['POST'])
+def post_move(game_id):
+    #plays {"from": "e2", "to": "e4"} for the side to move
+    session = game_sessions.get(game_id)
+    if session is None:
+        return unknown_game()
+    data = request.get_json(silent=True) or {}
+    from_sq, to_sq = data.get('from'), data.get('to')
+    if not from_sq or not to_sq:
+        return jsonify({"status": "error", "message": "Missing from/to in request"}), 400
+
+    with session.lock:
+        engine = session.engine
+        result = engine.process_move(from_sq, to_sq, engine.side_to_move)
+        if not result["success"]:
+            return jsonify({"status": "illegal_move", "message": result["message"]}), 400
+        ponder_hit = session.ponderer is not None and session.ponderer.opponent_moved()
+        response = game_state(session)
+    response["status"] = "move_made"
+    response["ponderHit"] = ponder_hit
+    response["captured"] = result["captured"]
+    return jsonify(response), 200
+
+@app.route('/api/games/<game_id>/ai_move', methods=['POST'])
+def post_ai_move(game_id):
+    #the engine plays the side to move, reusing what earlier searches of this game stored
+    session = game_sessions.get(game_id)
+    if session is None:
+        return unknown_game()
+    data = request.get_json(silent=True) or {}
+
+    try:
+        with session.lock:
+            engine = session.engine
+            ai_color = engine.side_to_move
+            #after a ponder hit the search already ran (or is still running) on the opponent's time
+            ponderer = session.ponderer
+            best_move = ponderer.ponder_move(search_depth, MOVE_TIME_LIMIT) if ponderer is not None else None
+            if best_move is not None:
+                engine.stats = ponderer.stats
+                search_metrics.record(engine.stats)
+                from_sq, to_sq = best_move
+            else:
+                from_sq, to_sq = search_move(engine, ai_color)
+            if not from_sq:
+                response = game_state(session)
+                response["status"] = "game_over"
+                response["message"] = "AI found no legal moves."
+                return jsonify(response), 200
+
+            piece_code = engine.board.get(from_sq)
+            captured = engine.make_move(from_sq, to_sq)
+            if ponderer is not None:
+                ponderer.start(ai_color)
+            response = game_state(session)
+            response.update({
+                "status": "move_found",
+                "from_square": from_sq,
+                "to_square": to_sq,
+                "piece_code": piece_code,
+                "captured": captured,
+            })
+            if data.get('includeStats'):
+                response["stats"] = engine.stats.to_dict()
+        return jsonify(response), 200
+
+    except Exception as e:
+        app.logger.error(f"Error in post_ai_move: {e}")
+        return jsonify({"status": "error", "message": f"server error: {e}"}), 500
+
+#--- Search jobs: the request only queues the search and returns a job id to poll or stream
+@app.route('/api/jobs', methods=['POST'])
+def submit_job():
+    #{"boardState": ... or "fen": ..., "aiColor": "b", "timeLimit": seconds, "depth": plies}
+    #-> 202 with a job id
+    data = request.get_json(silent=True) or {}
+    ai_color = data.get('aiColor', 'b')
+    if ai_color not in ('w', 'b'):
+        return jsonify({"status": "error", "message": f"Invalid aiColor: {ai_color!r}"}), 400
+    if not data.get('fen') and not data.get('boardState'):
+        return jsonify({"status": "error", "message": "Missing boardState or fen in request"}), 400
+    try:
+        max_depth, time_limit = search_budget(data)
+        if data.get('fen'):
+            fen = data['fen']
+        else:
+            check_board_state(data['boardState'])
+            fen = f"{board_to_fen_placement(data['boardState'])} {ai_color} - - 0 1"
+        parse_fen(fen)
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+
+    try:
+        job = get_search_jobs().submit(fen, ai_color, time_limit=time_limit, max_depth=max_depth)
+    except JobQueueFull as e:
+        return jsonify({"status": "busy", "message": str(e)}), 429, {"Retry-After": "1"}
+
+    return jsonify({
+        "jobId": job.id,
+        "status": job.state,
+        "statusUrl": f"/api/jobs/{job.id}",
+        "eventsUrl": f"/api/jobs/{job.id}/events",
+    }), 202
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    #?wait=seconds holds the request until the job finishes (long polling)
+    try:
+        wait_seconds = min(max(float(request.args.get('wait', 0)), 0), MAX_JOB_WAIT)
+    except ValueError:
+        return jsonify({"status": "error", "message": "wait must be a number"}), 400
+    jobs = get_search_jobs()
+    job = jobs.get(job_id)
+    if job is None:
+        return jsonify({"status": "error", "message": "Unknown or expired job"}), 404
+    if wait_seconds > 0:
+        jobs.wait(job, wait_seconds)
+    return jsonify(job.to_dict()), 200
+
+@app.route('/api/jobs/<job_id>', methods=['DELETE'])
+def cancel_job(job_id):
+    jobs = get_search_jobs()
+    job = jobs.get(job_id)
+    if job is None:
+        return jsonify({"status": "error", "message": "Unknown or expired job"}), 404
+    if not jobs.cancel(job):
+        return jsonify({"status": "error", "message": "Job already started"}), 409
+    return jsonify(job.to_dict()), 200
+
+@app.route('/api/jobs/<job_id>/events', methods=['GET'])
+def stream_job(job_id):
+    #server-sent events: the current status at once, then the result when the job ends
+    jobs = get_search_jobs()
+    job = jobs.get(job_id)
+    if job is None:
+        return jsonify({"status": "error", "message": "Unknown or expired job"}), 404
+
+    def events():
+        yield f"event: status\ndata: {json.dumps({'jobId': job.id, 'status': job.state})}\n\n"
+        while not jobs.wait(job, 15):
+            yield ": keep-alive\n\n"
+        job_state = job.to_dict()
+        yield f"event: {job_state['status']}\ndata: {json.dumps(job_state)}\n\n"
+
+    return Response(events(), mimetype='text/event-stream', headers={"Cache-Control": "no-cache"})
+
+#--- Batch analysis: many positions in, one NDJSON result line per position out as each finishes
+@app.route('/api/analysis', methods=['POST'])
+def analyse_batch():
+    #The body is NDJSON (one FEN or {"fen"|"boardState", "aiColor", "id"} per line), read as the
+    #workers free up, with ?depth=, ?timeLimit= and ?includeStats=1 as options; or a JSON object
+    #{"positions": [...], "depth": ..., "timeLimit": ..., "includeStats": ...}.
+    if request.mimetype == 'application/json':
+        data = request.get_json(silent=True) or {}
+        positions = data.get('positions')
+        if not isinstance(positions, list):
+            return jsonify({"status": "error", "message": "Missing positions list in request"}), 400
+        options = data
+    else:
+        positions = read_positions(request.stream)
+        options = request.args
+    try:
+        max_depth, time_limit = search_budget(options)
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    include_stats = options.get('includeStats') in (True, '1', 'true')
+
+    results = get_batch_analyser().analyse(positions, time_limit, max_depth, include_stats)
+    lines = (json.dumps(result) + '\n' for result in results)
+    return Response(stream_with_context(lines), mimetype='application/x-ndjson')
+
 if __name__ == '__main__':
         print("Starting Flask Server on http://127.0.0.1:5000")
         app.run(debug=True, port=5000)
@@ -0,0 +1,191 @@
+#Batch analysis
+#Analyses many positions on a pool of worker processes and yields each result as soon as it is
+#ready, in completion order. Positions are pulled from the input only as workers free up and
+#results are not kept once yielded, so memory stays flat however long the batch is. Every worker
+#keeps one engine (transposition table, opening book, result cache) for all of its positions.
+#
+#   python batch_analysis.py positions.ndjson --depth 4 > results.ndjson
+#   cat fens.txt | python batch_analysis.py - --workers 8 --time-limit 0.5
+#
+#Input lines are FEN strings or JSON objects: {"fen": ...} or {"boardState": ..., "aiColor": "b"},
+#with an optional "id" that is copied to the result.
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from contextlib import nullcontext
+
+from fen import board_to_fen_placement, check_board_state, parse_fen
+from search_jobs import _init_worker, _run_search
+from search_stats import SearchStats
+
+#===== Constants =====#
+#positions handed to the pool ahead of the results being read, per worker
+DEFAULT_IN_FLIGHT_PER_WORKER = 2
+
+def position_fen(position) -> tuple[str, str]:
+    #(FEN, side to analyse) for one input position; ValueError, whatever is wrong with it, if it
+    #can't be read.
+    #A FEN is analysed for its side to move, a boardState for "aiColor" (default black, as /api/ai_move).
+    if isinstance(position, str):
+        fen = position.strip()
+        return fen, parse_fen(fen)["side_to_move"]
+    if not isinstance(position, dict):
+        raise ValueError(f"Expected a FEN string or an object, got {type(position).__name__}")
+    if position.get('fen'):
+        fen = position['fen']
+        ai_color = position.get('aiColor') or parse_fen(fen)["side_to_move"]
+    elif position.get('boardState'):
+        ai_color = position.get('aiColor', 'b')
+        check_board_state(position['boardState'])
+        fen = f"{board_to_fen_placement(position['boardState'])} {ai_color} - - 0 1"
+        parse_fen(fen)
+    else:
+        raise ValueError("Missing boardState or fen")
+    if ai_color not in ('w', 'b'):
+        raise ValueError(f"Invalid aiColor: {ai_color!r}")
+    return fen, ai_color
+
+def read_positions(lines):
+    #positions from NDJSON / plain FEN lines (str or bytes); blank lines are skipped and a line
+    #that isn't valid JSON is passed on as text, to be reported by position_fen
+    for line in lines:
+        if isinstance(line, bytes):
+            line = line.decode('utf-8', errors='replace')
+        line = line.strip()
+        if not line:
+            continue
+        if line[0] in '{"':
+            try:
+                yield json.loads(line)
+                continue
+            except ValueError:
+                pass
+        yield line
+
+#Batch analyser class
+class BatchAnalyser:
+    def __init__(
+        self,
+        workers: int | None = None,
+        tt_megabytes: float = 16,
+        book_path: str | None = None,
+        on_finished=None,
+    ):
+        #workers defaults to the number of CPU cores;
+        #on_finished(stats: SearchStats) is called for every position analysed
+        self.workers = workers or os.cpu_count() or 1
+        self.on_finished = on_finished
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=_init_worker,
+            initargs=(tt_megabytes, book_path, False),
+        )
+
+    def analyse(
+        self,
+        positions,
+        time_limit: float | None = None,
+        max_depth: int | None = None,
+        include_stats: bool = False,
+        max_in_flight: int | None = None,
+    ):
+        #Yields one result dict per position as it finishes. Positions that can't be read give an
+        #"error" result instead of stopping the batch. Closing the generator cancels what is queued.
+        max_in_flight = max_in_flight or self.workers * DEFAULT_IN_FLIGHT_PER_WORKER
+        positions = enumerate(positions)
+        #future -> (index, id, FEN)
+        in_flight = {}
+        exhausted = False
+        try:
+            while True:
+                while not exhausted and len(in_flight) < max_in_flight:
+                    index, position = next(positions, (None, None))
+                    if index is None:
+                        exhausted = True
+                        break
+                    position_id = position.get('id') if isinstance(position, dict) else None
+                    try:
+                        fen, ai_color = position_fen(position)
+                    except ValueError as e:
+                        yield self._result(index, position_id, None, error=str(e))
+                        continue
+                    future = self.executor.submit(_run_search, fen, ai_color, time_limit, max_depth)
+                    in_flight[future] = (index, position_id, fen)
+
+                if not in_flight:
+                    return
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    index, position_id, fen = in_flight.pop(future)
+                    if future.exception() is not None:
+                        yield self._result(index, position_id, fen, error=str(future.exception()))
+                        continue
+                    search = future.result()
+                    if self.on_finished is not None:
+                        self.on_finished(SearchStats.from_dict(search["stats"]))
+                    yield self._result(index, position_id, fen, search, include_stats)
+        finally:
+            for future in in_flight:
+                future.cancel()
+
+    @staticmethod
+    def _result(index: int, position_id, fen: str | None, search: dict | None = None,
+                include_stats: bool = False, error: str | None = None) -> dict:
+        result = {"index": index}
+        if position_id is not None:
+            result["id"] = position_id
+        result["fen"] = fen
+        if error is not None:
+            result["status"] = "error"
+            result["message"] = error
+            return result
+        result["status"] = "done" if search["best_move"] else "no_moves"
+        for name in ("best_move", "from_square", "to_square", "score", "depth", "pv"):
+            result[name] = search[name]
+        if include_stats:
+            result["stats"] = search["stats"]
+        return result
+
+    def shutdown(self) -> None:
+        self.executor.shutdown(cancel_futures=True)
+
+def analyse_positions(positions, workers: int | None = None, book_path: str | None = None, **options):
+    #one-off batch on a pool of its own, shut down when the generator ends;
+    #options are those of BatchAnalyser.analyse
+    analyser = BatchAnalyser(workers, book_path=book_path)
+    try:
+        yield from analyser.analyse(positions, **options)
+    finally:
+        analyser.shutdown()
+
+# === Command Line === #
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Analyse a batch of positions, writing NDJSON results.")
+    parser.add_argument("positions", help="file of FEN / JSON lines, or - for stdin")
+    parser.add_argument("--workers", type=int, help="worker processes (default: CPU cores)")
+    parser.add_argument("--depth", type=int, help="search depth (default: the engine's)")
+    parser.add_argument("--time-limit", type=float, help="seconds per position instead of a fixed depth")
+    parser.add_argument("--book", help="opening book file to consult first")
+    parser.add_argument("--stats", action="store_true", help="include search statistics")
+    args = parser.parse_args(argv)
+
+    #results go to the original stdout; file descriptor 1 now points at stderr so the engine's
+    #progress prints, in this process and in the workers, can't corrupt them
+    sys.stdout.flush()
+    with os.fdopen(os.dup(1), 'w') as output:
+        os.dup2(2, 1)
+        #stdin is left open, a named file is closed
+        with (nullcontext(sys.stdin) if args.positions == '-' else open(args.positions)) as lines:
+            results = analyse_positions(
+                read_positions(lines), args.workers, args.book,
+                time_limit=args.time_limit, max_depth=args.depth, include_stats=args.stats,
+            )
+            for result in results:
+                output.write(json.dumps(result) + '\n')
+                output.flush()
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,425 @@
+#Bitboard move generator
+#Keeps one 64-bit int per piece code (bit index = rank * 8 + file, so a1 = bit 0, h8 = bit 63)
+#and generates moves set-wise with shifts and masks instead of walking the mailbox.
+#Moves are produced in the engine's packed 0x88 format so both generators are interchangeable.
+from chess_engine import (
+    PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING, WHITE, BLACK,
+    SQUARES, KNIGHT_OFFSETS, KING_OFFSETS, ROOK_DIRECTIONS, BISHOP_DIRECTIONS,
+    PROMOTION_TYPES, MOVE_DOUBLE_PUSH, MOVE_EN_PASSANT,
+)
+
+#===== Constants =====#
+FULL = (1 << 64) - 1
+FILE_A = 0x0101010101010101
+FILE_H = FILE_A << 7
+RANK_1 = 0xFF
+RANK_3 = 0xFF << 16
+RANK_6 = 0xFF << 40
+RANK_8 = 0xFF << 56
+
+#bit index <-> 0x88 square
+BIT_TO_SQ = SQUARES
+SQ_TO_BIT = [-1] * 128
+for _bit, _sq in enumerate(SQUARES):
+    SQ_TO_BIT[_sq] = _bit
+
+def _step_table(offsets: tuple[int, ...]) -> list[int]:
+    #attack set of a leaper (knight/king) on every square, built with the 0x88 offsets
+    table = []
+    for sq in SQUARES:
+        attacks = 0
+        for offset in offsets:
+            target = sq + offset
+            if not target & 0x88:
+                attacks |= 1 << SQ_TO_BIT[target]
+        table.append(attacks)
+    return table
+
+def _ray_table(direction: int) -> list[int]:
+    #squares reached from every square sliding in 'direction' on an empty board
+    table = []
+    for sq in SQUARES:
+        ray = 0
+        target = sq + direction
+        while not target & 0x88:
+            ray |= 1 << SQ_TO_BIT[target]
+            target += direction
+        table.append(ray)
+    return table
+
+KNIGHT_ATTACKS = _step_table(KNIGHT_OFFSETS)
+KING_ATTACKS = _step_table(KING_OFFSETS)
+
+#PAWN_ATTACKS[side][bit]: squares a pawn of 'side' on 'bit' attacks
+PAWN_ATTACKS = {
+    WHITE: _step_table((15, 17)),
+    BLACK: _step_table((-15, -17)),
+}
+
+#Rays split by whether the direction increases the bit index: the nearest blocker
+#is then the lowest set bit (positive) or the highest set bit (negative).
+POSITIVE_ROOK_RAYS = [_ray_table(d) for d in ROOK_DIRECTIONS if d > 0]
+NEGATIVE_ROOK_RAYS = [_ray_table(d) for d in ROOK_DIRECTIONS if d < 0]
+POSITIVE_BISHOP_RAYS = [_ray_table(d) for d in BISHOP_DIRECTIONS if d > 0]
+NEGATIVE_BISHOP_RAYS = [_ray_table(d) for d in BISHOP_DIRECTIONS if d < 0]
+
+def _between_table() -> list[list[int]]:
+    #BETWEEN[a][b]: the squares strictly between a and b on a rank, file or diagonal, else 0
+    table = [[0] * 64 for _ in range(64)]
+    for rays in POSITIVE_ROOK_RAYS + NEGATIVE_ROOK_RAYS + POSITIVE_BISHOP_RAYS + NEGATIVE_BISHOP_RAYS:
+        for start in range(64):
+            ray = rays[start]
+            remaining = ray
+            while remaining:
+                lowest = remaining & -remaining
+                end = lowest.bit_length() - 1
+                table[start][end] = ray & ~rays[end] & ~lowest
+                remaining ^= lowest
+    return table
+
+BETWEEN = _between_table()
+
+# === Slider Attacks === #
+def _slider_attacks(bit: int, occupied: int, positive_rays: list, negative_rays: list) -> int:
+    attacks = 0
+    for rays in positive_rays:
+        ray = rays[bit]
+        blockers = ray & occupied
+        if blockers:
+            #cut the ray behind the first blocker
+            ray ^= rays[(blockers & -blockers).bit_length() - 1]
+        attacks |= ray
+    for rays in negative_rays:
+        ray = rays[bit]
+        blockers = ray & occupied
+        if blockers:
+            ray ^= rays[blockers.bit_length() - 1]
+        attacks |= ray
+    return attacks
+
+def _line_tables(direction: int) -> tuple[list[int], list[dict]]:
+    #For the line through every square along +-direction: the mask of squares that can block
+    #(the line minus the square itself and its two far ends) and a dict from every blocker
+    #set on that mask to the squares attacked along the line, so an attack is one lookup.
+    masks, tables = [], []
+    positive_rays = [_ray_table(direction)]
+    negative_rays = [_ray_table(-direction)]
+    if direction < 0:
+        positive_rays, negative_rays = negative_rays, positive_rays
+    for bit in range(64):
+        mask = 0
+        for rays in positive_rays:
+            ray = rays[bit]
+            if ray:
+                mask |= ray & ~(1 << (ray.bit_length() - 1))
+        for rays in negative_rays:
+            ray = rays[bit]
+            if ray:
+                mask |= ray & (ray - 1)
+        table = {}
+        blockers = 0
+        while True:
+            #every subset of mask, in turn (carry-rippler)
+            table[blockers] = _slider_attacks(bit, blockers, positive_rays, negative_rays)
+            blockers = (blockers - mask) & mask
+            if not blockers:
+                break
+        masks.append(mask)
+        tables.append(table)
+    return masks, tables
+
+RANK_MASKS, RANK_ATTACKS = _line_tables(1)
+FILE_MASKS, FILE_ATTACKS = _line_tables(16)
+DIAGONAL_MASKS, DIAGONAL_ATTACKS = _line_tables(17)
+ANTI_DIAGONAL_MASKS, ANTI_DIAGONAL_ATTACKS = _line_tables(15)
+
+def rook_attacks(bit: int, occupied: int) -> int:
+    return RANK_ATTACKS[bit][occupied & RANK_MASKS[bit]] | FILE_ATTACKS[bit][occupied & FILE_MASKS[bit]]
+
+def bishop_attacks(bit: int, occupied: int) -> int:
+    return (DIAGONAL_ATTACKS[bit][occupied & DIAGONAL_MASKS[bit]]
+            | ANTI_DIAGONAL_ATTACKS[bit][occupied & ANTI_DIAGONAL_MASKS[bit]])
+
+#_MOVE_LISTS[bit][targets]: the packed moves from 'bit' to the squares of 'targets', filled in
+#as target sets come up (they repeat a lot) and emptied when one grows past MOVE_LIST_CACHE_SIZE
+_MOVE_LISTS = [{} for _ in range(64)]
+MOVE_LIST_CACHE_SIZE = 4096
+
+def _moves_from(bit: int, targets: int) -> tuple[int, ...]:
+    cache = _MOVE_LISTS[bit]
+    moves = cache.get(targets)
+    if moves is None:
+        from_sq = BIT_TO_SQ[bit]
+        moves = []
+        remaining = targets
+        while remaining:
+            lowest = remaining & -remaining
+            moves.append(from_sq | (BIT_TO_SQ[lowest.bit_length() - 1] << 7))
+            remaining ^= lowest
+        moves = tuple(moves)
+        if len(cache) >= MOVE_LIST_CACHE_SIZE:
+            cache.clear()
+        cache[targets] = moves
+    return moves
+
+def _add_moves_to(sources: int, to_sq: int, flags: int, moves: list[int]) -> None:
+    #appends one packed move per set bit of 'sources', all going to 'to_sq'
+    while sources:
+        lowest = sources & -sources
+        moves.append(BIT_TO_SQ[lowest.bit_length() - 1] | (to_sq << 7) | flags)
+        sources ^= lowest
+
+def _add_pawn_moves(targets: int, shift: int, moves: list[int], flags: int = 0) -> None:
+    #pawn moves produced set-wise: the from square is the target minus a fixed shift
+    while targets:
+        lowest = targets & -targets
+        to_bit = lowest.bit_length() - 1
+        moves.append(BIT_TO_SQ[to_bit - shift] | (BIT_TO_SQ[to_bit] << 7) | flags)
+        targets ^= lowest
+
+def _add_promotions(targets: int, shift: int, moves: list[int]) -> None:
+    #one move per promotion piece for every pawn reaching the last rank
+    while targets:
+        lowest = targets & -targets
+        to_bit = lowest.bit_length() - 1
+        move = BIT_TO_SQ[to_bit - shift] | (BIT_TO_SQ[to_bit] << 7)
+        for promotion in PROMOTION_TYPES:
+            moves.append(move | (promotion << 14))
+        targets ^= lowest
+
+def _pawn_moves(pawns: int, side: int, empty: int, enemy: int, mask: int, moves: list[int]) -> None:
+    #pushes, double pushes, captures and promotions of 'pawns', landing only on squares of 'mask'
+    #(en passant is left to the caller)
+    if side == WHITE:
+        pushed = (pawns << 8) & empty
+        _add_pawn_moves(((pushed & RANK_3) << 8) & empty & mask, 16, moves, MOVE_DOUBLE_PUSH)
+        single = pushed & mask
+        left = ((pawns & ~FILE_A) << 7) & enemy & mask
+        right = ((pawns & ~FILE_H) << 9) & enemy & mask
+        shifts = (8, 7, 9)
+        last_rank = RANK_8
+    else:
+        pushed = (pawns >> 8) & empty
+        _add_pawn_moves(((pushed & RANK_6) >> 8) & empty & mask, -16, moves, MOVE_DOUBLE_PUSH)
+        single = pushed & mask
+        left = ((pawns & ~FILE_H) >> 7) & enemy & mask
+        right = ((pawns & ~FILE_A) >> 9) & enemy & mask
+        shifts = (-8, -7, -9)
+        last_rank = RANK_1
+    for targets, shift in zip((single, left, right), shifts):
+        _add_pawn_moves(targets & ~last_rank, shift, moves)
+        if targets & last_rank:
+            _add_promotions(targets & last_rank, shift, moves)
+
+#Bitboard position
+class BitboardPosition:
+    def __init__(self, squares: list[int]):
+        #pieces[piece_code] is the bitboard of that piece, occupied[side] all pieces of a side
+        self.pieces = [0] * 16
+        self.occupied = {WHITE: 0, BLACK: 0}
+        for bit, sq in enumerate(SQUARES):
+            piece = squares[sq]
+            if piece:
+                self.pieces[piece] |= 1 << bit
+                self.occupied[piece & BLACK] |= 1 << bit
+
+    # ==== STATE MANAGEMENT ==== #
+
+    def toggle_move(self, from_sq: int, to_sq: int, piece: int, captured: int) -> None:
+        #applies a move; calling it again with the same arguments reverts it
+        from_bit = 1 << SQ_TO_BIT[from_sq]
+        to_bit = 1 << SQ_TO_BIT[to_sq]
+        self.pieces[piece] ^= from_bit | to_bit
+        self.occupied[piece & BLACK] ^= from_bit | to_bit
+        if captured:
+            self.pieces[captured] ^= to_bit
+            self.occupied[captured & BLACK] ^= to_bit
+
+    def toggle_piece(self, sq: int, piece: int) -> None:
+        #adds or removes a single piece
+        bit = 1 << SQ_TO_BIT[sq]
+        self.pieces[piece] ^= bit
+        self.occupied[piece & BLACK] ^= bit
+
+    # ==== MOVE GENERATION ==== #
+
+    def generate_pseudo_moves(self, side: int, ep_square: int | None = None) -> list[int]:
+        #castling is added by the engine, which owns the castling rights
+        moves = []
+        pieces = self.pieces
+        own = self.occupied[side]
+        enemy = self.occupied[side ^ BLACK]
+        occupied = own | enemy
+        empty = ~occupied & FULL
+        not_own = ~own & FULL
+
+        # ---- PAWN MOVES -----
+        pawns = pieces[side | PAWN]
+        _pawn_moves(pawns, side, empty, enemy, FULL, moves)
+
+        #En Passant: pawns that attack the skipped square, seen from the square itself
+        if ep_square is not None:
+            ep_bit = SQ_TO_BIT[ep_square]
+            if ep_bit >> 3 == (5 if side == WHITE else 2):
+                _add_moves_to(PAWN_ATTACKS[side ^ BLACK][ep_bit] & pawns, ep_square, MOVE_EN_PASSANT, moves)
+
+        # ---- KNIGHT MOVES -----
+        knights = pieces[side | KNIGHT]
+        while knights:
+            lowest = knights & -knights
+            bit = lowest.bit_length() - 1
+            moves.extend(_moves_from(bit, KNIGHT_ATTACKS[bit] & not_own))
+            knights ^= lowest
+
+        # ---- SLIDING MOVES ----
+        queens = pieces[side | QUEEN]
+        sliders = pieces[side | BISHOP] | queens
+        while sliders:
+            lowest = sliders & -sliders
+            bit = lowest.bit_length() - 1
+            attacks = (DIAGONAL_ATTACKS[bit][occupied & DIAGONAL_MASKS[bit]]
+                       | ANTI_DIAGONAL_ATTACKS[bit][occupied & ANTI_DIAGONAL_MASKS[bit]])
+            moves.extend(_moves_from(bit, attacks & not_own))
+            sliders ^= lowest
+        sliders = pieces[side | ROOK] | queens
+        while sliders:
+            lowest = sliders & -sliders
+            bit = lowest.bit_length() - 1
+            attacks = RANK_ATTACKS[bit][occupied & RANK_MASKS[bit]] | FILE_ATTACKS[bit][occupied & FILE_MASKS[bit]]
+            moves.extend(_moves_from(bit, attacks & not_own))
+            sliders ^= lowest
+
+        # ---- KING MOVES ----
+        kings = pieces[side | KING]
+        while kings:
+            lowest = kings & -kings
+            bit = lowest.bit_length() - 1
+            moves.extend(_moves_from(bit, KING_ATTACKS[bit] & not_own))
+            kings ^= lowest
+
+        return moves
+
+    def generate_legal_moves(self, side: int, ep_square: int | None = None) -> list[int] | None:
+        #The legal moves of 'side' worked out set-wise: checks and pins become masks on the target
+        #sets before any move is extracted, so no move is tested one by one. Castling is added by
+        #the engine, and en passant moves still have to be tried on the board (they take two
+        #pawns off one rank, which no pin mask covers). None unless 'side' has exactly one king.
+        pieces = self.pieces
+        kings = pieces[side | KING]
+        if not kings or kings & (kings - 1):
+            return None
+        king = kings.bit_length() - 1
+        enemy_side = side ^ BLACK
+        own = self.occupied[side]
+        enemy = self.occupied[enemy_side]
+        occupied = own | enemy
+        not_own = ~own & FULL
+        enemy_queens = pieces[enemy_side | QUEEN]
+        enemy_rooks = pieces[enemy_side | ROOK] | enemy_queens
+        enemy_bishops = pieces[enemy_side | BISHOP] | enemy_queens
+        moves = []
+
+        # ---- KING MOVES ---- (off the board while testing, so a checking slider covers the squares behind it)
+        without_king = occupied ^ kings
+        targets = KING_ATTACKS[king] & not_own
+        safe = 0
+        while targets:
+            lowest = targets & -targets
+            if not self._attacked(lowest.bit_length() - 1, enemy_side, without_king):
+                safe |= lowest
+            targets ^= lowest
+        moves.extend(_moves_from(king, safe))
+
+        checkers = (
+            KNIGHT_ATTACKS[king] & pieces[enemy_side | KNIGHT]
+            | PAWN_ATTACKS[side][king] & pieces[enemy_side | PAWN]
+            | rook_attacks(king, occupied) & enemy_rooks
+            | bishop_attacks(king, occupied) & enemy_bishops
+        )
+        if checkers & (checkers - 1):
+            #double check: only the king can move
+            return moves
+        #in check, the other pieces must capture the checker or step in between
+        target_mask = not_own & (checkers | BETWEEN[king][checkers.bit_length() - 1]) if checkers else not_own
+
+        #pinned piece -> the squares it may still move to (between the king and the pinner, and the pinner)
+        pins = {}
+        snipers = rook_attacks(king, 0) & enemy_rooks | bishop_attacks(king, 0) & enemy_bishops
+        while snipers:
+            lowest = snipers & -snipers
+            line = BETWEEN[king][lowest.bit_length() - 1]
+            blockers = line & occupied
+            if blockers & own and not blockers & (blockers - 1):
+                pins[blockers] = line | lowest
+            snipers ^= lowest
+        pinned = sum(pins)
+
+        # ---- PAWN MOVES -----
+        pawns = pieces[side | PAWN]
+        empty = ~occupied & FULL
+        _pawn_moves(pawns & ~pinned, side, empty, enemy, target_mask, moves)
+        for pin, ray in pins.items():
+            if pawns & pin:
+                _pawn_moves(pin, side, empty, enemy, target_mask & ray, moves)
+        if ep_square is not None:
+            ep_bit = SQ_TO_BIT[ep_square]
+            if ep_bit >> 3 == (5 if side == WHITE else 2):
+                _add_moves_to(PAWN_ATTACKS[enemy_side][ep_bit] & pawns, ep_square, MOVE_EN_PASSANT, moves)
+
+        # ---- KNIGHT MOVES ----- (a pinned knight can never move)
+        knights = pieces[side | KNIGHT] & ~pinned
+        while knights:
+            lowest = knights & -knights
+            bit = lowest.bit_length() - 1
+            moves.extend(_moves_from(bit, KNIGHT_ATTACKS[bit] & target_mask))
+            knights ^= lowest
+
+        # ---- SLIDING MOVES ----
+        queens = pieces[side | QUEEN]
+        sliders = pieces[side | BISHOP] | queens
+        while sliders:
+            lowest = sliders & -sliders
+            bit = lowest.bit_length() - 1
+            attacks = (DIAGONAL_ATTACKS[bit][occupied & DIAGONAL_MASKS[bit]]
+                       | ANTI_DIAGONAL_ATTACKS[bit][occupied & ANTI_DIAGONAL_MASKS[bit]]) & target_mask
+            if lowest & pinned:
+                attacks &= pins[lowest]
+            moves.extend(_moves_from(bit, attacks))
+            sliders ^= lowest
+        sliders = pieces[side | ROOK] | queens
+        while sliders:
+            lowest = sliders & -sliders
+            bit = lowest.bit_length() - 1
+            attacks = (RANK_ATTACKS[bit][occupied & RANK_MASKS[bit]]
+                       | FILE_ATTACKS[bit][occupied & FILE_MASKS[bit]]) & target_mask
+            if lowest & pinned:
+                attacks &= pins[lowest]
+            moves.extend(_moves_from(bit, attacks))
+            sliders ^= lowest
+
+        return moves
+
+    # ==== ATTACK DETECTION ==== #
+
+    def is_attacked(self, target: int, by_side: int) -> bool:
+        #Determines if 0x88 square 'target' is attacked by any piece of 'by_side'.
+        return self._attacked(SQ_TO_BIT[target], by_side, self.occupied[WHITE] | self.occupied[BLACK])
+
+    def _attacked(self, bit: int, by_side: int, occupied: int) -> bool:
+        #is_attacked for a bit index, with the sliders blocked by 'occupied'
+        pieces = self.pieces
+
+        if KNIGHT_ATTACKS[bit] & pieces[by_side | KNIGHT]:
+            return True
+        if KING_ATTACKS[bit] & pieces[by_side | KING]:
+            return True
+        #a by_side pawn attacks 'bit' from where a pawn of the other color on 'bit' would attack
+        if PAWN_ATTACKS[by_side ^ BLACK][bit] & pieces[by_side | PAWN]:
+            return True
+
+        queens = pieces[by_side | QUEEN]
+        if rook_attacks(bit, occupied) & (pieces[by_side | ROOK] | queens):
+            return True
+        if bishop_attacks(bit, occupied) & (pieces[by_side | BISHOP] | queens):
+            return True
+        return False
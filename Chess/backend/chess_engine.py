@@ -1,4 +1,11 @@
 #Chess Engine
+import random
+import time
+
+from piece_square_tables import MIDDLEGAME_TABLES, ENDGAME_TABLES, PHASE_WEIGHTS, TOTAL_PHASE
+from transposition import TranspositionTable, DEFAULT_MEGABYTES, EXACT, LOWER, UPPER
+from search_stats import SearchStats, HotPathProfiler
+
 #===== Constants =====#
 piece_values = {
     'p': 100,
@@ -13,6 +20,186 @@ columns = ['a', 'b', 'c', 'd', 'e', 'f', 'g', 'h']
 
 search_depth = 3
 
+#search bounds and move ordering
+INFINITY = 10 ** 9
+MAX_PLY = 64
+HASH_MOVE_ORDER = 40_000_000
+CAPTURE_ORDER = 30_000_000
+KILLER_ORDER = 20_000_000
+
+#quiescence: a capture is skipped when even winning the victim (plus this margin)
+#cannot lift the score up to alpha
+DELTA_MARGIN = 200
+
+#iterative deepening: how often the clock is read, and the depth cap when only a budget is given
+TIME_CHECK_INTERVAL = 512
+MAX_SEARCH_DEPTH = 32
+
+#move generator backends selectable per engine
+MOVE_GENERATORS = ('mailbox', 'bitboard')
+
+# === Internal Board Representation === #
+#The engine keeps its position in a flat 0x88 mailbox: square index = rank * 16 + file
+#(both 0-based), so 'a1' -> 0, 'h1' -> 7, 'a2' -> 16 ... 'h8' -> 119.
+#Any index with a bit of 0x88 set is off the board, which makes bounds checks a single AND.
+#Pieces are small ints: the low 3 bits hold the type and bit 3 holds the color.
+EMPTY = 0
+PAWN = 1
+KNIGHT = 2
+BISHOP = 3
+ROOK = 4
+QUEEN = 5
+KING = 6
+
+WHITE = 0
+BLACK = 8
+COLOR_MASK = 8
+TYPE_MASK = 7
+
+PIECE_TYPES = 'pnbrqk'
+
+#'wp' -> 1, 'bk' -> 14 ...
+PIECE_CODES = {
+    color + PIECE_TYPES[piece_type - 1]: side | piece_type
+    for color, side in (('w', WHITE), ('b', BLACK))
+    for piece_type in range(PAWN, KING + 1)
+}
+PIECE_NAMES = [None] * 16
+for _name, _code in PIECE_CODES.items():
+    PIECE_NAMES[_code] = _name
+
+SIDES = {'w': WHITE, 'b': BLACK}
+SIDE_NAMES = {WHITE: 'w', BLACK: 'b'}
+
+#material value of each piece code, indexed by the piece int
+PIECE_VALUES = [0] * 16
+for _name, _code in PIECE_CODES.items():
+    PIECE_VALUES[_code] = piece_values[_name[1]]
+
+#the 64 on-board indices in a1, b1 ... h8 order
+SQUARES = [rank * 16 + file for rank in range(8) for file in range(8)]
+SQUARE_NAMES = [None] * 128
+SQUARE_INDEX = {}
+for _sq in SQUARES:
+    SQUARE_NAMES[_sq] = columns[_sq & 7] + str((_sq >> 4) + 1)
+    SQUARE_INDEX[SQUARE_NAMES[_sq]] = _sq
+
+#Evaluation tables per piece code and 0x88 square: material + piece-square bonus,
+#already signed (positive favours black) so make/unmake can add them directly.
+PST_MIDDLEGAME = [[0] * 128 for _ in range(16)]
+PST_ENDGAME = [[0] * 128 for _ in range(16)]
+PHASE_VALUES = [0] * 16
+for _name, _code in PIECE_CODES.items():
+    _color, _kind = _name
+    _sign = 1 if _color == 'b' else -1
+    PHASE_VALUES[_code] = PHASE_WEIGHTS[_kind]
+    for _sq in SQUARES:
+        #tables are listed from white's side with rank 8 first; black reads them mirrored
+        _row = 7 - (_sq >> 4) if _color == 'w' else _sq >> 4
+        _index = _row * 8 + (_sq & 7)
+        PST_MIDDLEGAME[_code][_sq] = _sign * (piece_values[_kind] + MIDDLEGAME_TABLES[_kind][_index])
+        PST_ENDGAME[_code][_sq] = _sign * (piece_values[_kind] + ENDGAME_TABLES[_kind][_index])
+
+#square offsets in the 0x88 layout
+KNIGHT_OFFSETS = (33, 31, -31, -33, 18, 14, -14, -18)
+KING_OFFSETS = (1, -1, 16, -16, 17, 15, -15, -17)
+ROOK_DIRECTIONS = (1, -1, 16, -16)
+BISHOP_DIRECTIONS = (17, 15, -15, -17)
+QUEEN_DIRECTIONS = ROOK_DIRECTIONS + BISHOP_DIRECTIONS
+#(direction, slider type other than the queen that attacks along it)
+SLIDER_RAYS = tuple((d, ROOK) for d in ROOK_DIRECTIONS) + tuple((d, BISHOP) for d in BISHOP_DIRECTIONS)
+
+def _ray(sq: int, direction: int) -> tuple[int, ...]:
+    #squares from 'sq' (exclusive) to the board edge along 'direction', nearest first
+    ray = []
+    target = sq + direction
+    while not target & 0x88:
+        ray.append(target)
+        target += direction
+    return tuple(ray)
+
+#Per-square tables built once at import, indexed by 0x88 square (off-board entries stay empty):
+#the squares a knight / king can jump to, the non-empty slider rays (nearest square first),
+#and the squares a pawn of each side attacks. The generators and attack detection read
+#these instead of adding offsets and testing bounds step by step.
+KNIGHT_TARGETS = [()] * 128
+KING_TARGETS = [()] * 128
+ROOK_RAYS = [()] * 128
+BISHOP_RAYS = [()] * 128
+QUEEN_RAYS = [()] * 128
+#(ray, slider type other than the queen that attacks along it) for check and pin detection
+SLIDER_RAY_TABLE = [()] * 128
+PAWN_ATTACK_SQUARES = {WHITE: [()] * 128, BLACK: [()] * 128}
+for _sq in SQUARES:
+    KNIGHT_TARGETS[_sq] = tuple(_sq + _o for _o in KNIGHT_OFFSETS if not (_sq + _o) & 0x88)
+    KING_TARGETS[_sq] = tuple(_sq + _o for _o in KING_OFFSETS if not (_sq + _o) & 0x88)
+    ROOK_RAYS[_sq] = tuple(_r for _r in (_ray(_sq, _d) for _d in ROOK_DIRECTIONS) if _r)
+    BISHOP_RAYS[_sq] = tuple(_r for _r in (_ray(_sq, _d) for _d in BISHOP_DIRECTIONS) if _r)
+    QUEEN_RAYS[_sq] = ROOK_RAYS[_sq] + BISHOP_RAYS[_sq]
+    SLIDER_RAY_TABLE[_sq] = tuple(
+        (_ray(_sq, _d), _type) for _d, _type in SLIDER_RAYS if _ray(_sq, _d)
+    )
+    PAWN_ATTACK_SQUARES[WHITE][_sq] = tuple(_sq + _o for _o in (15, 17) if not (_sq + _o) & 0x88)
+    PAWN_ATTACK_SQUARES[BLACK][_sq] = tuple(_sq + _o for _o in (-17, -15) if not (_sq + _o) & 0x88)
+
+#Castling rights are 4 bits; moving from or to one of these squares clears the matching rights
+WHITE_KINGSIDE = 1
+WHITE_QUEENSIDE = 2
+BLACK_KINGSIDE = 4
+BLACK_QUEENSIDE = 8
+CASTLING_LETTERS = (('K', WHITE_KINGSIDE), ('Q', WHITE_QUEENSIDE), ('k', BLACK_KINGSIDE), ('q', BLACK_QUEENSIDE))
+CASTLING_MASKS = [15] * 128
+CASTLING_MASKS[SQUARE_INDEX['e1']] = 15 & ~(WHITE_KINGSIDE | WHITE_QUEENSIDE)
+CASTLING_MASKS[SQUARE_INDEX['h1']] = 15 & ~WHITE_KINGSIDE
+CASTLING_MASKS[SQUARE_INDEX['a1']] = 15 & ~WHITE_QUEENSIDE
+CASTLING_MASKS[SQUARE_INDEX['e8']] = 15 & ~(BLACK_KINGSIDE | BLACK_QUEENSIDE)
+CASTLING_MASKS[SQUARE_INDEX['h8']] = 15 & ~BLACK_KINGSIDE
+CASTLING_MASKS[SQUARE_INDEX['a8']] = 15 & ~BLACK_QUEENSIDE
+#king destination -> (rook from, rook to)
+CASTLING_ROOK_MOVES = {
+    SQUARE_INDEX['g1']: (SQUARE_INDEX['h1'], SQUARE_INDEX['f1']),
+    SQUARE_INDEX['c1']: (SQUARE_INDEX['a1'], SQUARE_INDEX['d1']),
+    SQUARE_INDEX['g8']: (SQUARE_INDEX['h8'], SQUARE_INDEX['f8']),
+    SQUARE_INDEX['c8']: (SQUARE_INDEX['a8'], SQUARE_INDEX['d8']),
+}
+
+#Zobrist keys: one random 64-bit key per (piece, square), plus one for black to move,
+#one per castling-rights combination and one per en passant file.
+#The seed is fixed so every process hashes a position to the same key.
+_zobrist_random = random.Random(0x5EED_C4E55)
+ZOBRIST_PIECES = [
+    [_zobrist_random.getrandbits(64) if piece and not sq & 0x88 else 0 for sq in range(128)]
+    for piece in range(16)
+]
+ZOBRIST_BLACK_TO_MOVE = _zobrist_random.getrandbits(64)
+_castling_right_keys = [_zobrist_random.getrandbits(64) for _ in range(4)]
+ZOBRIST_CASTLING = [0] * 16
+for _rights in range(16):
+    for _bit in range(4):
+        if _rights & (1 << _bit):
+            ZOBRIST_CASTLING[_rights] ^= _castling_right_keys[_bit]
+ZOBRIST_EN_PASSANT = [_zobrist_random.getrandbits(64) for _ in range(8)]
+
+#Moves are packed into a single int: from square in bits 0-6, to square in bits 7-13,
+#promotion piece type in bits 14-16 and special-move flags in bits 17-19.
+MOVE_DOUBLE_PUSH = 1 << 17
+MOVE_EN_PASSANT = 2 << 17
+MOVE_CASTLE = 4 << 17
+PROMOTION_MASK = 7 << 14
+PROMOTION_TYPES = (QUEEN, ROOK, BISHOP, KNIGHT)
+
+def encode_move(from_sq: int, to_sq: int, promotion: int = 0, flags: int = 0) -> int:
+    return from_sq | (to_sq << 7) | (promotion << 14) | flags
+
+def move_from(move: int) -> int:
+    return move & 127
+
+def move_to(move: int) -> int:
+    return (move >> 7) & 127
+
+def move_promotion(move: int) -> int:
+    return (move >> 14) & 7
+
 # === Utility Functions === #
 def square_to_coords(square_id: str) -> tuple[int, int]:
     #convert piece positions to coordinates e.g. 'a1' -> (1,1) where (row, col)
@@ -29,474 +216,1387 @@ def coords_to_square(row: int, col: int) -> str | None:
         return columns[col - 1] + str(row)
     return None
 
+def move_to_squares(move: int) -> tuple[str, str]:
+    #converts an internal move to the ('e2', 'e4') pair used by the API
+    return SQUARE_NAMES[move & 127], SQUARE_NAMES[(move >> 7) & 127]
+
+def move_to_uci(move: int) -> str:
+    #converts an internal move to long algebraic notation, e.g. 'e2e4' or 'e7e8q'
+    promotion = (move >> 14) & 7
+    text = SQUARE_NAMES[move & 127] + SQUARE_NAMES[(move >> 7) & 127]
+    return text + PIECE_TYPES[promotion - 1] if promotion else text
+
+def squares_to_moves(moves: list[int]) -> list[tuple[str, str]]:
+    #('from', 'to') pairs for the API; the four promotions of a pawn collapse into one pair
+    return list(dict.fromkeys(move_to_squares(move) for move in moves))
+
 #Chess Engine class
 class ChessEngine:
-    def __init__(self, board_state: dict):
-        self.board = board_state.copy()
+    def __init__(
+        self,
+        board_state: dict,
+        move_generator: str = 'mailbox',
+        tt_megabytes: float = DEFAULT_MEGABYTES,
+        castling_rights: str = '-',
+        en_passant: str | None = None,
+        opening_book=None,
+        profile: bool = False,
+        result_cache=None,
+        transposition_table: TranspositionTable | None = None,
+    ):
+        #board_state is the frontend's {'e2': 'wp', 'e3': None, ...} dict.
+        #It is only read here; the search works on self.squares.
+        #move_generator picks 'mailbox' (default) or the set-wise 'bitboard' backend;
+        #both produce the same moves, the mailbox stays the source of truth either way.
+        #tt_megabytes caps the transposition table, which is kept across find_best_move calls.
+        #castling_rights ('KQkq' style) and en_passant (target square) default to none because
+        #the dict carries no move history; a FEN string carries both (see fen.py).
+        #opening_book is an OpeningBook (see opening_book.py) consulted before searching.
+        #profile times the hot engine methods during find_best_move (see search_stats.py).
+        #result_cache is a ResultCache (see result_cache.py) of earlier searches' best moves.
+        #transposition_table shares another engine's table instead of allocating one
+        #(pondering searches a copy of the game's position into the game's table).
+        if move_generator not in MOVE_GENERATORS:
+            raise ValueError(f"Unknown move generator: {move_generator}")
+        self.move_generator = move_generator
+        self.squares = [EMPTY] * 128
+        self.bitboards = None
+        self.hash = 0
+        self.mg_score = 0
+        self.eg_score = 0
+        self.phase = 0
+        self.king_squares = {WHITE: None, BLACK: None}
+        self.castling = 0
+        self.ep_square = None
+        self._history = []
+        self._played_moves = []
+
+        #FEN bookkeeping, not used by the search
+        self.side_to_move = 'w'
+        self.halfmove_clock = 0
+        self.fullmove_number = 1
+
+        self.set_board_state(board_state, castling_rights, en_passant)
+        self.opening_book = opening_book
+        self.result_cache = result_cache
+
+        #search state
+        self.nodes = 0
+        self.leaf_evals = 0
+        self.move_generations = 0
+        self.cutoffs = 0
+        self.stats = SearchStats()
+        self.profile = profile
+        self.tt = transposition_table if transposition_table is not None else TranspositionTable(tt_megabytes)
+        #called as on_iteration(depth, move, score) after every completed iteration
+        self.on_iteration = None
+        self._reset_ordering()
+        self.completed_depth = 0
+        self.best_score = 0
+        self.principal_variation = []
+        self.stopped = False
+        self._deadline = float('inf')
+        self._node_limit = INFINITY
+        self._pv_table = [()] * (MAX_PLY + 1)
+        self._previous_pv = ()
+        self._follow_pv = False
+
+    # ==== BOARD CONVERSION ==== #
+
+    def set_board_state(self, board_state: dict, castling_rights: str = '-', en_passant: str | None = None) -> None:
+        #loads a {'e2': 'wp', ...} dict into the mailbox
+        squares = [EMPTY] * 128
+        for square_id, piece_code in board_state.items():
+            if not piece_code:
+                continue
+            if square_id not in SQUARE_INDEX:
+                raise ValueError(f"Invalid square in board state: {square_id}")
+            if piece_code not in PIECE_CODES:
+                raise ValueError(f"Invalid piece code on {square_id}: {piece_code}")
+            squares[SQUARE_INDEX[square_id]] = PIECE_CODES[piece_code]
+        self.squares = squares
+        self.king_squares = {WHITE: None, BLACK: None}
+        for sq in SQUARES:
+            if squares[sq] & TYPE_MASK == KING:
+                self.king_squares[squares[sq] & COLOR_MASK] = sq
+
+        self.castling = 0
+        for letter, right in CASTLING_LETTERS:
+            if letter in (castling_rights or ''):
+                self.castling |= right
+        if en_passant and en_passant != '-':
+            if en_passant not in SQUARE_INDEX:
+                raise ValueError(f"Invalid en passant square: {en_passant}")
+            self.ep_square = SQUARE_INDEX[en_passant]
+        else:
+            self.ep_square = None
+        self._history = []
+        self._played_moves = []
+
+        self.hash = self.compute_hash()
+        self.mg_score, self.eg_score, self.phase = self.compute_eval_terms()
+
+        if self.move_generator == 'bitboard':
+            from bitboard import BitboardPosition
+            self.bitboards = BitboardPosition(squares)
+
+    def to_board_state(self) -> dict:
+        #converts the mailbox back to the {'e2': 'wp', ...} dict format (occupied squares only)
+        squares = self.squares
+        return {SQUARE_NAMES[sq]: PIECE_NAMES[squares[sq]] for sq in SQUARES if squares[sq]}
+
+    def compute_hash(self) -> int:
+        #Zobrist key of the placement, castling rights and en passant file from scratch;
+        #make/unmake keep self.hash in sync.
+        #The side to move is not part of it: the search mixes in ZOBRIST_BLACK_TO_MOVE.
+        key = ZOBRIST_CASTLING[self.castling]
+        if self.ep_square is not None:
+            key ^= ZOBRIST_EN_PASSANT[self.ep_square & 7]
+        squares = self.squares
+        for sq in SQUARES:
+            if squares[sq]:
+                key ^= ZOBRIST_PIECES[squares[sq]][sq]
+        return key
+
+    def book_key(self, side: int) -> int:
+        #Zobrist key of the placement and side to move only: the frontend's board dict
+        #carries no castling or en passant state, so book lookups must not depend on them
+        key = self.hash ^ ZOBRIST_CASTLING[self.castling]
+        if self.ep_square is not None:
+            key ^= ZOBRIST_EN_PASSANT[self.ep_square & 7]
+        return key ^ ZOBRIST_BLACK_TO_MOVE if side == BLACK else key
+
+    def compute_eval_terms(self) -> tuple[int, int, int]:
+        #middlegame score, endgame score and game phase from scratch;
+        #make/unmake keep the running totals in self.mg_score / eg_score / phase
+        mg_score = eg_score = phase = 0
+        squares = self.squares
+        for sq in SQUARES:
+            piece = squares[sq]
+            if piece:
+                mg_score += PST_MIDDLEGAME[piece][sq]
+                eg_score += PST_ENDGAME[piece][sq]
+                phase += PHASE_VALUES[piece]
+        return mg_score, eg_score, phase
+
+    def castling_string(self) -> str:
+        #castling rights in FEN form, e.g. 'KQkq' or '-'
+        return ''.join(letter for letter, right in CASTLING_LETTERS if self.castling & right) or '-'
+
+    def en_passant_square(self) -> str | None:
+        return SQUARE_NAMES[self.ep_square] if self.ep_square is not None else None
+
+    @property
+    def board(self) -> dict:
+        #read-only dict view for callers such as app.py; rebuilt on every access
+        return self.to_board_state()
 
     # ==== STATE MANAGEMENT ==== #
 
+    def _make(self, move: int) -> int:
+        #executes an internal move and returns the captured piece int (EMPTY if none).
+        #The irreversible state (castling, en passant, hash, eval totals) is pushed on
+        #self._history so _unmake can restore it without recomputing.
+        squares = self.squares
+        from_sq = move & 127
+        to_sq = (move >> 7) & 127
+        piece = squares[from_sq]
+        captured = squares[to_sq]
+        castling = self.castling
+        self._history.append((captured, castling, self.ep_square, self.hash, self.mg_score, self.eg_score, self.phase))
+
+        key = self.hash
+        if self.ep_square is not None:
+            key ^= ZOBRIST_EN_PASSANT[self.ep_square & 7]
+            self.ep_square = None
+
+        if move >> 14:
+            #promotion or special move
+            self.hash = key
+            captured = self._make_special(move, from_sq, to_sq, piece, captured)
+            key = self.hash
+        else:
+            squares[to_sq] = piece
+            squares[from_sq] = EMPTY
+            key ^= ZOBRIST_PIECES[piece][from_sq] ^ ZOBRIST_PIECES[piece][to_sq] ^ ZOBRIST_PIECES[captured][to_sq]
+            mg_table = PST_MIDDLEGAME[piece]
+            eg_table = PST_ENDGAME[piece]
+            self.mg_score += mg_table[to_sq] - mg_table[from_sq] - PST_MIDDLEGAME[captured][to_sq]
+            self.eg_score += eg_table[to_sq] - eg_table[from_sq] - PST_ENDGAME[captured][to_sq]
+            self.phase -= PHASE_VALUES[captured]
+            if piece & TYPE_MASK == KING:
+                self.king_squares[piece & COLOR_MASK] = to_sq
+            if self.bitboards is not None:
+                self.bitboards.toggle_move(from_sq, to_sq, piece, captured)
+
+        if castling:
+            self.castling = castling & CASTLING_MASKS[from_sq] & CASTLING_MASKS[to_sq]
+            if self.castling != castling:
+                key ^= ZOBRIST_CASTLING[castling] ^ ZOBRIST_CASTLING[self.castling]
+        self.hash = key
+        return captured
+
+    def _make_special(self, move: int, from_sq: int, to_sq: int, piece: int, captured: int) -> int:
+        #promotions, double pushes, en passant and castling, built from single-square edits
+        side = piece & COLOR_MASK
+        promotion = (move >> 14) & 7
+        if captured:
+            self._remove_piece(to_sq)
+        self._remove_piece(from_sq)
+
+        if promotion:
+            self._put_piece(to_sq, side | promotion)
+        else:
+            self._put_piece(to_sq, piece)
+
+        if move & MOVE_DOUBLE_PUSH:
+            self.ep_square = (from_sq + to_sq) >> 1
+            self.hash ^= ZOBRIST_EN_PASSANT[to_sq & 7]
+        elif move & MOVE_EN_PASSANT:
+            #the captured pawn sits beside the moving pawn, behind the target square
+            captured_sq = to_sq - 16 if side == WHITE else to_sq + 16
+            captured = self.squares[captured_sq]
+            self._remove_piece(captured_sq)
+        elif move & MOVE_CASTLE:
+            rook_from, rook_to = CASTLING_ROOK_MOVES[to_sq]
+            rook = self.squares[rook_from]
+            self._remove_piece(rook_from)
+            self._put_piece(rook_to, rook)
+        return captured
+
+    def _put_piece(self, sq: int, piece: int) -> None:
+        self.squares[sq] = piece
+        self.hash ^= ZOBRIST_PIECES[piece][sq]
+        self.mg_score += PST_MIDDLEGAME[piece][sq]
+        self.eg_score += PST_ENDGAME[piece][sq]
+        self.phase += PHASE_VALUES[piece]
+        if piece & TYPE_MASK == KING:
+            self.king_squares[piece & COLOR_MASK] = sq
+        if self.bitboards is not None:
+            self.bitboards.toggle_piece(sq, piece)
+
+    def _remove_piece(self, sq: int) -> None:
+        piece = self.squares[sq]
+        self.squares[sq] = EMPTY
+        self.hash ^= ZOBRIST_PIECES[piece][sq]
+        self.mg_score -= PST_MIDDLEGAME[piece][sq]
+        self.eg_score -= PST_ENDGAME[piece][sq]
+        self.phase -= PHASE_VALUES[piece]
+        if self.bitboards is not None:
+            self.bitboards.toggle_piece(sq, piece)
+
+    def _unmake(self, move: int, captured: int) -> None:
+        #reverts an internal move
+        squares = self.squares
+        from_sq = move & 127
+        to_sq = (move >> 7) & 127
+        captured, self.castling, self.ep_square, self.hash, self.mg_score, self.eg_score, self.phase = self._history.pop()
+        piece = squares[to_sq]
+
+        if move >> 14 and not move & MOVE_DOUBLE_PUSH:
+            self._unmake_special(move, from_sq, to_sq, piece, captured)
+            return
+
+        squares[from_sq] = piece
+        squares[to_sq] = captured
+        if piece & TYPE_MASK == KING:
+            self.king_squares[piece & COLOR_MASK] = from_sq
+        if self.bitboards is not None:
+            self.bitboards.toggle_move(from_sq, to_sq, piece, captured)
+
+    def _unmake_special(self, move: int, from_sq: int, to_sq: int, piece: int, captured: int) -> None:
+        #puts the pieces of a promotion, en passant or castling move back;
+        #hash and eval totals were already restored from the history entry
+        squares = self.squares
+        bitboards = self.bitboards
+        side = piece & COLOR_MASK
+
+        if move & MOVE_EN_PASSANT:
+            captured_sq = to_sq - 16 if side == WHITE else to_sq + 16
+            captured = (side ^ BLACK) | PAWN
+            squares[from_sq] = piece
+            squares[to_sq] = EMPTY
+            squares[captured_sq] = captured
+            if bitboards is not None:
+                bitboards.toggle_move(from_sq, to_sq, piece, EMPTY)
+                bitboards.toggle_piece(captured_sq, captured)
+        elif move & MOVE_CASTLE:
+            rook_from, rook_to = CASTLING_ROOK_MOVES[to_sq]
+            rook = squares[rook_to]
+            squares[from_sq] = piece
+            squares[to_sq] = EMPTY
+            squares[rook_from] = rook
+            squares[rook_to] = EMPTY
+            self.king_squares[side] = from_sq
+            if bitboards is not None:
+                bitboards.toggle_move(from_sq, to_sq, piece, EMPTY)
+                bitboards.toggle_move(rook_from, rook_to, rook, EMPTY)
+        else:
+            #promotion: the promoted piece turns back into a pawn
+            pawn = side | PAWN
+            squares[from_sq] = pawn
+            squares[to_sq] = captured
+            if bitboards is not None:
+                bitboards.toggle_piece(to_sq, piece)
+                bitboards.toggle_piece(from_sq, pawn)
+                if captured:
+                    bitboards.toggle_piece(to_sq, captured)
+
+    def _move_from_squares(self, from_idx: int, to_idx: int, promotion: int = QUEEN) -> int:
+        #builds the internal move (with its flags) for a from/to pair on the current board
+        piece = self.squares[from_idx]
+        piece_type = piece & TYPE_MASK
+        if piece_type == PAWN:
+            if to_idx >> 4 in (0, 7):
+                return encode_move(from_idx, to_idx, promotion)
+            if abs(to_idx - from_idx) == 32:
+                return encode_move(from_idx, to_idx, flags=MOVE_DOUBLE_PUSH)
+            if to_idx == self.ep_square and (to_idx - from_idx) & 15 and not self.squares[to_idx]:
+                return encode_move(from_idx, to_idx, flags=MOVE_EN_PASSANT)
+        elif piece_type == KING and abs(to_idx - from_idx) == 2:
+            return encode_move(from_idx, to_idx, flags=MOVE_CASTLE)
+        return encode_move(from_idx, to_idx)
+
     def make_move(self, from_sq: str, to_sq: str) -> str | None:
         #executes the move and returns the captured piece.
-        captured_piece = self.board.get(to_sq)
+        #Pawns reaching the last rank become queens.
+        from_idx = SQUARE_INDEX.get(from_sq)
+        to_idx = SQUARE_INDEX.get(to_sq)
 
-        piece_to_move = self.board.get(from_sq)
-
-        if not piece_to_move:
+        if from_idx is None or to_idx is None or not self.squares[from_idx]:
             #raise ValueError(f"Attempted to move piece from empty square: {from_sq}")
             print(f"Warning: Attempted to move piece from empty square: {from_sq}")
             return None
 
-        self.board[to_sq] = piece_to_move
-
-        self.board[from_sq] = None
-
-        return captured_piece
+        move = self._move_from_squares(from_idx, to_idx)
+        piece = self.squares[from_idx]
+        self.side_to_move = 'b' if piece & COLOR_MASK == WHITE else 'w'
+        #the move goes on the stack with the clocks before it, for undo_move
+        self._played_moves.append((move, self.halfmove_clock, self.fullmove_number))
+        captured = self._make(move)
+        #the fifty-move clock restarts on pawn moves and captures; a new full move starts after black's
+        if piece & TYPE_MASK == PAWN or captured:
+            self.halfmove_clock = 0
+        else:
+            self.halfmove_clock += 1
+        if piece & COLOR_MASK == BLACK:
+            self.fullmove_number += 1
+        return PIECE_NAMES[captured]
 
     def undo_move(self, from_sq: str, to_sq: str, captured_piece: str | None) -> None:
-        #Reverts the move
-        piece_to_move = self.board.get(to_sq)
-
-        self.board[from_sq] = piece_to_move
-
-        self.board[to_sq] = captured_piece
+        #Reverts the last move made with make_move
+        if not self._played_moves:
+            raise ValueError("No move to undo")
+        move, halfmove_clock, fullmove_number = self._played_moves[-1]
+        if move_to_squares(move) != (from_sq, to_sq):
+            raise ValueError(f"Last move was {move_to_squares(move)}, not {(from_sq, to_sq)}")
+        self._played_moves.pop()
+        self._unmake(move, PIECE_CODES[captured_piece] if captured_piece else EMPTY)
+        self.side_to_move = 'w' if self.side_to_move == 'b' else 'b'
+        self.halfmove_clock = halfmove_clock
+        self.fullmove_number = fullmove_number
 
     # ==== MOVE GENERATION ==== #
 
-    def get_legal_moves(self, color: str) -> list[tuple[str, str]]:
-        #All moves that DO NOT leave the King in Check
-        all_pseudo_legal_moves = [] #all moves
-        final_legal_moves = [] #moves that don't leave the King in Check
-
-        #====== Pseudo-Legal Moves ====
-        for sq, piece_code in self.board.items():
-            if piece_code and piece_code[0] == color:
-                piece_type = piece_code[1]
-
-                # ---- PAWN MOVES -----
-                if piece_type == 'p':
-                    #extend the list with all valid pawn moves from this square
-                    all_pseudo_legal_moves.extend(self.get_pawn_moves(sq, color))
-
-                # ---- KNIGHT MOVES -----
-                elif piece_type == 'n':
-                    all_pseudo_legal_moves.extend(self.get_knight_moves(sq, color))
-
-                # ---- ROOK MOVES ----
-                elif piece_type == 'r':
-                    all_pseudo_legal_moves.extend(self.get_rook_moves(sq, color))
-
-                # ---- BISHOP MOVES ----
-                elif piece_type == 'b':
-                    all_pseudo_legal_moves.extend(self.get_bishop_moves(sq, color))
-
-                # ---- QUEEN MOVES ----
-                elif piece_type == 'q':
-                    all_pseudo_legal_moves.extend(self.get_queen_moves(sq, color))
-
-                # ---- KING MOVES ----
-                elif piece_type == 'k':
-                    all_pseudo_legal_moves.extend(self.get_king_moves(sq, color))
-                
-
-        #Filter for King Safety
-        for from_sq, to_sq in all_pseudo_legal_moves:
-            # 1.Execute the move hypothetically
-            captured_piece = self.make_move(from_sq, to_sq)
-
-            # 2.Check if the current player is in check after the move
-            if not self.is_in_check(color):
-               final_legal_moves.append((from_sq, to_sq))
-
-            # 3.Revert the move to explore the next option
-            self.undo_move(from_sq, to_sq, captured_piece)
-        return final_legal_moves
-                
-    def get_pawn_moves(self, from_sq: str, color: str) -> list[tuple[str, str]]:
+    def _generate_pseudo_moves(self, side: int) -> list[int]:
+        #all pseudo-legal moves for 'side' as packed ints
+        if self.bitboards is not None:
+            moves = self.bitboards.generate_pseudo_moves(side, self.ep_square)
+            if self.castling:
+                self._castling_moves(side, moves)
+            return moves
+
         moves = []
-        row, col = square_to_coords(from_sq)
-        direction = 1 if color == 'w' else -1 #pawns move up for white, down for black
+        squares = self.squares
+        for sq in SQUARES:
+            piece = squares[sq]
+            if not piece or piece & COLOR_MASK != side:
+                continue
+            piece_type = piece & TYPE_MASK
+
+            if piece_type == PAWN:
+                self._pawn_moves(sq, side, moves)
+            elif piece_type == KNIGHT:
+                self._step_moves(sq, side, KNIGHT_TARGETS, moves)
+            elif piece_type == BISHOP:
+                self._slide_moves(sq, side, BISHOP_RAYS, moves)
+            elif piece_type == ROOK:
+                self._slide_moves(sq, side, ROOK_RAYS, moves)
+            elif piece_type == QUEEN:
+                self._slide_moves(sq, side, QUEEN_RAYS, moves)
+            else:
+                self._step_moves(sq, side, KING_TARGETS, moves)
+        if self.castling:
+            self._castling_moves(side, moves)
+        return moves
 
-        #One Square Forward
-        one_step_row = row + direction
-        one_step_sq = coords_to_square(one_step_row, col)
+    def _generate_legal_moves(self, side: int) -> list[int]:
+        #All moves that DO NOT leave the King in Check.
+        #Checkers and pinned pieces are worked out once per position, so no move is made
+        #and unmade to test it: a pinned piece may only move along its pin ray, in check
+        #a move must capture the checker or block it, and the king may not step onto an
+        #attacked square.
+        self.move_generations += 1
+        king = self.king_squares[side]
+        if king is None:
+            #no king to protect (hand-made positions): every pseudo-legal move is legal
+            return self._generate_pseudo_moves(side)
+
+        if self.bitboards is not None:
+            #the bitboards apply checks and pins to whole target sets (see bitboard.py)
+            legal_moves = self.bitboards.generate_legal_moves(side, self.ep_square)
+            if legal_moves is not None:
+                if self.ep_square is not None:
+                    legal_moves = [
+                        move for move in legal_moves
+                        if not move & MOVE_EN_PASSANT or self._is_legal_by_making(move, side)
+                    ]
+                if self.castling:
+                    self._castling_moves(side, legal_moves)
+                return legal_moves
+
+        checkers, block_squares, pins = self._checks_and_pins(king, side)
+        if checkers:
+            return self._generate_evasions(side, king, checkers, block_squares, pins)
+
+        safe_king_targets = self._safe_king_targets(king, side)
+        legal_moves = []
+        for move in self._generate_pseudo_moves(side):
+            from_sq = move & 127
+            if move & (MOVE_EN_PASSANT | MOVE_CASTLE):
+                #castling is generated fully checked; en passant removes two pawns from one
+                #rank, which the pin rays do not cover, so it is tried on the board
+                if move & MOVE_CASTLE or self._is_legal_by_making(move, side):
+                    legal_moves.append(move)
+            elif from_sq == king:
+                if (move >> 7) & 127 in safe_king_targets:
+                    legal_moves.append(move)
+            elif from_sq in pins:
+                if (move >> 7) & 127 in pins[from_sq]:
+                    legal_moves.append(move)
+            else:
+                legal_moves.append(move)
+        return legal_moves
+
+    def _generate_evasions(self, side: int, king: int, checkers: int, block_squares: set, pins: dict) -> list[int]:
+        #Check-evasion: king steps to safe squares; with a single checker other pieces may
+        #also capture it or interpose. Pinned pieces can never help against a check.
+        safe_king_targets = self._safe_king_targets(king, side)
+        if checkers > 1:
+            king_moves = []
+            self._step_moves(king, side, KING_TARGETS, king_moves)
+            return [move for move in king_moves if (move >> 7) & 127 in safe_king_targets]
+
+        legal_moves = []
+        for move in self._generate_pseudo_moves(side):
+            from_sq = move & 127
+            if from_sq == king:
+                if (move >> 7) & 127 in safe_king_targets:
+                    legal_moves.append(move)
+            elif move & MOVE_EN_PASSANT:
+                #may capture a checking pawn without landing on its square
+                if self._is_legal_by_making(move, side):
+                    legal_moves.append(move)
+            elif from_sq not in pins and (move >> 7) & 127 in block_squares:
+                legal_moves.append(move)
+        return legal_moves
+
+    def _is_legal_by_making(self, move: int, side: int) -> bool:
+        #slow path for the rare moves the pin/check analysis does not cover
+        captured = self._make(move)
+        legal = not self._in_check(side)
+        self._unmake(move, captured)
+        return legal
+
+    def _piece_pseudo_moves(self, sq: int, side: int, moves: list[int]) -> None:
+        #pseudo-legal moves of the piece of 'side' on sq (castling included for the king)
+        piece_type = self.squares[sq] & TYPE_MASK
+        if piece_type == PAWN:
+            self._pawn_moves(sq, side, moves)
+        elif piece_type == KNIGHT:
+            self._step_moves(sq, side, KNIGHT_TARGETS, moves)
+        elif piece_type == BISHOP:
+            self._slide_moves(sq, side, BISHOP_RAYS, moves)
+        elif piece_type == ROOK:
+            self._slide_moves(sq, side, ROOK_RAYS, moves)
+        elif piece_type == QUEEN:
+            self._slide_moves(sq, side, QUEEN_RAYS, moves)
+        elif piece_type == KING:
+            self._step_moves(sq, side, KING_TARGETS, moves)
+            if self.castling:
+                self._castling_moves(side, moves)
+
+    def _is_legal_move(self, move: int, side: int) -> bool:
+        #one move (from the table, the last PV or a client) checked on its own, without
+        #generating the rest: 'side' has a piece on its from-square that moves like that,
+        #and making it doesn't leave the king in check
+        from_sq = move & 127
+        piece = self.squares[from_sq]
+        if not piece or piece & COLOR_MASK != side:
+            return False
+        moves = []
+        self._piece_pseudo_moves(from_sq, side, moves)
+        return move in moves and self._is_legal_by_making(move, side)
+
+    def _has_legal_move(self, side: int) -> bool:
+        #stops at the first legal move instead of generating them all
+        squares = self.squares
+        for sq in SQUARES:
+            piece = squares[sq]
+            if piece and piece & COLOR_MASK == side:
+                moves = []
+                self._piece_pseudo_moves(sq, side, moves)
+                for move in moves:
+                    if self._is_legal_by_making(move, side):
+                        return True
+        return False
 
-        if one_step_sq and not self.board.get(one_step_sq):
-            moves.append((from_sq, one_step_sq))
+    def _pick_moves(self, side: int, ply: int, hash_move: int = 0, captures_only: bool = False):
+        #Staged move picker for the search: yields the legal moves of 'side' best-first, each
+        #stage only once the previous one is used up, so a cutoff early on skips the rest:
+        #  1. the hash move, checked on its own before anything is generated
+        #  2. captures and promotions by MVV-LVA (the only stage when captures_only)
+        #  3. this ply's killer moves
+        #  4. the other quiet moves by history score, sorted only now
+        #In check every evasion is generated and ordered at once.
+        if hash_move:
+            if self._is_legal_move(hash_move, side):
+                yield hash_move
+            else:
+                hash_move = 0
 
-            #Two Square forward(only when starting)
-            start_rank = 2 if color == 'w' else 7
-            if row == start_rank:
-                two_step_row = row + 2 * direction
-                two_step_sq = coords_to_square(two_step_row, col)
+        self.move_generations += 1
+        king = self.king_squares[side]
+        if king is None:
+            #no king to protect (hand-made positions): every pseudo-legal move is legal
+            king, checkers, pins = -1, 0, {}
+        else:
+            checkers, block_squares, pins = self._checks_and_pins(king, side)
+        if checkers:
+            moves = self._generate_evasions(side, king, checkers, block_squares, pins)
+            self._order_moves(moves, side, ply, hash_move)
+            for move in moves:
+                if move != hash_move:
+                    yield move
+            return
+
+        squares = self.squares
+        safe_king_targets = None
+
+        def is_legal(move: int) -> bool:
+            #as in _generate_legal_moves, for a position not in check
+            nonlocal safe_king_targets
+            from_sq = move & 127
+            if move & (MOVE_EN_PASSANT | MOVE_CASTLE):
+                return bool(move & MOVE_CASTLE) or self._is_legal_by_making(move, side)
+            if from_sq == king:
+                if safe_king_targets is None:
+                    safe_king_targets = self._safe_king_targets(king, side)
+                return (move >> 7) & 127 in safe_king_targets
+            if from_sq in pins:
+                return (move >> 7) & 127 in pins[from_sq]
+            return True
+
+        captures = []
+        quiets = []
+        for move in self._generate_pseudo_moves(side):
+            if move == hash_move:
+                continue
+            if squares[(move >> 7) & 127] or move & (MOVE_EN_PASSANT | PROMOTION_MASK):
+                captures.append(move)
+            else:
+                quiets.append(move)
+
+        captures = [move for move in captures if is_legal(move)]
+        self._order_moves(captures, side, ply)
+        yield from captures
+        if captures_only:
+            return
+
+        killers = self.killers[ply] if ply < len(self.killers) else ()
+        played_killers = []
+        for killer in killers:
+            if killer and killer != hash_move and killer in quiets and is_legal(killer):
+                played_killers.append(killer)
+                yield killer
+
+        quiets = [move for move in quiets if move not in played_killers and is_legal(move)]
+        self._order_moves(quiets, side, ply)
+        yield from quiets
+
+    def _checks_and_pins(self, king: int, side: int) -> tuple[int, set | None, dict]:
+        #Returns (number of checkers, squares that stop the check, pins).
+        #The stopping squares are the checker plus, for a slider, the squares between it
+        #and the king. pins maps each pinned piece to the squares it may still move to.
+        squares = self.squares
+        enemy = side ^ BLACK
+        enemy_queen = enemy | QUEEN
+        checkers = 0
+        block_squares = None
+        pins = {}
+
+        #walk the rays from the king: an enemy slider behind no own piece checks,
+        #behind exactly one own piece it pins that piece
+        for ray, slider_type in SLIDER_RAY_TABLE[king]:
+            enemy_slider = enemy | slider_type
+            candidate = None
+            for index, sq in enumerate(ray):
+                piece = squares[sq]
+                if not piece:
+                    continue
+                if piece & COLOR_MASK == side:
+                    if candidate is not None:
+                        break
+                    candidate = sq
+                else:
+                    if piece == enemy_slider or piece == enemy_queen:
+                        if candidate is None:
+                            checkers += 1
+                            block_squares = set(ray[:index + 1])
+                        else:
+                            pins[candidate] = set(ray[:index + 1])
+                    break
 
-                #Is square on board and empty
-                if two_step_sq and not self.board.get(two_step_sq):
-                    moves.append((from_sq, two_step_sq))
+        enemy_knight = enemy | KNIGHT
+        for sq in KNIGHT_TARGETS[king]:
+            if squares[sq] == enemy_knight:
+                checkers += 1
+                block_squares = {sq}
+
+        #an enemy pawn checks from the squares a pawn of 'side' on the king square would attack
+        enemy_pawn = enemy | PAWN
+        for sq in PAWN_ATTACK_SQUARES[side][king]:
+            if squares[sq] == enemy_pawn:
+                checkers += 1
+                block_squares = {sq}
+
+        return checkers, block_squares, pins
+
+    def _safe_king_targets(self, king: int, side: int) -> set:
+        #squares next to the king it can move to without being attacked; the king is lifted
+        #off the board first so sliders checking it also cover the squares behind it
+        squares = self.squares
+        enemy = side ^ BLACK
+        king_piece = squares[king]
+        squares[king] = EMPTY
+        if self.bitboards is not None:
+            self.bitboards.toggle_piece(king, king_piece)
+
+        targets = set()
+        for target in KING_TARGETS[king]:
+            target_piece = squares[target]
+            if (not target_piece or target_piece & COLOR_MASK == enemy) and not self._is_attacked(target, enemy):
+                targets.add(target)
+
+        squares[king] = king_piece
+        if self.bitboards is not None:
+            self.bitboards.toggle_piece(king, king_piece)
+        return targets
 
-        #Captures (Diagonal moves)
-        opponent_color = 'w' if color == 'b' else 'b'
+    def get_legal_moves(self, color: str) -> list[tuple[str, str]]:
+        #All moves that DO NOT leave the King in Check
+        return squares_to_moves(self._generate_legal_moves(SIDES[color]))
 
-        #check for capture on the left diagonal
-        left_col = col - 1
-        capture_row = row + direction
-        left_capture_sq = coords_to_square(capture_row, left_col)
+    def _pawn_moves(self, sq: int, side: int, moves: list[int]) -> None:
+        squares = self.squares
+        if side == WHITE: #pawns move up for white, down for black
+            direction, start_rank, last_rank, ep_rank = 16, 1, 7, 5
+        else:
+            direction, start_rank, last_rank, ep_rank = -16, 6, 0, 2
 
-        if left_capture_sq:
-            target_piece = self.board.get(left_capture_sq)
-            #check if target square has an oppent piece
-            if target_piece and target_piece[0] == opponent_color:
-                moves.append((from_sq, left_capture_sq))
+        #One Square Forward
+        one_step = sq + direction
+        promotes = one_step >> 4 == last_rank
+        if not one_step & 0x88 and not squares[one_step]:
+            if promotes:
+                for promotion in PROMOTION_TYPES:
+                    moves.append(sq | (one_step << 7) | (promotion << 14))
+            else:
+                moves.append(sq | (one_step << 7))
 
-        #check for capture on the right diagonal
-        right_col = col + 1
-        right_capture_sq = coords_to_square(capture_row, right_col)
+                #Two Square forward(only when starting)
+                two_step = one_step + direction
+                if sq >> 4 == start_rank and not squares[two_step]:
+                    moves.append(sq | (two_step << 7) | MOVE_DOUBLE_PUSH)
 
-        if right_capture_sq:
-            target_piece = self.board.get(right_capture_sq)
-            #check if target square has an oppent piece
-            if target_piece and target_piece[0] == opponent_color:
-                moves.append((from_sq, right_capture_sq))
+        #Captures (Diagonal moves)
+        for target in PAWN_ATTACK_SQUARES[side][sq]:
+            target_piece = squares[target]
+            if target_piece and target_piece & COLOR_MASK != side:
+                if promotes:
+                    for promotion in PROMOTION_TYPES:
+                        moves.append(sq | (target << 7) | (promotion << 14))
+                else:
+                    moves.append(sq | (target << 7))
+            #En Passant: the square the enemy pawn just skipped over
+            elif target == self.ep_square and target >> 4 == ep_rank:
+                moves.append(sq | (target << 7) | MOVE_EN_PASSANT)
+
+    def _castling_moves(self, side: int, moves: list[int]) -> None:
+        #king moves two squares towards a rook that has not moved: the squares between
+        #must be empty and the king may not start on, cross or land on an attacked square
+        squares = self.squares
+        enemy = side ^ BLACK
+        if side == WHITE:
+            king, kingside, queenside = 4, WHITE_KINGSIDE, WHITE_QUEENSIDE
+        else:
+            king, kingside, queenside = 116, BLACK_KINGSIDE, BLACK_QUEENSIDE
+        rook = side | ROOK
+        if squares[king] != side | KING or not self.castling & (kingside | queenside):
+            return
+        if self._is_attacked(king, enemy):
+            return
+
+        if (
+            self.castling & kingside
+            and not squares[king + 1] and not squares[king + 2] and squares[king + 3] == rook
+            and not self._is_attacked(king + 1, enemy) and not self._is_attacked(king + 2, enemy)
+        ):
+            moves.append(king | ((king + 2) << 7) | MOVE_CASTLE)
+        if (
+            self.castling & queenside
+            and not squares[king - 1] and not squares[king - 2] and not squares[king - 3]
+            and squares[king - 4] == rook
+            and not self._is_attacked(king - 1, enemy) and not self._is_attacked(king - 2, enemy)
+        ):
+            moves.append(king | ((king - 2) << 7) | MOVE_CASTLE)
+
+    def _step_moves(self, sq: int, side: int, targets: list, moves: list[int]) -> None:
+        #knight and king moves: one jump per target in the table (KNIGHT_TARGETS / KING_TARGETS)
+        squares = self.squares
+        for target in targets[sq]:
+            target_piece = squares[target]
+            #move is valid if the square is empty OR contains opponent's piece
+            if not target_piece or target_piece & COLOR_MASK != side:
+                moves.append(sq | (target << 7))
+
+    def _slide_moves(self, sq: int, side: int, rays: list, moves: list[int]) -> None:
+        #rook, bishop, queen: keep sliding along each ray of the table till a piece
+        squares = self.squares
+        for ray in rays[sq]:
+            for target in ray:
+                target_piece = squares[target]
+                if not target_piece:
+                    moves.append(sq | (target << 7))
+                    continue
+                #square is occupied: capture if its opponents's piece & stop sliding
+                if target_piece & COLOR_MASK != side:
+                    moves.append(sq | (target << 7))
+                break
 
-        #TODO: En Passant logic
+    def _piece_moves(self, from_sq: str, color: str, generate) -> list[tuple[str, str]]:
+        #wraps an internal generator for the square-name API below
+        moves = []
+        sq = SQUARE_INDEX.get(from_sq)
+        if sq is not None:
+            generate(sq, SIDES[color], moves)
+        return squares_to_moves(moves)
 
-        return moves
+    def get_pawn_moves(self, from_sq: str, color: str) -> list[tuple[str, str]]:
+        return self._piece_moves(from_sq, color, self._pawn_moves)
 
     #--Knight moves ----
     def get_knight_moves(self, from_sq: str, color: str) -> list[tuple[str, str]]:
-        moves = []
-        row, col = square_to_coords(from_sq)
-
-        #possible moves(row_change, col_change)
-        knight_deltas = [
-            (2, 1), (2, -1), (-2, 1), (-2, -1), (1, 2), (1, -2), (-1, 2), (-1, -2)
-        ]
-
-        opponent_color = 'w' if color == 'b' else 'b'
-
-        for d_row, d_col in knight_deltas:
-            target_row = row + d_row
-            target_col = col + d_col
-            target_sq = coords_to_square(target_row, target_col)
-
-            if target_sq:
-                target_piece = self.board.get(target_sq)
-
-                #move is valid if the square is empty OR contains opponent's piece
-                if not target_piece or target_piece[0] == opponent_color:
-                    moves.append((from_sq, target_sq))
-
-        return moves
+        return self._piece_moves(
+            from_sq, color, lambda sq, side, moves: self._step_moves(sq, side, KNIGHT_TARGETS, moves)
+        )
 
     #=== Rules for sliding pieces like rook, bishop, queen
     def get_directional_moves(self, from_sq: str, color: str, directions: list[tuple[int, int]]) -> list[tuple[str, str]]:
-        moves = []
-        row, col = square_to_coords(from_sq)
-        opponent_color = 'w' if color == 'b' else 'b'
-
-        #loop through each direction defined by piece
-        for d_row, d_col in directions:
-            current_row = row + d_row
-            current_col = col + d_col
-
-            #keep sliding till board edge
-            while 1 <= current_row <= 8 and 1 <= current_col <= 8:
-                target_sq = coords_to_square(current_row, current_col)
-                target_piece = self.board.get(target_sq)
-
-                if not target_piece:
-                    #square is empty ? add move and continue sliding
-                    moves.append((from_sq, target_sq))
-                    current_row += d_row
-                    current_col += d_col
-
-                else:
-                    #square is occupied: check if its opponents's piece
-                    if target_piece[0] == opponent_color:
-                        #capture & stop sliding
-                        moves.append((from_sq, target_sq))
-                    break
-        return moves
+        #directions are (d_row, d_col) pairs, e.g. (1, 0) is up the board
+        offsets = tuple(d_row * 16 + d_col for d_row, d_col in directions)
+        def generate(sq: int, side: int, moves: list[int]) -> None:
+            rays = {sq: tuple(ray for ray in (_ray(sq, offset) for offset in offsets) if ray)}
+            self._slide_moves(sq, side, rays, moves)
+        return self._piece_moves(from_sq, color, generate)
 
     #=== Rook moves ====
     def get_rook_moves(self, from_sq: str, color: str) -> list[tuple[str, str]]:
-        directions = [
-            (0, 1), (0, -1), #horizontal
-            (1, 0), (-1, 0) #vertical
-        ]
-        return self.get_directional_moves(from_sq, color, directions)
+        return self._piece_moves(
+            from_sq, color, lambda sq, side, moves: self._slide_moves(sq, side, ROOK_RAYS, moves)
+        )
 
     #=== Bishop moves ===
     def get_bishop_moves(self, from_sq: str, color: str) -> list[tuple[str, str]]:
-        directions = [
-            (1, 1), (1, -1),
-            (-1, 1), (-1, -1)
-        ]
-        return self.get_directional_moves(from_sq, color, directions)
+        return self._piece_moves(
+            from_sq, color, lambda sq, side, moves: self._slide_moves(sq, side, BISHOP_RAYS, moves)
+        )
 
     #=== Queen moves ===
     def get_queen_moves(self, from_sq: str, color: str) -> list[tuple[str, str]]:
-        #combines bishoop and rook moves
-        directions = [
-            (0, 1), (0, -1), (1, 0), (-1, 0), #Rook moves
-            (1, 1), (1, -1), (-1, 1), (-1, -1) #Bishop moves
-        ]
-        return self.get_directional_moves(from_sq, color, directions)
+        #combines bishop and rook moves
+        return self._piece_moves(
+            from_sq, color, lambda sq, side, moves: self._slide_moves(sq, side, QUEEN_RAYS, moves)
+        )
 
     def get_king_moves(self, from_sq: str, color: str) -> list[tuple[str, str]]:
-        moves = []
-        row, col = square_to_coords(from_sq)
-        opponent_color = 'w' if color == 'b' else 'b'
-
-        #King moves one step in all 8 directions
-        knight_deltas = [
-            (0, 1), (0, -1), (1, 0), (-1, 0),
-            (1, 1), (1, -1), (-1, 1), (-1, -1)
-        ]
-
-        for d_row, d_col in knight_deltas:
-            target_row = row + d_row
-            target_col = col + d_col
-            target_sq = coords_to_square(target_row, target_col)
-
-            if target_sq:
-                target_piece = self.board.get(target_sq)
-
-                #move is valid if square is empty or contains an opponent piece
-                if not target_piece or target_piece[0] == opponent_color:
-                    moves.append((from_sq, target_sq))
-        #TODO : CASTLING
-        return moves
-    
-    # ==== ATTACK DETECTION ==== #
+        def generate(sq: int, side: int, moves: list[int]) -> None:
+            self._step_moves(sq, side, KING_TARGETS, moves)
+            if self.castling:
+                self._castling_moves(side, moves)
+        return self._piece_moves(from_sq, color, generate)
 
-    def is_square_attacked(self, target_sq: str, by_color: str) -> bool:
-        #Determines if 'target_sq' is attacked by any piece of 'by_color'.
-        #Check 8 directions for sliding pieces and specific positions for King, Knight, and pawn.
-        opponent_king = 'k'
-        opponent_queen = 'q'
-        opponent_rook = 'r'
-        opponent_bishop = 'b'
-        opponent_knight = 'n'
-        opponent_pawn = 'p'
+    # ==== ATTACK DETECTION ==== #
 
-        #The pieces will have a prefix e.g. 'bk'
-        opponent_piece_code_prefix = by_color
+    def _is_attacked(self, target: int, by_side: int) -> bool:
+        #Determines if square 'target' is attacked by any piece of 'by_side'.
+        if self.bitboards is not None:
+            return self.bitboards.is_attacked(target, by_side)
 
-        target_row, target_col = square_to_coords(target_sq)
+        squares = self.squares
 
         # 1. Check for sliding pieces
-        #Directions: (d_row, d_col, piece_types_to_look_for)
-        sliding_checks = [
-            # Rook/queen directions (straight)
-            (0, 1, [opponent_rook, opponent_queen]), (0, -1, [opponent_rook, opponent_queen]),
-            (1, 0, [opponent_rook, opponent_queen]), (-1, 0, [opponent_rook, opponent_queen]),
-
-            # Bishop/Queen directions (diagonal)
-            (1, 1, [opponent_bishop, opponent_queen]), (1, -1, [opponent_bishop, opponent_queen]),
-            (-1, 1, [opponent_bishop, opponent_queen]), (-1, -1, [opponent_bishop, opponent_queen]),
-        ]
-
-        for d_row, d_col, piece_types in sliding_checks:
-            current_row = target_row + d_row
-            current_col = target_col + d_col
-
-            while 1 <= current_row <= 8 and 1 <= current_col <= 8:
-                current_sq = coords_to_square(current_row, current_col)
-                piece_code = self.board.get(current_sq)
-
-                if piece_code:
-                    # Found a piece! check if it's the attacking type
-                    if piece_code[0] == by_color and piece_code[1] in piece_types:
+        rook = by_side | ROOK
+        bishop = by_side | BISHOP
+        queen = by_side | QUEEN
+        for ray in ROOK_RAYS[target]:
+            for sq in ray:
+                piece = squares[sq]
+                if piece:
+                    if piece == rook or piece == queen:
                         return True
-
                     # Blocked by own piece or non-threathening opponent piece
                     break
-
-                #keep sliding
-                current_col += d_col
-                current_row += d_row
+        for ray in BISHOP_RAYS[target]:
+            for sq in ray:
+                piece = squares[sq]
+                if piece:
+                    if piece == bishop or piece == queen:
+                        return True
+                    break
 
         # 2. Check for Knight Attacks
-        knight_deltas = [
-            (2, 1), (2, -1), (-2, 1), (-2, -1),
-            (1, 2), (1, -2), (-1, 2), (-1, -2)
-        ]
-
-        for d_row, d_col in knight_deltas:
-            check_row = target_row + d_row
-            check_col = target_col + d_col
-            check_sq = coords_to_square(check_row, check_col)
-
-            if check_sq:
-                piece_code = self.board.get(check_sq)
-                if piece_code == opponent_piece_code_prefix + opponent_knight:
-                    return True
-
-        # 3. Check for Pawn Attacks(Reverse Movement)
-        pawn_direction = -1 if by_color == 'w' else 1 #pawns attack 'down for white', 'up' for black
-
-        for d_col in [-1, 1]: #check diagonals
-            check_row = target_row + pawn_direction
-            check_col = target_col + d_col
-            check_sq = coords_to_square(check_row, check_col)
-
-            if check_sq:
-                piece_code = self.board.get(check_sq)
-                if piece_code == opponent_piece_code_prefix + opponent_pawn:
-                    return True
+        knight = by_side | KNIGHT
+        for sq in KNIGHT_TARGETS[target]:
+            if squares[sq] == knight:
+                return True
+
+        # 3. Check for Pawn Attacks(Reverse Movement): a by_side pawn attacks 'target' from
+        #the squares a pawn of the other side on 'target' would attack
+        pawn = by_side | PAWN
+        for sq in PAWN_ATTACK_SQUARES[by_side ^ BLACK][target]:
+            if squares[sq] == pawn:
+                return True
 
         # 4. Check for King Attacks
-        king_deltas = [
-            (0, 1), (0, -1), (1, 0), (-1, 0),
-            (1, 1), (1, -1), (-1, 1), (-1, -1)
-        ]
+        king = by_side | KING
+        for sq in KING_TARGETS[target]:
+            if squares[sq] == king:
+                return True
 
-        for d_row, d_col in king_deltas:
-            check_row = target_row + d_row
-            check_col = target_col + d_col
-            check_sq = coords_to_square(check_row, check_col)
+        return False
 
-            if check_sq:
-                piece_code = self.board.get(check_sq)
-                if piece_code == opponent_piece_code_prefix + opponent_king:
-                    return True
+    def is_square_attacked(self, target_sq: str, by_color: str) -> bool:
+        #Determines if 'target_sq' is attacked by any piece of 'by_color'.
+        target = SQUARE_INDEX.get(target_sq)
+        if target is None:
+            return False
+        return self._is_attacked(target, SIDES[by_color])
 
-        return False
+    def _in_check(self, side: int) -> bool:
+        king = self.king_squares[side]
+
+        if king is None:
+            # Should only happen in end-game situations like checkmate/stalemate scenarios
+            # where the king might have been captured (though this engine doesn't track game over yet).
+            return False
+
+        #Check if the King's square is attacked by the opponent
+        return self._is_attacked(king, side ^ BLACK)
 
     def is_in_check(self, color: str) -> bool:
         #determines if the King of 'color' is under attack.
-        king_code = color + 'k'
-        king_sq = None
-        
-        # 1.Find the King's position
-        for sq, piece_code in self.board.items():
-            if piece_code == king_code:
-                king_sq = sq
-                break
+        return self._in_check(SIDES[color])
+
+    # ==== PERFT ==== #
+
+    def perft(self, depth: int, color: str | None = None) -> int:
+        #counts the leaf nodes of the legal move tree 'depth' plies deep (move generator check)
+        side = SIDES[color or self.side_to_move]
+        if depth == 0:
+            return 1
+        return self._perft(depth, side)
+
+    def _perft(self, depth: int, side: int) -> int:
+        moves = self._generate_legal_moves(side)
+        if depth == 1:
+            return len(moves)
+        nodes = 0
+        for move in moves:
+            captured = self._make(move)
+            nodes += self._perft(depth - 1, side ^ BLACK)
+            self._unmake(move, captured)
+        return nodes
+
+    def perft_divide(self, depth: int, color: str | None = None) -> dict[str, int]:
+        #perft split by root move ('e2e4' -> count), for locating a generator bug
+        side = SIDES[color or self.side_to_move]
+        counts = {}
+        for move in self._generate_legal_moves(side):
+            captured = self._make(move)
+            counts[move_to_uci(move)] = self._perft(depth - 1, side ^ BLACK) if depth > 1 else 1
+            self._unmake(move, captured)
+        return counts
 
-        if not king_sq:
-            # Should only happen in end-game situations like checkmate/stalemate scenarios 
-            # where the king might have been captured (though this engine doesn't track game over yet).
-            return False
-        
-        # 2.Check if the King's square is attacked by the opponent
-        opponent_color = 'w' if color == 'b' else 'b'
-        return self.is_square_attacked(king_sq, opponent_color)
-    
     # ==== GAME STATUS ===== #
 
     def process_move(self, from_sq: str, to_sq: str, color: str) -> dict:
-        
-        legal_moves = self.get_legal_moves(color)
-        
-        if (from_sq, to_sq) in legal_moves:
+        #only the requested move is checked, not the whole legal move list
+        from_idx = SQUARE_INDEX.get(from_sq)
+        to_idx = SQUARE_INDEX.get(to_sq)
+        side = SIDES[color]
+        legal = (
+            from_idx is not None and to_idx is not None
+            and self.squares[from_idx] and self.squares[from_idx] & COLOR_MASK == side
+            and self._is_legal_move(self._move_from_squares(from_idx, to_idx), side)
+        )
+
+        if legal:
             # Move is valid, execute it permanently
             captured = self.make_move(from_sq, to_sq)
-            
+
             # Determine the state of the opponent after this move
             opponent_color = 'b' if color == 'w' else 'w'
             status = self.get_game_status(opponent_color)
-            
+
             return {
                 "success": True,
                 "captured": captured,
                 "new_status": status # 'check', 'checkmate', 'stalemate', or 'normal'
             }
-        
+
         return {"success": False, "message": "Illegal move for " + color}
 
     # Define the state of the Game for a Specific Player.
     def get_game_status(self, color: str) -> str:
-        in_check = self.is_in_check(color)
-        legal_moves = self.get_legal_moves(color)
+        side = SIDES[color]
+        in_check = self._in_check(side)
 
-        if not legal_moves:
+        if not self._has_legal_move(side):
             if in_check:
                 return "checkmate"
             return "stalemate"
-        
+
         if in_check:
             return "check"
-        
+
         return "normal"
-    
+
     # ===== AI ===== #
-    
+
     #Game Logic (move execution, evaluation)
     def evaluate(self) -> float:
-        score = 0
-        for piece_code in self.board.values():
-            if piece_code:
-                color = 1 if piece_code[0] == 'b' else - 1
-                piece_type = piece_code[1]
-                score += color * piece_values.get(piece_type, 0)
-
-        return score
-    
-    #--- Core Algorithm(Minimax, Find Best move)
-    def minimax(self, depth: int, maximizing_player: bool) -> float:
-        
+        #material + piece-square tables, positive favours black.
+        #Reads the running totals kept by make/unmake and blends the middlegame and
+        #endgame scores by how much material is left (tapered evaluation).
+        phase = min(self.phase, TOTAL_PHASE)
+        return (self.mg_score * phase + self.eg_score * (TOTAL_PHASE - phase)) // TOTAL_PHASE
+
+    def _side_eval(self, side: int) -> int:
+        #evaluate() from the point of view of 'side' (negamax convention)
+        self.leaf_evals += 1
+        score = self.evaluate()
+        return score if side == BLACK else -score
+
+    # ==== MOVE ORDERING ==== #
+
+    def _order_moves(self, moves: list[int], side: int, ply: int, hash_move: int = 0) -> None:
+        #sorts moves best-first in place: the transposition table's move,
+        #captures by MVV-LVA, then this ply's killer moves, then quiet moves by history score
+        squares = self.squares
+        killers = self.killers[ply] if ply < len(self.killers) else ()
+        history = self.history
+        history_base = side << 11
+
+        def order_key(move: int) -> int:
+            if move == hash_move:
+                return HASH_MOVE_ORDER
+            victim = squares[(move >> 7) & 127]
+            if move & MOVE_EN_PASSANT:
+                victim = PAWN
+            promotion = (move >> 14) & 7
+            if victim or promotion:
+                #most valuable victim first, least valuable attacker breaks ties;
+                #promotions count the piece they gain
+                gain = PIECE_VALUES[victim] + PIECE_VALUES[promotion]
+                return CAPTURE_ORDER + gain * 8 - (squares[move & 127] & TYPE_MASK)
+            if move in killers:
+                return KILLER_ORDER - killers.index(move)
+            return history[history_base | (move & 0x3FFF)]
+
+        moves.sort(key=order_key, reverse=True)
+
+    def _store_cutoff(self, move: int, side: int, depth: int, ply: int) -> None:
+        #records a quiet move that caused a beta cutoff
+        if ply < len(self.killers):
+            killers = self.killers[ply]
+            if killers[0] != move:
+                killers[1] = killers[0]
+                killers[0] = move
+        self.history[(side << 11) | (move & 0x3FFF)] += depth * depth
+
+    def tt_stats(self) -> dict:
+        #transposition table counters (hit rate, fill, replacements) for sizing the table
+        return self.tt.stats()
+
+    def _reset_ordering(self) -> None:
+        self.killers = [[0, 0] for _ in range(MAX_PLY)]
+        self.history = [0] * 32768
+
+    #--- Core Algorithm(Alpha-Beta, Find Best move)
+    def alpha_beta(self, depth: int, alpha: int, beta: int, side: int, ply: int) -> int:
+        #negamax alpha-beta (fail-soft); scores are from the point of view of 'side'
+        #at the horizon the capture sequences still in progress are played out first
         if depth == 0:
-            return self.evaluate()
-
-        current_color = 'b' if maximizing_player else 'w'
-        legal_moves = self.get_legal_moves(current_color)
-
-        if not legal_moves:
-            return self.evaluate()
-
-        if maximizing_player:
-            max_eval = float('-inf')
-            for from_sq, to_sq in legal_moves:
-                captured_piece = self.make_move(from_sq, to_sq)
-
-                eval = self.minimax(depth - 1, False)
-
-                self.undo_move(from_sq, to_sq, captured_piece)
-                max_eval = max(max_eval, eval)
-            return max_eval
+            return self.quiescence(alpha, beta, side, ply)
+
+        self.nodes += 1
+        self._pv_table[ply] = ()
+
+        #time / node budget: once exceeded, every node returns at once and the
+        #iteration in progress is thrown away by find_best_move
+        if self.nodes >= self._node_limit or (
+            not self.nodes % TIME_CHECK_INTERVAL and time.perf_counter() >= self._deadline
+        ):
+            self.stopped = True
+        if self.stopped:
+            return 0
+
+        #Transposition table: reuse a deep enough result, else at least its best move
+        key = self.hash ^ ZOBRIST_BLACK_TO_MOVE if side == BLACK else self.hash
+        entry = self.tt.probe(key)
+        hash_move = 0
+        if entry is not None:
+            entry_depth, entry_score, bound, hash_move = entry
+            if entry_depth >= depth:
+                if bound == EXACT:
+                    return entry_score
+                if bound == LOWER and entry_score >= beta:
+                    return entry_score
+                if bound == UPPER and entry_score <= alpha:
+                    return entry_score
+
+        #while still on the previous iteration's principal variation, its move goes first
+        if self._follow_pv:
+            if ply < len(self._previous_pv) and self._is_legal_move(self._previous_pv[ply], side):
+                hash_move = self._previous_pv[ply]
+            else:
+                self._follow_pv = False
+
+        original_alpha = alpha
+        best_score = -INFINITY
+        best_move = 0
+        #moves come from the staged picker: a cutoff stops it before the later stages
+        for move in self._pick_moves(side, ply, hash_move):
+            captured = self._make(move)
+
+            score = -self.alpha_beta(depth - 1, -beta, -alpha, side ^ BLACK, ply + 1)
+
+            self._unmake(move, captured)
+            self._follow_pv = False
+
+            if self.stopped:
+                return 0
+
+            if score > best_score:
+                best_score = score
+                best_move = move
+                if score > alpha:
+                    alpha = score
+                    self._pv_table[ply] = (move,) + self._pv_table[ply + 1]
+                    if score >= beta:
+                        self.cutoffs += 1
+                        if not captured:
+                            self._store_cutoff(move, side, depth, ply)
+                        break
+
+        if best_score == -INFINITY:
+            #no legal moves
+            score = self._side_eval(side)
+            self.tt.store(key, depth, score, EXACT, 0)
+            return score
+
+        if best_score >= beta:
+            bound = LOWER
+        elif best_score <= original_alpha:
+            bound = UPPER
+            best_move = hash_move
+        else:
+            bound = EXACT
+        self.tt.store(key, depth, best_score, bound, best_move)
+        return best_score
+
+    def quiescence(self, alpha: int, beta: int, side: int, ply: int) -> int:
+        #Searches captures (and promotions) only, until the position is quiet, so the static
+        #evaluation is never taken halfway through an exchange. 'side' may stand pat, i.e.
+        #keep the static score instead of capturing, unless it is in check, in which case
+        #every evasion is searched.
+        self.nodes += 1
+        self._pv_table[ply] = ()
+
+        if self.nodes >= self._node_limit or (
+            not self.nodes % TIME_CHECK_INTERVAL and time.perf_counter() >= self._deadline
+        ):
+            self.stopped = True
+        if self.stopped:
+            return 0
+
+        #checked before generating moves: out of check, a position without moves
+        #(stalemate) scores the static evaluation anyway, as in alpha_beta
+        stand_pat = self._side_eval(side)
+        in_check = self._in_check(side)
+        if ply >= MAX_PLY or (not in_check and stand_pat >= beta):
+            return stand_pat
+
+        squares = self.squares
+        if in_check:
+            best_score = -INFINITY
+        else:
+            if stand_pat > alpha:
+                alpha = stand_pat
+            best_score = stand_pat
+
+        #captures and promotions by MVV-LVA, or every evasion when in check
+        for move in self._pick_moves(side, MAX_PLY, captures_only=not in_check):
+            if best_score > -INFINITY:
+                #Delta pruning: not even the captured piece plus a margin reaches alpha
+                victim = PAWN if move & MOVE_EN_PASSANT else squares[(move >> 7) & 127]
+                gain = PIECE_VALUES[victim] + PIECE_VALUES[(move >> 14) & 7]
+                if stand_pat + gain + DELTA_MARGIN <= alpha:
+                    continue
+
+            captured = self._make(move)
+            score = -self.quiescence(-beta, -alpha, side ^ BLACK, ply + 1)
+            self._unmake(move, captured)
+
+            if self.stopped:
+                return 0
+
+            if score > best_score:
+                best_score = score
+                if score > alpha:
+                    alpha = score
+                    if score >= beta:
+                        self.cutoffs += 1
+                        break
+
+        if best_score == -INFINITY:
+            #checkmated: scored like any position without moves
+            return stand_pat
+        return best_score
 
+    def minimax(self, depth: int, maximizing_player: bool) -> float:
+        #minimax value of the position (positive favours black), computed with alpha-beta
+        side = BLACK if maximizing_player else WHITE
+        score = self.alpha_beta(depth, -INFINITY, INFINITY, side, 0)
+        return score if maximizing_player else -score
+
+    def _search_root(self, side: int, depth: int, root_moves: list[int]) -> tuple[int | None, int]:
+        #one fixed-depth alpha-beta iteration over root_moves (given in the fixed tie-break order)
+        #returns (best move, score for 'side'); best move is None if the budget ran out
+        ordered = list(root_moves)
+        if self._previous_pv:
+            hash_move = self._previous_pv[0]
         else:
-            min_eval = float('inf')
-            for from_sq, to_sq in legal_moves:
-                captured_piece = self.make_move(from_sq, to_sq)
+            entry = self.tt.probe(self.hash ^ ZOBRIST_BLACK_TO_MOVE if side == BLACK else self.hash)
+            hash_move = entry[3] if entry else 0
+        self._order_moves(ordered, side, 0, hash_move)
+        root_index = {move: index for index, move in enumerate(root_moves)}
+        self._follow_pv = bool(self._previous_pv)
 
-                eval = self.minimax(depth - 1, True)
+        best_move = None
+        best_index = len(root_moves)
+        best_score = -INFINITY
+        best_line = []
 
-                self.undo_move(from_sq, to_sq, captured_piece)
-                min_eval = min(min_eval, eval)
-            return min_eval
+        for move in ordered:
+            index = root_index[move]
+            #A move earlier in the fixed order also wins ties, so its window starts one below
+            #the best score. This keeps the choice identical to a full-width minimax.
+            lower = best_score - 1 if index < best_index else best_score
+            if best_move is None:
+                lower = -INFINITY
 
-    def find_best_move(self, ai_color: str) -> tuple[str, str]:
-        #initiates the minimax search and returns best move
-        maximizing_player = ai_color == 'b'
-        current_color = ai_color
+            captured = self._make(move)
 
-        best_move = None
-        best_eval = float('-inf') if maximizing_player else float('inf')
+            score = -self.alpha_beta(depth - 1, -INFINITY, -lower, side ^ BLACK, 1)
 
-        ai_legal_moves = self.get_legal_moves(current_color)
+            self._unmake(move, captured)
+            self._follow_pv = False
 
-        for from_sq, to_sq in ai_legal_moves:
-            captured_piece = self.make_move(from_sq, to_sq)
+            if self.stopped:
+                return None, 0
 
-            eval = self.minimax(
-                search_depth -1,
-                not maximizing_player
+            #check if move is better than current best
+            if score > lower:
+                best_score = score
+                best_move = move
+                best_index = index
+                best_line = [move, *self._pv_table[1]]
+
+        self.principal_variation = best_line
+        root_key = self.hash ^ ZOBRIST_BLACK_TO_MOVE if side == BLACK else self.hash
+        self.tt.store(root_key, depth, best_score, EXACT, best_move)
+        return best_move, best_score
+
+    def book_move(self, side: int) -> int:
+        #the most played legal book move in this position, 0 when out of book
+        if self.opening_book is None:
+            return 0
+        entries = self.opening_book.probe(self.book_key(side))
+        if not entries:
+            return 0
+        legal_moves = set(self._generate_legal_moves(side))
+        best_move = 0
+        best_weight = 0
+        for move, weight in entries:
+            if move in legal_moves and weight > best_weight:
+                best_move = move
+                best_weight = weight
+        return best_move
+
+    def result_cache_key(self, side: int, budget: tuple) -> str:
+        #full position key (castling, en passant and side to move included) + search budget
+        key = self.hash ^ ZOBRIST_BLACK_TO_MOVE if side == BLACK else self.hash
+        return self.result_cache.make_key(key, budget)
+
+    def cached_move(self, side: int, budget: tuple) -> int:
+        #a legal move stored in the result cache for this position and budget, 0 if none;
+        #the legality check guards against key collisions
+        if self.result_cache is None:
+            return 0
+        entry = self.result_cache.get(self.result_cache_key(side, budget))
+        if entry is None or not self._is_legal_move(entry[0], side):
+            return 0
+        move, self.best_score, self.completed_depth = entry
+        self.principal_variation = [move]
+        return move
+
+    def find_best_move(
+        self,
+        ai_color: str,
+        time_limit: float | None = None,
+        node_limit: int | None = None,
+        max_depth: int | None = None,
+    ) -> tuple[str, str]:
+        #runs the search below and fills self.stats with what it did;
+        #positions already in the result cache are answered from it without searching
+        side = SIDES[ai_color]
+        if max_depth is None:
+            max_depth = search_depth if time_limit is None and node_limit is None else MAX_SEARCH_DEPTH
+        budget = (max_depth, time_limit, node_limit)
+
+        self.stats = SearchStats()
+        self.nodes = 0
+        self.leaf_evals = 0
+        self.move_generations = 0
+        self.cutoffs = 0
+
+        cached_move = self.cached_move(side, budget)
+        if cached_move:
+            self.stats.cache_hit = True
+            self.stats.completed_depth = self.completed_depth
+            self.stats.move_generations = self.move_generations
+            self.stats.finish()
+            cached_move = move_to_squares(cached_move)
+            print(f"AI Cached move: {cached_move}")
+            return cached_move
+
+        tt_probes = self.tt.probes
+        tt_hits = self.tt.hits
+        profiler = HotPathProfiler() if self.profile else None
+        if profiler is not None:
+            profiler.attach(self)
+        try:
+            best_move = self._iterative_deepening(ai_color, time_limit, node_limit, max_depth)
+        finally:
+            if profiler is not None:
+                profiler.detach()
+                self.stats.profile = profiler.report()
+
+        if self.result_cache is not None and best_move[0] is not None and not self.stats.book_move:
+            self.result_cache.put(
+                self.result_cache_key(side, budget),
+                self.principal_variation[0], self.best_score, self.completed_depth,
             )
-            self.undo_move(from_sq, to_sq, captured_piece)
 
-            #check if move is better than current best
-            if maximizing_player:
-                if eval > best_eval:
-                    best_eval = eval
-                    best_move = (from_sq, to_sq)
-            else:
-                if eval < best_eval:
-                    best_eval = eval
-                    best_move = (from_sq, to_sq)
+        stats = self.stats
+        stats.nodes = self.nodes
+        stats.leaf_evals = self.leaf_evals
+        stats.move_generations = self.move_generations
+        stats.cutoffs = self.cutoffs
+        stats.tt_probes = self.tt.probes - tt_probes
+        stats.tt_hits = self.tt.hits - tt_hits
+        stats.finish()
+        return best_move
+
+    def _iterative_deepening(
+        self,
+        ai_color: str,
+        time_limit: float | None,
+        node_limit: int | None,
+        max_depth: int,
+    ) -> tuple[str, str]:
+        #Iterative deepening driver: searches depth 1, 2, ... max_depth and returns the best move
+        #of the last iteration that completed. time_limit (seconds) and node_limit are checked
+        #inside the search; depth 1 always completes so there is always a move to play.
+        #Without any limit find_best_move passes search_depth, which makes this a single
+        #fixed-depth search.
+        side = SIDES[ai_color]
+
+        #known opening positions are answered from the book without searching
+        book_move = self.book_move(side)
+        if book_move:
+            self.completed_depth = 0
+            self.principal_variation = [book_move]
+            self.stats.book_move = True
+            book_move = move_to_squares(book_move)
+            print(f"AI Book move: {book_move}")
+            return book_move
+
+        self._reset_ordering()
+        self.tt.new_search()
+        self.stopped = False
+        self.completed_depth = 0
+        self.principal_variation = []
+        self._previous_pv = ()
+        self._deadline = float('inf')
+        self._node_limit = INFINITY
+        start_time = time.perf_counter()
+
+        #root moves in a fixed order so both move generators break ties the same way
+        ai_legal_moves = sorted(self._generate_legal_moves(side))
+        if not ai_legal_moves:
+            return (None, None)
+
+        best_move = None
+        best_score = 0
+        for depth in range(1, max(max_depth, 1) + 1):
+            move, score = self._search_root(side, depth, ai_legal_moves)
+            if move is None:
+                break
+            best_move, best_score = move, score
+            self.completed_depth = depth
+            self.stats.record_depth(depth, self.nodes)
+            self._previous_pv = tuple(self.principal_variation)
+            if self.on_iteration is not None:
+                self.on_iteration(depth, move, score)
+
+            #the budget starts counting once there is a move to fall back on
+            if time_limit is not None:
+                self._deadline = start_time + time_limit
+                if time.perf_counter() >= self._deadline:
+                    break
+            if node_limit is not None:
+                self._node_limit = node_limit
+                if self.nodes >= node_limit:
+                    break
 
-        if best_move:
-            print(f"AI Best move found(Minimax): {best_move} with Eval: {best_eval}")
-        return best_move if best_move else (None, None)
+        if best_move is not None:
+            self.best_score = best_score
+            best_eval = best_score if side == BLACK else -best_score
+            best_move = move_to_squares(best_move)
+            print(f"AI Best move found(Alpha-Beta): {best_move} with Eval: {best_eval} "
+                  f"(depth {self.completed_depth}, {self.nodes} nodes)")
+            return best_move
+        return (None, None)
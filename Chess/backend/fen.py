@@ -0,0 +1,112 @@
+#FEN support
+#Forsyth-Edwards Notation in and out of ChessEngine, e.g. the starting position is
+#'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1'.
+from chess_engine import ChessEngine, PIECE_CODES, SQUARE_INDEX, columns
+
+STARTING_FEN = 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1'
+
+# === Utility Functions === #
+def parse_fen(fen: str) -> dict:
+    #splits a FEN string into the board_state dict and the game-state fields.
+    #The move counters are optional, as in many EPD files.
+    if not isinstance(fen, str):
+        raise ValueError(f"FEN must be a string, got {type(fen).__name__}")
+    fields = fen.split()
+    if len(fields) < 4:
+        raise ValueError(f"FEN needs at least 4 fields: {fen!r}")
+    placement, side_to_move, castling, en_passant = fields[:4]
+
+    ranks = placement.split('/')
+    if len(ranks) != 8:
+        raise ValueError(f"FEN placement needs 8 ranks: {placement!r}")
+
+    board_state = {}
+    for rank_index, rank in enumerate(ranks):
+        row = 8 - rank_index #FEN lists rank 8 first
+        col = 0
+        for char in rank:
+            if char.isdigit():
+                col += int(char)
+                continue
+            if char.lower() not in 'pnbrqk' or col >= 8:
+                raise ValueError(f"Invalid FEN rank: {rank!r}")
+            color = 'w' if char.isupper() else 'b'
+            board_state[columns[col] + str(row)] = color + char.lower()
+            col += 1
+        if col != 8:
+            raise ValueError(f"FEN rank does not cover 8 files: {rank!r}")
+
+    if side_to_move not in ('w', 'b'):
+        raise ValueError(f"Invalid side to move: {side_to_move!r}")
+    if castling != '-' and (not castling or any(char not in 'KQkq' for char in castling)):
+        raise ValueError(f"Invalid castling rights: {castling!r}")
+    if en_passant != '-' and en_passant not in SQUARE_INDEX:
+        raise ValueError(f"Invalid en passant square: {en_passant!r}")
+
+    return {
+        "board_state": board_state,
+        "side_to_move": side_to_move,
+        "castling": castling,
+        "en_passant": None if en_passant == '-' else en_passant,
+        "halfmove_clock": int(fields[4]) if len(fields) > 4 else 0,
+        "fullmove_number": int(fields[5]) if len(fields) > 5 else 1,
+    }
+
+def engine_from_fen(fen: str, **engine_options) -> ChessEngine:
+    #builds a ChessEngine from a FEN string; engine_options go to the constructor
+    parsed = parse_fen(fen)
+    engine = ChessEngine(
+        parsed["board_state"],
+        castling_rights=parsed["castling"],
+        en_passant=parsed["en_passant"],
+        **engine_options,
+    )
+    engine.side_to_move = parsed["side_to_move"]
+    engine.halfmove_clock = parsed["halfmove_clock"]
+    engine.fullmove_number = parsed["fullmove_number"]
+    return engine
+
+def check_board_state(board_state) -> None:
+    #ValueError unless board_state is a {'e2': 'wp', ...} dict; empty squares may be left out or None
+    if not isinstance(board_state, dict):
+        raise ValueError(f"boardState must be an object, got {type(board_state).__name__}")
+    for square_id, piece_code in board_state.items():
+        if not piece_code:
+            continue
+        if square_id not in SQUARE_INDEX:
+            raise ValueError(f"Invalid square in board state: {square_id!r}")
+        if not isinstance(piece_code, str) or piece_code not in PIECE_CODES:
+            raise ValueError(f"Invalid piece code on {square_id}: {piece_code!r}")
+
+def board_to_fen_placement(board_state: dict) -> str:
+    #the first FEN field for a {'e2': 'wp', ...} dict
+    ranks = []
+    for row in range(8, 0, -1):
+        rank = ''
+        empty = 0
+        for col in columns:
+            piece_code = board_state.get(col + str(row))
+            if not piece_code:
+                empty += 1
+                continue
+            if empty:
+                rank += str(empty)
+                empty = 0
+            rank += piece_code[1].upper() if piece_code[0] == 'w' else piece_code[1]
+        if empty:
+            rank += str(empty)
+        ranks.append(rank)
+    return '/'.join(ranks)
+
+def engine_to_fen(engine: ChessEngine, side_to_move: str | None = None) -> str:
+    #serializes the engine's current position; side_to_move defaults to engine.side_to_move
+    castling = engine.castling_string()
+    en_passant = engine.en_passant_square() or '-'
+    return ' '.join((
+        board_to_fen_placement(engine.to_board_state()),
+        side_to_move or engine.side_to_move,
+        castling,
+        en_passant,
+        str(engine.halfmove_clock),
+        str(engine.fullmove_number),
+    ))
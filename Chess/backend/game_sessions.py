@@ -0,0 +1,95 @@
+#Game sessions
+#Keeps one ChessEngine per game between requests, so a client sends single moves instead of
+#the whole board and the engine's transposition table stays warm from one move to the next.
+#The store is bounded: sessions idle for longer than the TTL are dropped, and when it is full
+#the least recently used session makes room for a new one.
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from chess_engine import ChessEngine
+
+#===== Constants =====#
+DEFAULT_MAX_SESSIONS = 64
+DEFAULT_TTL_SECONDS = 30 * 60
+#transposition table of each game's engine: a game's searches store a few thousand entries, so
+#2 MB (131,072 entries) keeps them all while 64 games stay around 128 MB
+DEFAULT_SESSION_TT_MEGABYTES = 2
+
+#Game session class
+class GameSession:
+    def __init__(self, engine: ChessEngine):
+        self.id = uuid.uuid4().hex
+        self.engine = engine
+        #one request at a time per game: the engine is not safe to share mid-search
+        self.lock = threading.Lock()
+        self.last_used = time.monotonic()
+        #a Ponderer (see pondering.py) when the game searches on the opponent's time
+        self.ponderer = None
+
+    def close(self) -> None:
+        #called when the session leaves the store
+        if self.ponderer is not None:
+            self.ponderer.stop()
+
+#Session store class
+class SessionStore:
+    def __init__(
+        self,
+        max_sessions: int = DEFAULT_MAX_SESSIONS,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+        tt_megabytes: float = DEFAULT_SESSION_TT_MEGABYTES,
+    ):
+        #tt_megabytes is the transposition table size to give the engines of new games
+        if max_sessions < 1:
+            raise ValueError(f"max_sessions must be at least 1: {max_sessions}")
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self.tt_megabytes = tt_megabytes
+        #least recently used first
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def create(self, engine: ChessEngine) -> GameSession:
+        session = GameSession(engine)
+        with self._lock:
+            self._evict_expired(session.last_used)
+            while len(self._sessions) >= self.max_sessions:
+                self._sessions.popitem(last=False)[1].close()
+                self.evictions += 1
+            self._sessions[session.id] = session
+        return session
+
+    def get(self, session_id: str) -> GameSession | None:
+        #the session, marked as just used, or None if it never existed or has expired
+        now = time.monotonic()
+        with self._lock:
+            self._evict_expired(now)
+            session = self._sessions.get(session_id)
+            if session is None:
+                return None
+            session.last_used = now
+            self._sessions.move_to_end(session_id)
+            return session
+
+    def remove(self, session_id: str) -> bool:
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+        if session is None:
+            return False
+        session.close()
+        return True
+
+    def _evict_expired(self, now: float) -> None:
+        #the least recently used sessions come first, so stop at the first live one
+        while self._sessions:
+            session = next(iter(self._sessions.values()))
+            if now - session.last_used <= self.ttl_seconds:
+                break
+            self._sessions.popitem(last=False)[1].close()
+            self.evictions += 1
@@ -0,0 +1,145 @@
+#Opening book
+#Known opening moves stored offline in a compact binary file, so early-game positions are
+#answered with a lookup instead of a search.
+#File layout: an 8-byte magic, then fixed 16-byte records (position key, packed move, weight)
+#sorted by key and move. The file is memory-mapped and binary-searched in place: nothing is
+#read into Python objects except the records that match, and every process that opens the
+#same book shares its pages through the OS cache.
+#
+#Build the book from a text file of opening lines in long algebraic notation:
+#    python opening_book.py build openings.txt opening_book.bin --plies 16
+import argparse
+import mmap
+import os
+import struct
+import sys
+
+from chess_engine import BLACK, SIDES, move_to_uci
+from fen import STARTING_FEN, engine_from_fen
+
+#===== Constants =====#
+BOOK_MAGIC = b'CHESSBK1'
+RECORD = struct.Struct('<QIH2x') #key, move, weight (+2 padding bytes)
+DEFAULT_BOOK_PLIES = 16
+DEFAULT_BOOK_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'opening_book.bin')
+MAX_WEIGHT = 0xFFFF
+
+#Opening book class
+class OpeningBook:
+    def __init__(self, path: str):
+        with open(path, 'rb') as book_file:
+            self._map = mmap.mmap(book_file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._map[:len(BOOK_MAGIC)] != BOOK_MAGIC:
+            self._map.close()
+            raise ValueError(f"Not an opening book: {path}")
+        self.path = path
+        self._count = (len(self._map) - len(BOOK_MAGIC)) // RECORD.size
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _record(self, index: int) -> tuple[int, int, int]:
+        return RECORD.unpack_from(self._map, len(BOOK_MAGIC) + index * RECORD.size)
+
+    def probe(self, key: int) -> list[tuple[int, int]]:
+        #(move, weight) for every book move from the position with this key
+        #lower-bound binary search over the mapped records
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            if self._record(middle)[0] < key:
+                low = middle + 1
+            else:
+                high = middle
+
+        entries = []
+        while low < self._count:
+            record_key, move, weight = self._record(low)
+            if record_key != key:
+                break
+            entries.append((move, weight))
+            low += 1
+        return entries
+
+    def close(self) -> None:
+        self._map.close()
+
+#one mapping per book file and process
+_open_books = {}
+
+def open_book(path: str = DEFAULT_BOOK_PATH) -> OpeningBook:
+    path = os.path.abspath(path)
+    if path not in _open_books:
+        _open_books[path] = OpeningBook(path)
+    return _open_books[path]
+
+# === Building === #
+def read_lines(path: str) -> list[list[str]]:
+    #one opening line per text line, moves separated by spaces; '#' starts a comment
+    lines = []
+    with open(path) as lines_file:
+        for text in lines_file:
+            moves = text.split('#', 1)[0].split()
+            if moves:
+                lines.append(moves)
+    return lines
+
+def build_records(lines: list[list[str]], plies: int = DEFAULT_BOOK_PLIES) -> list[tuple[int, int, int]]:
+    #(key, move, weight) records sorted for the book file;
+    #a move's weight is the number of lines that play it from that position
+    weights = {}
+    for line_number, line in enumerate(lines, 1):
+        engine = engine_from_fen(STARTING_FEN, tt_megabytes=1)
+        side = SIDES['w']
+        for uci in line[:plies]:
+            legal = {move_to_uci(move): move for move in engine._generate_legal_moves(side)}
+            if uci not in legal:
+                raise ValueError(f"Line {line_number}: illegal move {uci!r}")
+            move = legal[uci]
+            key = engine.book_key(side)
+            weights[key, move] = weights.get((key, move), 0) + 1
+            engine._make(move)
+            side ^= BLACK
+
+    return sorted((key, move, min(weight, MAX_WEIGHT)) for (key, move), weight in weights.items())
+
+def write_book(records: list[tuple[int, int, int]], path: str) -> None:
+    with open(path, 'wb') as book_file:
+        book_file.write(BOOK_MAGIC)
+        for record in records:
+            book_file.write(RECORD.pack(*record))
+
+# === Command Line === #
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Build or query the opening book.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build = commands.add_parser("build", help="build a book file from opening lines")
+    build.add_argument("lines", help="text file with one line of moves (e.g. 'e2e4 e7e5') per row")
+    build.add_argument("book", nargs="?", default=DEFAULT_BOOK_PATH, help="output book file")
+    build.add_argument("--plies", type=int, default=DEFAULT_BOOK_PLIES,
+                       help="moves of each line to keep (default %(default)s)")
+
+    probe = commands.add_parser("probe", help="list the book moves for a position")
+    probe.add_argument("fen", nargs="?", default=STARTING_FEN)
+    probe.add_argument("--book", default=DEFAULT_BOOK_PATH)
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        records = build_records(read_lines(args.lines), args.plies)
+        write_book(records, args.book)
+        print(f"Wrote {len(records)} positions/moves to {args.book}")
+        return 0
+
+    engine = engine_from_fen(args.fen, tt_megabytes=1)
+    side = SIDES[engine.side_to_move]
+    entries = open_book(args.book).probe(engine.book_key(side))
+    if not entries:
+        print("Position not in book")
+        return 1
+    for move, weight in sorted(entries, key=lambda entry: -entry[1]):
+        print(f"{move_to_uci(move):6} {weight}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,185 @@
+#Parallel root search
+#Splits the root moves of a search over a pool of worker processes.
+#Each worker keeps one warm ChessEngine, transposition table included, for its whole life. The
+#best-ordered root move is scored first; the others then run in parallel with that score (minus
+#one) as their lower bound, so every move that could win or tie still gets an exact score. The
+#merge is deterministic for a given set of scores: highest score wins, ties go to the earliest
+#move in the engine's fixed root order, as in the single-core search. A time limit is honoured
+#the way ChessEngine.find_best_move does it: depth by depth, keeping the last finished one.
+#
+#Limitations: since the workers' tables outlive their tasks, a score can use a deeper result
+#left by an earlier task, so which worker ran which move can, rarely, change the move picked.
+#Splitting only at the root also means each move is searched without the bounds its elder
+#brothers would have set, so the pool does 2-3x the nodes of one engine and only pays off with
+#many workers.
+import itertools
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from chess_engine import ChessEngine, INFINITY, BLACK, SIDES, move_to_squares, search_depth
+from fen import parse_fen, engine_to_fen
+from search_stats import SearchStats
+
+#===== Worker side =====#
+_worker_engine = None
+#the search the worker's engine last worked on
+_worker_search = None
+
+def _init_worker(tt_megabytes: float) -> None:
+    #runs once per worker process: build the engine that every task reuses
+    global _worker_engine
+    _worker_engine = ChessEngine({}, tt_megabytes=tt_megabytes)
+
+def _score_root_move(
+    fen: str, move: int, depth: int, lower: int = -INFINITY,
+    search_id: int | None = None, deadline: float | None = None,
+) -> tuple[int, int | None, tuple]:
+    #Score of 'move' from the root side's point of view, plus the search counters; exact when
+    #above 'lower', otherwise only an upper bound. None if the search passed 'deadline' (wall
+    #clock, time.time()) first. The transposition table and move ordering are kept from task
+    #to task and only aged when a new search_id comes in.
+    global _worker_search
+    engine = _worker_engine
+    parsed = parse_fen(fen)
+    engine.set_board_state(parsed["board_state"], parsed["castling"], parsed["en_passant"])
+    side = SIDES[parsed["side_to_move"]]
+    if search_id is None or search_id != _worker_search:
+        _worker_search = search_id
+        engine.tt.new_search()
+        engine._reset_ordering()
+
+    engine.nodes = 0
+    engine.leaf_evals = 0
+    engine.move_generations = 0
+    engine.cutoffs = 0
+    engine.stopped = False
+    #the deadline is wall-clock time so it means the same in every process
+    engine._deadline = float('inf') if deadline is None else time.perf_counter() + deadline - time.time()
+    tt_probes = engine.tt.probes
+    tt_hits = engine.tt.hits
+    captured = engine._make(move)
+    score = -engine.alpha_beta(depth - 1, -INFINITY, -lower, side ^ BLACK, 1)
+    engine._unmake(move, captured)
+    engine._deadline = float('inf')
+    counters = (
+        engine.nodes, engine.leaf_evals, engine.move_generations, engine.cutoffs,
+        engine.tt.probes - tt_probes, engine.tt.hits - tt_hits,
+    )
+    return move, None if engine.stopped else score, counters
+
+#Root search pool
+class RootSearchPool:
+    def __init__(self, workers: int | None = None, tt_megabytes: float = 4):
+        #workers defaults to the number of CPU cores; the processes start once and stay warm
+        self.workers = workers or os.cpu_count() or 1
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=_init_worker,
+            initargs=(tt_megabytes,),
+        )
+        self.stats = SearchStats()
+        #tells the workers when a new search starts
+        self._search_ids = itertools.count(1)
+
+    def find_best_move(
+        self, engine: ChessEngine, ai_color: str, depth: int | None = None, time_limit: float | None = None,
+    ) -> tuple[str, str]:
+        #Same contract as ChessEngine.find_best_move with a depth (search_depth by default) and an
+        #optional time limit. Without one, only 'depth' is searched. With one, depths 1, 2, ...
+        #are searched in turn, the previous best move going first, until 'depth' or the time runs
+        #out, and the move of the last finished depth is played (depth 1 always finishes).
+        #The summed worker counters end up in self.stats and engine.stats.
+        depth = depth or search_depth
+        side = SIDES[ai_color]
+        stats = self.stats = engine.stats = SearchStats()
+        book_move = engine.book_move(side)
+        if book_move:
+            stats.book_move = True
+            stats.finish()
+            return move_to_squares(book_move)
+        #results share the engine's result cache entries for the same budget
+        budget = (depth, time_limit, None)
+        cached_move = engine.cached_move(side, budget)
+        if cached_move:
+            stats.cache_hit = True
+            stats.completed_depth = engine.completed_depth
+            stats.finish()
+            return move_to_squares(cached_move)
+
+        root_moves = sorted(engine._generate_legal_moves(side))
+        if not root_moves:
+            stats.finish()
+            return (None, None)
+
+        fen = engine_to_fen(engine, ai_color)
+        ordered = list(root_moves)
+        engine._order_moves(ordered, side, 0)
+        search_id = next(self._search_ids)
+        deadline = time.time() + time_limit if time_limit is not None else None
+
+        best_move = None
+        best_score = 0
+        completed_depth = 0
+        for current_depth in range(1 if time_limit is not None else depth, depth + 1):
+            #the budget starts counting once there is a move to fall back on
+            scores = self._search_depth(fen, ordered, current_depth, search_id, deadline if best_move else None)
+            if scores is None:
+                break
+            #deterministic merge: best score, then the fixed root order
+            best_move = max(root_moves, key=lambda move: (scores[move], -root_moves.index(move)))
+            best_score = scores[best_move]
+            completed_depth = current_depth
+            stats.record_depth(current_depth, stats.nodes)
+            ordered.remove(best_move)
+            ordered.insert(0, best_move)
+            if deadline is not None and time.time() >= deadline:
+                break
+        stats.finish()
+
+        engine.completed_depth = completed_depth
+        if engine.result_cache is not None:
+            engine.result_cache.put(engine.result_cache_key(side, budget), best_move, best_score, completed_depth)
+        best_eval = best_score if side == BLACK else -best_score
+        best_move = move_to_squares(best_move)
+        print(f"AI Best move found(Parallel Alpha-Beta, {self.workers} workers): {best_move} "
+              f"with Eval: {best_eval} (depth {completed_depth}, {stats.nodes} nodes)")
+        return best_move
+
+    def _search_depth(self, fen: str, ordered: list, depth: int, search_id: int, deadline: float | None) -> dict | None:
+        #move -> score for every root move at 'depth', or None if the deadline stopped it
+        #the eldest brother is searched on its own and gives the bound for the rest
+        first_move, first_score, counters = self.executor.submit(
+            _score_root_move, fen, ordered[0], depth, -INFINITY, search_id, deadline
+        ).result()
+        self._add_counters(counters)
+        if first_score is None:
+            return None
+        scores = {first_move: first_score}
+        futures = [
+            self.executor.submit(_score_root_move, fen, move, depth, first_score - 1, search_id, deadline)
+            for move in ordered[1:]
+        ]
+        for future in futures:
+            move, score, counters = future.result()
+            self._add_counters(counters)
+            if score is None:
+                #out of time: what hasn't started yet is dropped
+                for pending in futures:
+                    pending.cancel()
+                return None
+            scores[move] = score
+        return scores
+
+    def _add_counters(self, counters: tuple) -> None:
+        stats = self.stats
+        nodes, leaf_evals, move_generations, cutoffs, tt_probes, tt_hits = counters
+        stats.nodes += nodes
+        stats.leaf_evals += leaf_evals
+        stats.move_generations += move_generations
+        stats.cutoffs += cutoffs
+        stats.tt_probes += tt_probes
+        stats.tt_hits += tt_hits
+
+    def shutdown(self) -> None:
+        self.executor.shutdown(cancel_futures=True)
@@ -0,0 +1,90 @@
+#Perft: move generator validation and benchmark
+#Counts leaf nodes of the legal move tree for standard test positions and compares
+#them with the published numbers, reporting nodes/sec for each run.
+#
+#   python perft.py                       # all positions, up to depth 3
+#   python perft.py --depth 4 --generator bitboard
+#   python perft.py --fen "<fen>" --depth 3 --divide
+import argparse
+import sys
+import time
+
+from chess_engine import MOVE_GENERATORS
+from fen import STARTING_FEN, engine_from_fen
+
+#(name, FEN, leaf counts for depth 1, 2, 3, ...)
+PERFT_POSITIONS = [
+    ("start", STARTING_FEN,
+     [20, 400, 8902, 197281, 4865609]),
+    ("kiwipete", "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+     [48, 2039, 97862, 4085603]),
+    ("endgame", "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1",
+     [14, 191, 2812, 43238, 674624]),
+    ("promotions", "r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1",
+     [6, 264, 9467, 422333]),
+    ("talkchess", "rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8",
+     [44, 1486, 62379, 2103487]),
+    ("middlegame", "r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10",
+     [46, 2079, 89890, 3894594]),
+]
+
+def run_perft(fen: str, depth: int, move_generator: str = 'mailbox') -> tuple[int, float]:
+    #returns (leaf nodes, seconds)
+    engine = engine_from_fen(fen, move_generator=move_generator, tt_megabytes=0.01)
+    start = time.perf_counter()
+    nodes = engine.perft(depth)
+    return nodes, time.perf_counter() - start
+
+def run_benchmark(max_depth: int = 3, move_generator: str = 'mailbox', positions: list = PERFT_POSITIONS) -> list[dict]:
+    #runs every position up to max_depth (or its last known count) and checks the counts
+    results = []
+    for name, fen, expected_counts in positions:
+        for depth in range(1, min(max_depth, len(expected_counts)) + 1):
+            nodes, seconds = run_perft(fen, depth, move_generator)
+            result = {
+                "position": name,
+                "depth": depth,
+                "nodes": nodes,
+                "expected": expected_counts[depth - 1],
+                "ok": nodes == expected_counts[depth - 1],
+                "seconds": seconds,
+                "nodes_per_second": nodes / seconds if seconds else 0.0,
+            }
+            results.append(result)
+            print(f"{name:<11} depth {depth}  {nodes:>9} nodes  {'ok' if result['ok'] else 'MISMATCH (expected ' + str(result['expected']) + ')'}"
+                  f"  {seconds:7.2f}s  {result['nodes_per_second']:>9.0f} nodes/s")
+    return results
+
+def print_divide(fen: str, depth: int, move_generator: str = 'mailbox') -> None:
+    engine = engine_from_fen(fen, move_generator=move_generator, tt_megabytes=0.01)
+    counts = engine.perft_divide(depth)
+    for move, nodes in sorted(counts.items()):
+        print(f"{move}: {nodes}")
+    print(f"\nMoves: {len(counts)}\nNodes: {sum(counts.values())}")
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Perft validation and benchmark for ChessEngine")
+    parser.add_argument("--depth", type=int, default=3)
+    parser.add_argument("--generator", choices=MOVE_GENERATORS, default='mailbox')
+    parser.add_argument("--fen", help="run a single position instead of the standard suite")
+    parser.add_argument("--divide", action="store_true", help="split the count by root move")
+    args = parser.parse_args()
+
+    if args.fen:
+        if args.divide:
+            print_divide(args.fen, args.depth, args.generator)
+        else:
+            nodes, seconds = run_perft(args.fen, args.depth, args.generator)
+            print(f"depth {args.depth}: {nodes} nodes in {seconds:.2f}s ({nodes / max(seconds, 1e-9):.0f} nodes/s)")
+        return 0
+
+    results = run_benchmark(args.depth, args.generator)
+    total_nodes = sum(result["nodes"] for result in results)
+    total_seconds = sum(result["seconds"] for result in results)
+    failures = [result for result in results if not result["ok"]]
+    print(f"\nTotal: {total_nodes} nodes in {total_seconds:.2f}s ({total_nodes / max(total_seconds, 1e-9):.0f} nodes/s), "
+          f"{len(failures)} mismatches")
+    return 1 if failures else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,190 @@
+#Pondering
+#Searches on the opponent's time. After the engine has replied, a background thread assumes the
+#opponent answers with the reply the search expected and searches the position after it, on its
+#own board but into the game engine's transposition table. If the opponent then plays that move
+#(a ponder hit) the answer is ready, or the search just carries on until it is; any other move
+#(a miss) stops the thread, and only the table entries it stored are left behind.
+#A ponder thread holds the GIL of the process serving requests, so at most max_ponderers (see
+#limit_ponderers) search at once, the oldest being stopped to make room, and stop_ponderers stops
+#them when a request for another game comes in.
+import threading
+
+from chess_engine import ChessEngine, SIDES, BLACK, ZOBRIST_BLACK_TO_MOVE, search_depth, move_to_squares
+
+#===== Constants =====#
+#a ponder search stops by itself at this depth, so an idle opponent doesn't burn CPU forever
+DEFAULT_PONDER_DEPTH = search_depth + 2
+#how many games may ponder at the same time
+DEFAULT_MAX_PONDERERS = 1
+
+#ponderers whose search is running, oldest first
+_running = []
+_running_lock = threading.Lock()
+_max_running = DEFAULT_MAX_PONDERERS
+
+def limit_ponderers(count: int) -> None:
+    #at most count ponder searches run at once (0: none)
+    global _max_running
+    _max_running = max(count, 0)
+    _make_room()
+
+def stop_ponderers(keep: 'Ponderer | None' = None) -> None:
+    #stops every running ponder search but keep's
+    with _running_lock:
+        others = [ponderer for ponderer in _running if ponderer is not keep]
+    for ponderer in others:
+        ponderer.stop()
+
+def _make_room(keep: 'Ponderer | None' = None) -> None:
+    #stops the oldest ponder searches (never keep's) until at most _max_running are left
+    with _running_lock:
+        excess = [ponderer for ponderer in _running if ponderer is not keep]
+        excess = excess[:max(len(_running) - _max_running, 0)]
+    for ponderer in excess:
+        ponderer.stop()
+
+#Ponderer class
+class Ponderer:
+    def __init__(self, engine: ChessEngine, max_depth: int = DEFAULT_PONDER_DEPTH):
+        #engine is the game's engine; it is never searched here, ponder_move only hands it the
+        #pondered result
+        self.engine = engine
+        self.max_depth = max_depth
+        self._ponder_engine = ChessEngine(
+            {}, opening_book=engine.opening_book, profile=engine.profile, transposition_table=engine.tt
+        )
+        self._ponder_engine.on_iteration = self._iteration_done
+        self._condition = threading.Condition()
+        #held while the thread is started or stopped, which other games' requests may do too
+        self._lock = threading.RLock()
+        self._thread = None
+        self._finished = False
+        self._completed_depth = 0
+        #hash of the position being pondered (the game after the expected reply)
+        self._position_hash = None
+        self.expected_move = 0
+        self.hit = False
+        self.stats = None
+
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def active(self) -> bool:
+        return self._thread is not None
+
+    def start(self, ai_color: str) -> bool:
+        #Starts pondering for the engine playing ai_color, with the opponent to move in the game.
+        #False when there is no reply to expect, or when no game may ponder.
+        self.stop()
+        if _max_running == 0:
+            return False
+        with self._lock:
+            engine = self.engine
+            expected_move = self._expected_reply(SIDES[engine.side_to_move])
+            if not expected_move:
+                return False
+
+            ponder_engine = self._ponder_engine
+            ponder_engine.set_board_state(engine.to_board_state(), engine.castling_string(), engine.en_passant_square())
+            ponder_engine._make(expected_move)
+            self._position_hash = ponder_engine.hash
+            self.expected_move = expected_move
+            self.hit = False
+            self.stats = None
+            self._finished = False
+            self._completed_depth = 0
+            with _running_lock:
+                _running.append(self)
+            self._thread = threading.Thread(target=self._ponder, args=(ai_color,), daemon=True)
+            self._thread.start()
+        #outside self._lock: another game starting at the same time may be stopping this one
+        _make_room(self)
+        return True
+
+    def _expected_reply(self, side: int) -> int:
+        #the second move of the last search's principal variation, else the book's or the table's
+        #move for this position; 0 when none is a legal move here
+        engine = self.engine
+        legal_moves = engine._generate_legal_moves(side)
+        line = engine.principal_variation
+        if len(line) > 1 and line[1] in legal_moves:
+            return line[1]
+        book_move = engine.book_move(side)
+        if book_move:
+            return book_move
+        entry = engine.tt.probe(engine.hash ^ ZOBRIST_BLACK_TO_MOVE if side == BLACK else engine.hash)
+        if entry and entry[3] in legal_moves:
+            return entry[3]
+        return 0
+
+    def _ponder(self, ai_color: str) -> None:
+        try:
+            self._ponder_engine.find_best_move(ai_color, max_depth=self.max_depth)
+        finally:
+            _forget(self)
+            with self._condition:
+                self._finished = True
+                self._condition.notify_all()
+
+    def _iteration_done(self, depth: int, move: int, score: int) -> None:
+        #runs on the ponder thread after every completed iteration
+        with self._condition:
+            self._completed_depth = depth
+            self._condition.notify_all()
+
+    def opponent_moved(self) -> bool:
+        #Call after the opponent's move has been made in the game. On a hit the search keeps
+        #going; on a miss it is stopped. True on a hit.
+        if self._thread is None:
+            return False
+        if self.engine.hash == self._position_hash:
+            self.hit = True
+            self.hits += 1
+            return True
+        self.misses += 1
+        self.stop()
+        return False
+
+    def ponder_move(self, min_depth: int = search_depth, timeout: float | None = None) -> tuple[str, str] | None:
+        #After a hit: the pondered best move once the search has completed min_depth (or ended),
+        #stopping it there, with its stats in self.stats; after 'timeout' seconds, that of the
+        #deepest iteration finished by then. None without a hit or a move.
+        if not self.hit:
+            self.stop()
+            return None
+        with self._condition:
+            self._condition.wait_for(lambda: self._finished or self._completed_depth >= min_depth, timeout)
+        self.stop()
+
+        ponder_engine = self._ponder_engine
+        if not ponder_engine.principal_variation:
+            return None
+        self.stats = ponder_engine.stats
+        self.stats.ponder_hit = True
+        #the game engine's line predicts the next reply to ponder on
+        engine = self.engine
+        engine.principal_variation = list(ponder_engine.principal_variation)
+        engine.completed_depth = ponder_engine.completed_depth
+        engine.best_score = ponder_engine.best_score
+        return move_to_squares(ponder_engine.principal_variation[0])
+
+    def stop(self) -> None:
+        #stops and joins the ponder thread; the table keeps what it stored
+        with self._lock:
+            thread = self._thread
+            if thread is None:
+                return
+            #the search clears 'stopped' when it starts, so keep setting it until the thread ends
+            while thread.is_alive():
+                self._ponder_engine.stopped = True
+                thread.join(0.01)
+            self._thread = None
+            self.hit = False
+        _forget(self)
+
+def _forget(ponderer: Ponderer) -> None:
+    #ponderer's search is no longer running
+    with _running_lock:
+        if ponderer in _running:
+            _running.remove(ponderer)
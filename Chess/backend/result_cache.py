@@ -0,0 +1,150 @@
+#Result cache
+#Best moves of positions already analysed, keyed by the full Zobrist key (placement, castling,
+#en passant, side to move) and the search budget, so a repeated request skips the search.
+#The first tier is an in-process LRU dict with a TTL. An optional SQLite file behind it is shared
+#by every process that opens the same path (Flask workers, job workers), so one process's
+#result serves all of them.
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+#===== Constants =====#
+DEFAULT_MAX_ENTRIES = 4096
+DEFAULT_TTL_SECONDS = 60 * 60
+#the disk tier keeps this many times more entries than memory
+DISK_ENTRIES_FACTOR = 16
+
+#Result cache class
+class ResultCache:
+    def __init__(
+        self,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+        path: str | None = None,
+    ):
+        if max_entries < 1:
+            raise ValueError(f"max_entries must be at least 1: {max_entries}")
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.path = path
+        #key -> (move, score, depth, stored at), least recently used first
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+
+        self._db = None
+        if path:
+            self._db = sqlite3.connect(path, timeout=5, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                "key TEXT PRIMARY KEY, move INTEGER, score INTEGER, depth INTEGER, stored REAL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS results_stored ON results (stored)")
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    @staticmethod
+    def make_key(position_key: int, budget: tuple) -> str:
+        #position_key already includes the side to move; budget is (depth, time limit, node limit)
+        return f"{position_key:016x}:" + ':'.join('-' if limit is None else str(limit) for limit in budget)
+
+    # ==== LOOKUP / STORE ==== #
+
+    def get(self, key: str) -> tuple[int, int, int] | None:
+        #(move, score, depth) or None
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if now - entry[3] <= self.ttl_seconds:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[:3]
+                del self._entries[key]
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT move, score, depth, stored FROM results WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None and now - row[3] <= self.ttl_seconds:
+                    self._remember(key, row)
+                    self.hits += 1
+                    self.disk_hits += 1
+                    return row[:3]
+
+            self.misses += 1
+            return None
+
+    def put(self, key: str, move: int, score: int, depth: int) -> None:
+        entry = (move, score, depth, time.time())
+        with self._lock:
+            self.stores += 1
+            self._remember(key, entry)
+            if self._db is not None:
+                self._db.execute("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)", (key, *entry))
+                #keep the file bounded: expired rows, then the oldest beyond the limit
+                if self.stores % 256 == 0:
+                    self._trim_disk(entry[3])
+
+    def _remember(self, key: str, entry: tuple) -> None:
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _trim_disk(self, now: float) -> None:
+        self._db.execute("DELETE FROM results WHERE stored < ?", (now - self.ttl_seconds,))
+        self._db.execute(
+            "DELETE FROM results WHERE key IN "
+            "(SELECT key FROM results ORDER BY stored DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries * DISK_ENTRIES_FACTOR,),
+        )
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM results")
+
+    def close(self) -> None:
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    # ==== STATS ==== #
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hit_rate, 4),
+            "stores": self.stores,
+            "evictions": self.evictions,
+            "path": self.path,
+        }
+
+def cache_from_environment() -> ResultCache:
+    #CHESS_CACHE_ENTRIES / CHESS_CACHE_TTL size the cache, CHESS_RESULT_CACHE names the shared file
+    return ResultCache(
+        int(os.environ.get('CHESS_CACHE_ENTRIES', DEFAULT_MAX_ENTRIES)),
+        float(os.environ.get('CHESS_CACHE_TTL', DEFAULT_TTL_SECONDS)),
+        os.environ.get('CHESS_RESULT_CACHE') or None,
+    )
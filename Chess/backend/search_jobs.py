@@ -0,0 +1,178 @@
+#Search jobs
+#Runs AI searches on a fixed pool of worker processes so request threads never search
+#themselves: a submitted position gets a job id straight away and the client polls or streams
+#the result. Admission control keeps at most max_pending jobs queued or running; past that,
+#submit raises JobQueueFull and the caller is expected to back off.
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, wait
+
+from chess_engine import ChessEngine, move_to_uci
+from fen import parse_fen
+from search_stats import SearchStats
+from result_cache import cache_from_environment
+
+#===== Constants =====#
+DEFAULT_MAX_PENDING_PER_WORKER = 4
+RESULT_TTL_SECONDS = 5 * 60
+MAX_FINISHED_JOBS = 1024
+
+#job states
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+class JobQueueFull(Exception):
+    pass
+
+#===== Worker side =====#
+_worker_engine = None
+
+def _init_worker(tt_megabytes: float, book_path: str | None, profile: bool) -> None:
+    #runs once per worker process; the engine and its transposition table serve every job.
+    #The result cache follows the CHESS_RESULT_CACHE settings, so with a file configured
+    #the workers and the web process share their results.
+    global _worker_engine
+    opening_book = None
+    if book_path and os.path.exists(book_path):
+        from opening_book import open_book
+        opening_book = open_book(book_path)
+    _worker_engine = ChessEngine(
+        {}, tt_megabytes=tt_megabytes, opening_book=opening_book, profile=profile,
+        result_cache=cache_from_environment(),
+    )
+
+def _run_search(fen: str, ai_color: str, time_limit: float | None, max_depth: int | None) -> dict:
+    engine = _worker_engine
+    parsed = parse_fen(fen)
+    engine.set_board_state(parsed["board_state"], parsed["castling"], parsed["en_passant"])
+    engine.side_to_move = ai_color
+
+    from_sq, to_sq = engine.find_best_move(ai_color, time_limit=time_limit, max_depth=max_depth)
+    book_move = engine.stats.book_move
+    return {
+        "from_square": from_sq,
+        "to_square": to_sq,
+        "piece_code": engine.board.get(from_sq) if from_sq else None,
+        #the move in UCI notation, the search score for ai_color (none for book moves),
+        #the depth it completed and the line it expects
+        "best_move": move_to_uci(engine.principal_variation[0]) if from_sq else None,
+        "score": engine.best_score if from_sq and not book_move else None,
+        "depth": engine.completed_depth,
+        "pv": [move_to_uci(move) for move in engine.principal_variation] if from_sq else [],
+        "isWhiteInCheck": engine.is_in_check('w'),
+        "isBlackInCheck": engine.is_in_check('b'),
+        "stats": engine.stats.to_dict(),
+    }
+
+#Search job class
+class SearchJob:
+    def __init__(self, future):
+        self.id = uuid.uuid4().hex
+        self.future = future
+        self.submitted = time.monotonic()
+        self.finished = None
+
+    @property
+    def state(self) -> str:
+        future = self.future
+        if future.cancelled():
+            return CANCELLED
+        if future.done():
+            return FAILED if future.exception() is not None else DONE
+        return RUNNING if future.running() else QUEUED
+
+    def to_dict(self) -> dict:
+        job = {"jobId": self.id, "status": self.state}
+        if job["status"] == DONE:
+            job["result"] = self.future.result()
+        elif job["status"] == FAILED:
+            job["message"] = str(self.future.exception())
+        return job
+
+#Search job queue class
+class SearchJobQueue:
+    def __init__(
+        self,
+        workers: int | None = None,
+        max_pending: int | None = None,
+        tt_megabytes: float = 16,
+        book_path: str | None = None,
+        profile: bool = False,
+        on_finished=None,
+    ):
+        #workers defaults to the number of CPU cores, max_pending to a few jobs per worker;
+        #on_finished(stats: SearchStats) is called for every search that completes
+        self.workers = workers or os.cpu_count() or 1
+        self.max_pending = max_pending or self.workers * DEFAULT_MAX_PENDING_PER_WORKER
+        self.on_finished = on_finished
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=_init_worker,
+            initargs=(tt_megabytes, book_path, profile),
+        )
+        self._jobs = OrderedDict()
+        self._pending = 0
+        self._lock = threading.Lock()
+        self.rejected = 0
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def submit(self, fen: str, ai_color: str, time_limit: float | None = None, max_depth: int | None = None) -> SearchJob:
+        with self._lock:
+            self._forget_finished()
+            if self._pending >= self.max_pending:
+                self.rejected += 1
+                raise JobQueueFull(f"{self._pending} searches pending (limit {self.max_pending})")
+            self._pending += 1
+        try:
+            future = self.executor.submit(_run_search, fen, ai_color, time_limit, max_depth)
+        except Exception:
+            with self._lock:
+                self._pending -= 1
+            raise
+        job = SearchJob(future)
+        with self._lock:
+            self._jobs[job.id] = job
+        future.add_done_callback(lambda _: self._finish(job))
+        return job
+
+    def get(self, job_id: str) -> SearchJob | None:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def wait(self, job: SearchJob, timeout: float) -> bool:
+        #blocks up to 'timeout' seconds for the job; True once it has finished
+        done, _ = wait([job.future], timeout=timeout)
+        return bool(done)
+
+    def cancel(self, job: SearchJob) -> bool:
+        #only a job still waiting for a worker can be cancelled
+        return job.future.cancel()
+
+    def _finish(self, job: SearchJob) -> None:
+        #runs on the executor's thread when a job completes, fails or is cancelled
+        job.finished = time.monotonic()
+        with self._lock:
+            self._pending -= 1
+        if self.on_finished is not None and job.state == DONE:
+            self.on_finished(SearchStats.from_dict(job.future.result()["stats"]))
+
+    def _forget_finished(self) -> None:
+        #drops results nobody collected within RESULT_TTL_SECONDS, and the oldest
+        #finished jobs beyond MAX_FINISHED_JOBS
+        now = time.monotonic()
+        finished = [job for job in self._jobs.values() if job.finished is not None]
+        for index, job in enumerate(finished):
+            if now - job.finished > RESULT_TTL_SECONDS or len(finished) - index > MAX_FINISHED_JOBS:
+                del self._jobs[job.id]
+
+    def shutdown(self) -> None:
+        self.executor.shutdown(cancel_futures=True)
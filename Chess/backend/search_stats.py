@@ -0,0 +1,198 @@
+#Search statistics
+#What one find_best_move call did: node and evaluation counts, cutoffs, transposition table
+#hits and the time and nodes spent on every completed iteration. SearchMetrics adds the
+#results of many searches up for a metrics endpoint, and HotPathProfiler times individual
+#engine methods while it is attached.
+import threading
+import time
+from functools import wraps
+
+#Search stats class
+class SearchStats:
+    def __init__(self):
+        self.nodes = 0
+        self.leaf_evals = 0
+        self.move_generations = 0
+        self.cutoffs = 0
+        self.tt_probes = 0
+        self.tt_hits = 0
+        self.completed_depth = 0
+        self.book_move = False
+        self.cache_hit = False
+        #answered by the search pondered on the opponent's time
+        self.ponder_hit = False
+        self.elapsed = 0.0
+        #one (depth, nodes, seconds) per completed iteration, all cumulative since the start
+        self.depths = []
+        self.profile = None
+        self._start = time.perf_counter()
+
+    def record_depth(self, depth: int, nodes: int) -> None:
+        self.completed_depth = depth
+        self.depths.append((depth, nodes, time.perf_counter() - self._start))
+
+    def finish(self) -> None:
+        self.elapsed = time.perf_counter() - self._start
+
+    @property
+    def nodes_per_second(self) -> float:
+        return self.nodes / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def tt_hit_rate(self) -> float:
+        return self.tt_hits / self.tt_probes if self.tt_probes else 0.0
+
+    @property
+    def effective_branching_factor(self) -> float:
+        #growth of the tree from the second-last to the last completed iteration
+        if len(self.depths) < 2:
+            return 0.0
+        before_previous = self.depths[-3][1] if len(self.depths) > 2 else 0
+        previous_nodes = self.depths[-2][1] - before_previous
+        last_nodes = self.depths[-1][1] - self.depths[-2][1]
+        return last_nodes / previous_nodes if previous_nodes else 0.0
+
+    def to_dict(self) -> dict:
+        stats = {
+            "nodes": self.nodes,
+            "leaf_evals": self.leaf_evals,
+            "move_generations": self.move_generations,
+            "cutoffs": self.cutoffs,
+            "tt_probes": self.tt_probes,
+            "tt_hits": self.tt_hits,
+            "tt_hit_rate": round(self.tt_hit_rate, 4),
+            "completed_depth": self.completed_depth,
+            "book_move": self.book_move,
+            "cache_hit": self.cache_hit,
+            "ponder_hit": self.ponder_hit,
+            "effective_branching_factor": round(self.effective_branching_factor, 2),
+            "time_per_depth": [
+                {"depth": depth, "nodes": nodes, "seconds": round(seconds, 4)}
+                for depth, nodes, seconds in self.depths
+            ],
+            "seconds": round(self.elapsed, 4),
+            "nodes_per_second": round(self.nodes_per_second),
+        }
+        if self.profile is not None:
+            stats["profile"] = self.profile
+        return stats
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'SearchStats':
+        #rebuilds the stats of a search run in another process from its to_dict()
+        stats = cls()
+        for name in ("nodes", "leaf_evals", "move_generations", "cutoffs", "tt_probes", "tt_hits",
+                     "completed_depth", "book_move", "cache_hit", "ponder_hit"):
+            setattr(stats, name, data[name])
+        stats.depths = [(depth["depth"], depth["nodes"], depth["seconds"]) for depth in data["time_per_depth"]]
+        stats.elapsed = data["seconds"]
+        stats.profile = data.get("profile")
+        return stats
+
+#Search metrics class
+class SearchMetrics:
+    #running totals over many searches, rendered in the Prometheus text format; record() is
+    #called from request, job and ponder threads, so the totals are only touched under a lock
+    COUNTERS = ("nodes", "leaf_evals", "move_generations", "cutoffs", "tt_probes", "tt_hits")
+
+    def __init__(self, prefix: str = 'chess_search'):
+        self.prefix = prefix
+        self.searches = 0
+        self.book_moves = 0
+        self.cache_hits = 0
+        self.ponder_hits = 0
+        self.seconds = 0.0
+        self.totals = dict.fromkeys(self.COUNTERS, 0)
+        self._lock = threading.Lock()
+
+    def record(self, stats: SearchStats) -> None:
+        with self._lock:
+            self.searches += 1
+            self.book_moves += stats.book_move
+            self.cache_hits += stats.cache_hit
+            self.ponder_hits += stats.ponder_hit
+            self.seconds += stats.elapsed
+            for name in self.COUNTERS:
+                self.totals[name] += getattr(stats, name)
+
+    def snapshot(self) -> dict:
+        #all the totals, read together
+        with self._lock:
+            return {
+                "searches": self.searches,
+                "book_moves": self.book_moves,
+                "cache_hits": self.cache_hits,
+                "ponder_hits": self.ponder_hits,
+                "seconds": self.seconds,
+                "totals": dict(self.totals),
+            }
+
+    def render(self) -> str:
+        snapshot = self.snapshot()
+        lines = []
+        def counter(name: str, value, help_text: str) -> None:
+            lines.append(f"# HELP {self.prefix}_{name} {help_text}")
+            lines.append(f"# TYPE {self.prefix}_{name} counter")
+            lines.append(f"{self.prefix}_{name} {value}")
+
+        counter("searches_total", snapshot["searches"], "Searches run.")
+        counter("book_moves_total", snapshot["book_moves"], "Moves answered from the opening book.")
+        counter("cache_hits_total", snapshot["cache_hits"], "Moves answered from the result cache.")
+        counter("ponder_hits_total", snapshot["ponder_hits"], "Moves answered by pondering on the opponent's time.")
+        counter("seconds_total", round(snapshot["seconds"], 6), "Time spent searching.")
+        for name in self.COUNTERS:
+            counter(f"{name}_total", snapshot["totals"][name], f"Sum of {name.replace('_', ' ')} over all searches.")
+        return '\n'.join(lines) + '\n'
+
+#Hot path profiler class
+class HotPathProfiler:
+    #Wraps methods of one engine instance with timers while attached; the class and every
+    #other engine are untouched, so a detached profiler costs nothing.
+    DEFAULT_METHODS = (
+        "_generate_pseudo_moves", "_is_attacked", "_make", "_unmake",
+        "_order_moves", "evaluate", "quiescence",
+    )
+
+    def __init__(self, methods: tuple[str, ...] = DEFAULT_METHODS):
+        self.methods = methods
+        self.calls = dict.fromkeys(methods, 0)
+        self.seconds = dict.fromkeys(methods, 0.0)
+        self._engine = None
+
+    def attach(self, engine) -> None:
+        self._engine = engine
+        for name in self.methods:
+            setattr(engine, name, self._timed(name, getattr(engine, name)))
+
+    def detach(self) -> None:
+        for name in self.methods:
+            self._engine.__dict__.pop(name, None)
+        self._engine = None
+
+    def _timed(self, name: str, method):
+        calls = self.calls
+        seconds = self.seconds
+        perf_counter = time.perf_counter
+        #only the outermost call of a recursive method (quiescence) is timed,
+        #so nested calls are not counted twice
+        active = [0]
+
+        @wraps(method)
+        def timed(*args):
+            calls[name] += 1
+            if active[0]:
+                return method(*args)
+            active[0] = 1
+            start = perf_counter()
+            try:
+                return method(*args)
+            finally:
+                seconds[name] += perf_counter() - start
+                active[0] = 0
+        return timed
+
+    def report(self) -> dict:
+        return {
+            name: {"calls": self.calls[name], "seconds": round(self.seconds[name], 4)}
+            for name in self.methods
+        }
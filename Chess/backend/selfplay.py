@@ -0,0 +1,342 @@
+#Self-play match runner
+#Plays two UCI engines (see uci.py) against each other and reports whether a change cost
+#strength: the score and Elo difference with its 95% error margin, plus nodes/sec and
+#time-to-depth for each side. Every engine is its own process, so games run in parallel;
+#openings are random starts of the book lines, each played twice with colours swapped.
+#
+#   python selfplay.py --baseline "python /path/to/old/backend/uci.py" --games 40 --concurrency 4
+#   python selfplay.py --baseline "..." --tc 10+0.1      # 10 s per game + 0.1 s per move
+#   python selfplay.py --baseline "..." --depth 4        # fixed depth instead of a clock
+#
+#Both sides default to this tree's uci.py, which only measures the noise.
+import argparse
+import math
+import os
+import queue
+import random
+import shlex
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from chess_engine import BLACK, WHITE, PAWN, KNIGHT, BISHOP, KING, TYPE_MASK, SQUARES, ZOBRIST_BLACK_TO_MOVE, move_from
+from fen import STARTING_FEN, engine_from_fen
+from opening_book import read_lines
+from uci import parse_uci_move
+
+#===== Constants =====#
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_ENGINE = f"{shlex.quote(sys.executable)} {shlex.quote(os.path.join(BACKEND_DIR, 'uci.py'))}"
+DEFAULT_OPENINGS = os.path.join(BACKEND_DIR, 'openings.txt')
+DEFAULT_TIME_CONTROL = "10+0.1"
+#plies of a book line an opening keeps, chosen at random per opening pair
+OPENING_PLIES = (2, 8)
+#games still running after this many plies are scored as draws
+DEFAULT_MAX_PLIES = 300
+#how long an engine may overrun its time (or take with no clock) before it forfeits
+RESPONSE_GRACE = 5.0
+NO_CLOCK_TIMEOUT = 600.0
+
+#UCI process class
+class UciProcess:
+    def __init__(self, command: str):
+        self.process = subprocess.Popen(
+            shlex.split(command), stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL, text=True, bufsize=1,
+        )
+        #a reader thread feeds the queue so every wait can time out
+        self._lines = queue.Queue()
+        threading.Thread(target=self._read, daemon=True).start()
+        self.send("uci")
+        self.wait_for("uciok", NO_CLOCK_TIMEOUT)
+
+    def _read(self) -> None:
+        for line in self.process.stdout:
+            self._lines.put(line.strip())
+        self._lines.put(None)
+
+    def send(self, line: str) -> None:
+        self.process.stdin.write(line + '\n')
+        self.process.stdin.flush()
+
+    def wait_for(self, prefix: str, timeout: float) -> list[str]:
+        #every line up to and including the first one starting with prefix
+        deadline = time.monotonic() + timeout
+        lines = []
+        while True:
+            line = self._lines.get(timeout=max(deadline - time.monotonic(), 0.001))
+            if line is None:
+                raise EOFError("engine exited")
+            lines.append(line)
+            if line.startswith(prefix):
+                return lines
+
+    def new_game(self) -> None:
+        self.send("ucinewgame")
+        self.send("isready")
+        self.wait_for("readyok", NO_CLOCK_TIMEOUT)
+
+    def go(self, moves: list[str], go_command: str, timeout: float) -> tuple[str, list[dict], float]:
+        #(best move, parsed info lines, wall seconds) for the position after 'moves'
+        self.send("position startpos" + (" moves " + ' '.join(moves) if moves else ''))
+        start = time.perf_counter()
+        self.send(go_command)
+        lines = self.wait_for("bestmove", timeout)
+        seconds = time.perf_counter() - start
+        infos = [parse_info(line) for line in lines if line.startswith("info ")]
+        return lines[-1].split()[1], infos, seconds
+
+    def close(self) -> None:
+        try:
+            self.send("quit")
+            self.process.wait(timeout=2)
+        except (OSError, subprocess.TimeoutExpired):
+            self.process.kill()
+
+def parse_info(line: str) -> dict:
+    #the integer fields of an 'info depth 3 nodes 1234 time 56 ...' line
+    tokens = line.split()
+    info = {}
+    for name in ("depth", "nodes", "time"):
+        if name in tokens:
+            info[name] = int(tokens[tokens.index(name) + 1])
+    return info
+
+def parse_time_control(text: str) -> tuple[float, float]:
+    #'10+0.1' -> (10.0, 0.1): seconds per game, increment per move
+    base, _, increment = text.partition('+')
+    return float(base), float(increment or 0)
+
+def insufficient_material(squares: list[int]) -> bool:
+    #kings alone, or with a single knight or bishop
+    minors = 0
+    for sq in SQUARES:
+        piece_type = squares[sq] & TYPE_MASK
+        if piece_type in (KNIGHT, BISHOP):
+            minors += 1
+        elif piece_type and piece_type != KING:
+            return False
+    return minors <= 1
+
+# === Games === #
+def play_game(commands: tuple[str, str], opening: list[str], white: int, limits: dict, max_plies: int) -> dict:
+    #Plays one game between commands[0] and commands[1], with commands[white] as white, starting
+    #from the opening moves. limits holds 'depth', 'nodes', 'movetime' (ms) or 'clock' (base,
+    #increment). The score is from commands[0]'s side.
+    players = [UciProcess(command) for command in commands]
+    try:
+        for player in players:
+            player.new_game()
+        referee = engine_from_fen(STARTING_FEN, tt_megabytes=0.01)
+        side = WHITE
+        moves = []
+        for text in opening:
+            referee._make(parse_uci_move(referee, side, text))
+            moves.append(text)
+            side ^= BLACK
+
+        clocks = [limits["clock"][0]] * 2 if "clock" in limits else None
+        searches = [[], []]
+        seen = {}
+        halfmove_clock = 0
+        while True:
+            position = referee.hash ^ ZOBRIST_BLACK_TO_MOVE if side == BLACK else referee.hash
+            seen[position] = seen.get(position, 0) + 1
+            mover = white if side == WHITE else 1 - white
+            if not referee._generate_legal_moves(side):
+                if referee._in_check(side):
+                    winner, reason = 1 - mover, "checkmate"
+                else:
+                    winner, reason = None, "stalemate"
+                break
+            if seen[position] >= 3:
+                winner, reason = None, "repetition"
+                break
+            if halfmove_clock >= 100:
+                winner, reason = None, "fifty moves"
+                break
+            if insufficient_material(referee.squares):
+                winner, reason = None, "insufficient material"
+                break
+            if len(moves) >= max_plies:
+                winner, reason = None, "move limit"
+                break
+
+            if clocks is not None:
+                increment = int(limits["clock"][1] * 1000)
+                white_clock, black_clock = (clocks[white], clocks[1 - white])
+                go_command = (f"go wtime {int(white_clock * 1000)} btime {int(black_clock * 1000)} "
+                              f"winc {increment} binc {increment}")
+                timeout = clocks[mover] + RESPONSE_GRACE
+            elif "movetime" in limits:
+                go_command = f"go movetime {limits['movetime']}"
+                timeout = limits["movetime"] / 1000 + RESPONSE_GRACE
+            else:
+                go_command = ' '.join(f"{name} {limits[name]}" for name in ("depth", "nodes") if name in limits)
+                go_command = "go " + go_command if go_command else "go"
+                timeout = NO_CLOCK_TIMEOUT
+
+            try:
+                best_move, infos, seconds = players[mover].go(moves, go_command, timeout)
+            except (queue.Empty, EOFError):
+                winner, reason = 1 - mover, "no answer"
+                break
+            if clocks is not None:
+                clocks[mover] -= seconds
+                if clocks[mover] < 0:
+                    winner, reason = 1 - mover, "time forfeit"
+                    break
+                clocks[mover] += limits["clock"][1]
+            try:
+                move = parse_uci_move(referee, side, best_move)
+            except ValueError:
+                winner, reason = 1 - mover, f"illegal move {best_move}"
+                break
+            searches[mover].append((infos, seconds))
+
+            is_pawn_move = referee.squares[move_from(move)] & TYPE_MASK == PAWN
+            captured = referee._make(move)
+            halfmove_clock = 0 if is_pawn_move or captured else halfmove_clock + 1
+            moves.append(best_move)
+            side ^= BLACK
+    finally:
+        for player in players:
+            player.close()
+
+    return {
+        "opening": opening,
+        "white": white,
+        "moves": moves,
+        "score": 0.5 if winner is None else float(winner == 0),
+        "reason": reason,
+        "searches": searches,
+    }
+
+# === Reporting === #
+def elo_difference(wins: int, draws: int, losses: int) -> tuple[float, float]:
+    #(Elo difference, 95% error margin) for a score of wins/draws/losses; inf at 0% or 100%
+    games = wins + draws + losses
+    if not games:
+        return 0.0, math.inf
+    score = (wins + draws / 2) / games
+    if score in (0, 1):
+        return (math.inf if score else -math.inf), math.inf
+
+    def elo(fraction: float) -> float:
+        if fraction <= 0:
+            return -math.inf
+        if fraction >= 1:
+            return math.inf
+        return 400 * math.log10(fraction / (1 - fraction))
+
+    deviation = math.sqrt((wins * (1 - score) ** 2 + draws * (0.5 - score) ** 2 + losses * score ** 2) / games)
+    error = 1.96 * deviation / math.sqrt(games)
+    return elo(score), (elo(min(score + error, 1)) - elo(max(score - error, 0))) / 2
+
+def search_report(games: list[dict], player: int) -> dict:
+    #nodes/sec over all of one player's searches, and the mean time (ms) to reach each depth
+    #over the searches that reached it
+    nodes = 0
+    seconds = 0.0
+    depth_times = {}
+    for game in games:
+        for infos, move_seconds in game["searches"][player]:
+            seconds += move_seconds
+            if infos:
+                nodes += infos[-1].get("nodes", 0)
+            for info in infos:
+                if "depth" in info and "time" in info:
+                    depth_times.setdefault(info["depth"], []).append(info["time"])
+    return {
+        "moves": sum(len(game["searches"][player]) for game in games),
+        "nodes_per_second": nodes / seconds if seconds else 0.0,
+        "time_to_depth": {depth: sum(times) / len(times) for depth, times in sorted(depth_times.items())},
+    }
+
+def run_match(
+    engine: str = DEFAULT_ENGINE,
+    baseline: str = DEFAULT_ENGINE,
+    games: int = 20,
+    concurrency: int | None = None,
+    limits: dict | None = None,
+    openings_path: str = DEFAULT_OPENINGS,
+    seed: int | None = None,
+    max_plies: int = DEFAULT_MAX_PLIES,
+) -> dict:
+    #plays 'games' games (rounded up to pairs) between engine and baseline, 'concurrency' at a time
+    limits = limits or {"clock": parse_time_control(DEFAULT_TIME_CONTROL)}
+    rng = random.Random(seed)
+    lines = read_lines(openings_path)
+    schedule = []
+    for _ in range((games + 1) // 2):
+        line = rng.choice(lines)
+        opening = line[:rng.randint(*OPENING_PLIES)]
+        schedule += [(opening, 0), (opening, 1)]
+
+    results = []
+    with ThreadPoolExecutor(max_workers=concurrency or os.cpu_count() or 1) as executor:
+        futures = [
+            executor.submit(play_game, (engine, baseline), opening, white, limits, max_plies)
+            for opening, white in schedule
+        ]
+        for future in as_completed(futures):
+            game = future.result()
+            results.append(game)
+            colour = "white" if game["white"] == 0 else "black"
+            print(f"Game {len(results)}/{len(schedule)}: engine as {colour} scores {game['score']} "
+                  f"({game['reason']}, {len(game['moves'])} plies)")
+
+    wins = sum(game["score"] == 1 for game in results)
+    draws = sum(game["score"] == 0.5 for game in results)
+    losses = len(results) - wins - draws
+    elo, margin = elo_difference(wins, draws, losses)
+    return {
+        "games": len(results),
+        "wins": wins,
+        "draws": draws,
+        "losses": losses,
+        "elo": elo,
+        "elo_margin": margin,
+        "engine": search_report(results, 0),
+        "baseline": search_report(results, 1),
+    }
+
+def print_report(report: dict) -> None:
+    print(f"\nEngine vs baseline: +{report['wins']} ={report['draws']} -{report['losses']} "
+          f"({report['games']} games)")
+    print(f"Elo difference: {report['elo']:+.1f} +/- {report['elo_margin']:.1f}")
+    for name in ("engine", "baseline"):
+        searches = report[name]
+        depths = "  ".join(f"d{depth} {ms:.0f}ms" for depth, ms in searches["time_to_depth"].items())
+        print(f"{name:<9} {searches['nodes_per_second']:>9.0f} nodes/s  time to depth: {depths}")
+
+# === Command Line === #
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Play a self-play match between two UCI engines.")
+    parser.add_argument("--engine", default=DEFAULT_ENGINE, help="command of the engine under test")
+    parser.add_argument("--baseline", default=DEFAULT_ENGINE, help="command of the engine to compare with")
+    parser.add_argument("--games", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, help="games played at once (default: CPU cores)")
+    parser.add_argument("--tc", default=DEFAULT_TIME_CONTROL, help="seconds per game + increment (default %(default)s)")
+    parser.add_argument("--depth", type=int, help="fixed depth per move instead of a clock")
+    parser.add_argument("--nodes", type=int, help="fixed nodes per move instead of a clock")
+    parser.add_argument("--movetime", type=int, help="fixed milliseconds per move instead of a clock")
+    parser.add_argument("--openings", default=DEFAULT_OPENINGS)
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--max-plies", type=int, default=DEFAULT_MAX_PLIES)
+    args = parser.parse_args(argv)
+
+    limits = {name: getattr(args, name) for name in ("depth", "nodes", "movetime") if getattr(args, name)}
+    if not limits:
+        limits = {"clock": parse_time_control(args.tc)}
+    report = run_match(
+        args.engine, args.baseline, args.games, args.concurrency, limits,
+        args.openings, args.seed, args.max_plies,
+    )
+    print_report(report)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,42 @@
+import pytest
+
+import app as chess_app
+from chess_engine import search_depth
+
+#no opening book line reaches this position, so the move is searched
+BOARD = {
+    "e1": "wk", "d1": "wq", "a1": "wr", "a2": "wp", "b2": "wp", "f2": "wp", "g2": "wp", "c3": "wn",
+    "e8": "bk", "d8": "bq", "h8": "br", "a7": "bp", "b7": "bp", "f7": "bp", "g7": "bp", "c6": "bn",
+}
+
+
+@pytest.fixture
+def client():
+    chess_app.app.config["TESTING"] = True
+    with chess_app.app.test_client() as client:
+        yield client
+
+
+def test_ai_move_searches_full_depth_within_budget(client, monkeypatch):
+    monkeypatch.setattr(chess_app, "MOVE_TIME_LIMIT", 60.0)
+    response = client.post("/api/ai_move", json={"boardState": BOARD, "includeStats": True})
+    assert response.status_code == 200
+    assert response.get_json()["stats"]["completed_depth"] == search_depth
+
+
+def test_ai_move_stops_at_time_limit(client, monkeypatch):
+    #depth 1 always finishes; a budget already spent by then stops the search there
+    monkeypatch.setattr(chess_app, "MOVE_TIME_LIMIT", 1e-9)
+    response = client.post("/api/ai_move", json={"boardState": BOARD, "includeStats": True})
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body["status"] == "move_found"
+    assert body["stats"]["completed_depth"] == 1
+
+
+def test_session_ai_move_stops_at_time_limit(client, monkeypatch):
+    monkeypatch.setattr(chess_app, "MOVE_TIME_LIMIT", 1e-9)
+    game = client.post("/api/games", json={"boardState": BOARD, "sideToMove": "b", "ponder": False}).get_json()
+    response = client.post(f"/api/games/{game['gameId']}/ai_move", json={"includeStats": True})
+    assert response.status_code == 200
+    assert response.get_json()["stats"]["completed_depth"] == 1
@@ -0,0 +1,55 @@
+import json
+
+import pytest
+
+import app as chess_app
+from batch_analysis import BatchAnalyser, position_fen
+
+
+@pytest.fixture
+def client(monkeypatch):
+    analyser = BatchAnalyser(workers=1)
+    monkeypatch.setattr(chess_app, "batch_analyser", analyser)
+    chess_app.app.config["TESTING"] = True
+    with chess_app.app.test_client() as client:
+        yield client
+    analyser.shutdown()
+
+
+@pytest.mark.parametrize("position", [
+    {"boardState": {"e2": "w"}},
+    {"boardState": {"e2": ["w", "p"]}},
+    {"boardState": {"z9": "wp"}},
+    {"boardState": "x"},
+    {"boardState": ["e2", "wp"]},
+    {"fen": 5},
+    {"fen": ["8/8/8/8/8/8/8/8 w - -"]},
+    {"fen": "not a fen"},
+    {"fen": chess_app.STARTING_FEN, "aiColor": "x"},
+    {"id": 1},
+    5,
+])
+def test_position_fen_raises_value_error(position):
+    with pytest.raises(ValueError):
+        position_fen(position)
+
+
+def test_mixed_batch_returns_every_line(client):
+    positions = [
+        {"id": "start", "fen": chess_app.STARTING_FEN},
+        {"id": "short square", "boardState": {"e2": "w"}},
+        {"id": "board string", "boardState": "x"},
+        {"id": "fen number", "fen": 5},
+        {"id": "kings", "boardState": {"e1": "wk", "e8": "bk", "d2": "wq"}, "aiColor": "w"},
+        "not a fen",
+    ]
+    response = client.post("/api/analysis", json={"positions": positions, "depth": 1})
+    assert response.status_code == 200
+    results = {result["index"]: result for result in map(json.loads, response.get_data(as_text=True).splitlines())}
+
+    assert sorted(results) == list(range(len(positions)))
+    assert [results[index]["status"] for index in range(len(positions))] == [
+        "done", "error", "error", "error", "done", "error",
+    ]
+    assert results[1]["id"] == "short square"
+    assert results[4]["best_move"]
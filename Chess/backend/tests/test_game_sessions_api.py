@@ -0,0 +1,90 @@
+import pytest
+
+import app as chess_app
+
+
+@pytest.fixture
+def client():
+    chess_app.app.config["TESTING"] = True
+    with chess_app.app.test_client() as client:
+        yield client
+
+
+def test_create_game_rejects_invalid_side_to_move(client):
+    sessions_before = len(chess_app.game_sessions)
+    response = client.post("/api/games", json={"boardState": {"e1": "wk", "e8": "bk"}, "sideToMove": "x"})
+    assert response.status_code == 400
+    assert response.get_json()["status"] == "error"
+    assert len(chess_app.game_sessions) == sessions_before
+
+
+def test_create_game_rejects_invalid_fen(client):
+    response = client.post("/api/games", json={"fen": "not a fen"})
+    assert response.status_code == 400
+
+
+def test_create_game_accepts_board_state_with_side_to_move(client):
+    response = client.post("/api/games", json={"boardState": {"e1": "wk", "e8": "bk", "a2": "wp"}, "sideToMove": "b"})
+    assert response.status_code == 201
+    assert response.get_json()["sideToMove"] == "b"
+
+
+def test_move_advances_fen_clocks(client):
+    game = client.post("/api/games", json={"ponder": False}).get_json()
+    assert game["fen"].endswith(" w KQkq - 0 1")
+    url = f"/api/games/{game['gameId']}/moves"
+
+    fens = []
+    for from_sq, to_sq in (("e2", "e4"), ("e7", "e5"), ("g1", "f3"), ("b8", "c6")):
+        response = client.post(url, json={"from": from_sq, "to": to_sq})
+        assert response.status_code == 200
+        fens.append(response.get_json()["fen"])
+
+    assert [fen.split()[-2:] for fen in fens] == [["0", "1"], ["0", "2"], ["1", "2"], ["2", "3"]]
+    assert client.get(f"/api/games/{game['gameId']}").get_json()["fen"] == fens[-1]
+
+
+def test_illegal_move_leaves_fen_unchanged(client):
+    game = client.post("/api/games", json={"ponder": False}).get_json()
+    response = client.post(f"/api/games/{game['gameId']}/moves", json={"from": "e2", "to": "e5"})
+    assert response.status_code == 400
+    assert client.get(f"/api/games/{game['gameId']}").get_json()["fen"] == game["fen"]
+
+
+def test_session_engines_use_the_store_table_size(client):
+    game = client.post("/api/games", json={"ponder": False}).get_json()
+    engine = chess_app.game_sessions.get(game["gameId"]).engine
+    assert engine.tt.megabytes == chess_app.game_sessions.tt_megabytes
+
+
+def test_request_for_another_game_stops_pondering(client):
+    fen = "r1bqkbnr/pppp1ppp/2n5/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R w KQkq - 2 3"
+    games = [client.post("/api/games", json={"fen": fen, "ponder": True}).get_json()["gameId"] for _ in range(2)]
+    try:
+        assert client.post(f"/api/games/{games[0]}/ai_move").get_json()["pondering"]
+        #the game's own requests leave its ponder search running
+        assert client.get(f"/api/games/{games[0]}").get_json()["pondering"]
+
+        assert client.post(f"/api/games/{games[1]}/ai_move").get_json()["pondering"]
+        assert not client.get(f"/api/games/{games[0]}").get_json()["pondering"]
+        assert not client.get(f"/api/games/{games[1]}").get_json()["pondering"]
+    finally:
+        for game_id in games:
+            client.delete(f"/api/games/{game_id}")
+
+
+def test_starting_a_ponderer_stops_the_oldest_over_the_limit():
+    fen = "r1bqkbnr/pppp1ppp/2n5/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R w KQkq - 2 3"
+    ponderers = []
+    for _ in range(2):
+        engine = chess_app.engine_from_fen(fen)
+        engine.make_move(*engine.find_best_move("w", max_depth=2))
+        ponderers.append(chess_app.Ponderer(engine))
+    try:
+        assert ponderers[0].start("w")
+        assert ponderers[1].start("w")
+        assert not ponderers[0].active
+        assert ponderers[1].active
+    finally:
+        for ponderer in ponderers:
+            ponderer.stop()
@@ -0,0 +1,113 @@
+import pytest
+
+import app as chess_app
+
+
+class RecordingJobs:
+    #stands in for SearchJobQueue so no worker processes are started
+    def __init__(self):
+        self.submitted = []
+        self.waits = []
+
+    def submit(self, fen, ai_color, time_limit=None, max_depth=None):
+        self.submitted.append((fen, ai_color, time_limit, max_depth))
+        return RecordingJob()
+
+    def get(self, job_id):
+        return RecordingJob() if job_id == RecordingJob.id else None
+
+    def wait(self, job, timeout):
+        self.waits.append(timeout)
+        return False
+
+
+class RecordingJob:
+    id = "job-1"
+    state = "queued"
+
+    def to_dict(self):
+        return {"jobId": self.id, "status": self.state}
+
+
+@pytest.fixture
+def jobs(monkeypatch):
+    jobs = RecordingJobs()
+    monkeypatch.setattr(chess_app, "search_jobs", jobs)
+    return jobs
+
+
+@pytest.fixture
+def client():
+    chess_app.app.config["TESTING"] = True
+    with chess_app.app.test_client() as client:
+        yield client
+
+
+@pytest.mark.parametrize("ai_color", ["x", "white", 1])
+def test_submit_job_rejects_invalid_ai_color(client, jobs, ai_color):
+    response = client.post("/api/jobs", json={"fen": chess_app.STARTING_FEN, "aiColor": ai_color})
+    assert response.status_code == 400
+    assert jobs.submitted == []
+
+
+@pytest.mark.parametrize("time_limit", ["soon", [1], {"s": 1}])
+def test_submit_job_rejects_invalid_time_limit(client, jobs, time_limit):
+    response = client.post("/api/jobs", json={"fen": chess_app.STARTING_FEN, "aiColor": "w", "timeLimit": time_limit})
+    assert response.status_code == 400
+    assert response.get_json()["status"] == "error"
+    assert jobs.submitted == []
+
+
+def test_submit_job_passes_time_limit_as_float(client, jobs):
+    response = client.post("/api/jobs", json={"fen": chess_app.STARTING_FEN, "aiColor": "w", "timeLimit": "1.5"})
+    assert response.status_code == 202
+    assert jobs.submitted == [(chess_app.STARTING_FEN, "w", 1.5, None)]
+
+
+@pytest.mark.parametrize("board_state", [{"e2": "w"}, {"e2": 5}, {"j9": "wp"}, "x", ["e2", "wp"]])
+def test_submit_job_rejects_malformed_board_state(client, jobs, board_state):
+    response = client.post("/api/jobs", json={"boardState": board_state})
+    assert response.status_code == 400
+    assert response.get_json()["status"] == "error"
+    assert jobs.submitted == []
+
+
+@pytest.mark.parametrize("budget", [
+    {"timeLimit": chess_app.MAX_TIME_LIMIT + 1},
+    {"timeLimit": -1},
+    {"timeLimit": "nan"},
+    {"depth": chess_app.MAX_DEPTH + 1},
+    {"depth": -2},
+    {"depth": "deep"},
+])
+def test_submit_job_rejects_out_of_range_budget(client, jobs, budget):
+    response = client.post("/api/jobs", json={"fen": chess_app.STARTING_FEN, "aiColor": "w", **budget})
+    assert response.status_code == 400
+    assert jobs.submitted == []
+
+
+def test_submit_job_depth_alone_is_time_limited(client, jobs):
+    response = client.post("/api/jobs", json={"fen": chess_app.STARTING_FEN, "aiColor": "w", "depth": 4})
+    assert response.status_code == 202
+    assert jobs.submitted == [(chess_app.STARTING_FEN, "w", chess_app.MAX_TIME_LIMIT, 4)]
+
+
+def test_analysis_rejects_out_of_range_budget(client):
+    response = client.post("/api/analysis", json={"positions": [chess_app.STARTING_FEN], "depth": chess_app.MAX_DEPTH + 1})
+    assert response.status_code == 400
+
+
+def test_get_job_rejects_invalid_wait(client, jobs):
+    response = client.get(f"/api/jobs/{RecordingJob.id}?wait=later")
+    assert response.status_code == 400
+    assert jobs.waits == []
+
+
+def test_get_job_clamps_wait(client, jobs):
+    assert client.get(f"/api/jobs/{RecordingJob.id}?wait=-5").status_code == 200
+    assert client.get(f"/api/jobs/{RecordingJob.id}?wait=1000").status_code == 200
+    assert jobs.waits == [chess_app.MAX_JOB_WAIT]
+
+
+def test_get_job_unknown_id(client, jobs):
+    assert client.get("/api/jobs/missing?wait=1").status_code == 404
@@ -0,0 +1,57 @@
+import io
+
+import pytest
+
+from fen import STARTING_FEN, engine_to_fen
+from uci import UciEngine
+
+AFTER_E4 = "rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq e3 0 1"
+
+
+@pytest.fixture
+def uci():
+    return UciEngine(io.StringIO())
+
+
+def lines(uci):
+    return uci.output.getvalue().splitlines()
+
+
+def position_fen(uci):
+    return engine_to_fen(uci.engine)
+
+
+@pytest.mark.parametrize("command", [
+    "position startpos moves e2e5",
+    "position startpos moves e2e4 e2e4",
+    "position fen not a fen",
+    "position fen 8/8/8/8/8/8/8/8 x - - 0 1",
+    "position",
+])
+def test_bad_position_keeps_previous_one(uci, command):
+    assert uci.handle("position startpos moves e2e4")
+    before = position_fen(uci)
+    assert uci.handle(command)
+    assert lines(uci)[-1].startswith("info string ")
+    assert position_fen(uci) == before
+    assert uci.engine.side_to_move == "b"
+
+
+def test_position_after_error_still_loads(uci):
+    uci.handle("position startpos moves e2e5")
+    uci.handle("position startpos moves e2e4")
+    assert position_fen(uci).split()[:4] == AFTER_E4.split()[:4]
+
+
+@pytest.mark.parametrize("command", ["go depth", "go depth deep", "setoption name Hash value lots", "setoption name Hash value 0"])
+def test_bad_arguments_are_reported(uci, command):
+    assert uci.handle(command)
+    assert lines(uci)[-1].startswith("info string ")
+
+
+def test_search_still_answers_after_errors(uci):
+    for command in ("position startpos moves e2e5", "go depth x", "position startpos", "go depth 1"):
+        assert uci.handle(command)
+    uci.stop()
+    assert lines(uci)[-1].startswith("bestmove ")
+    assert position_fen(uci) == STARTING_FEN
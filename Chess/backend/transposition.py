@@ -0,0 +1,138 @@
+#Transposition table
+#A fixed-size hash table of search results keyed by Zobrist hash.
+#Entries live in two flat unsigned 64-bit arrays (key, packed data), so the table costs
+#exactly 16 bytes per entry whatever is stored in it and never grows past its memory cap.
+from array import array
+
+#===== Constants =====#
+#bound types
+EXACT = 0
+LOWER = 1 #score is a lower bound (failed high)
+UPPER = 2 #score is an upper bound (failed low)
+
+ENTRY_BYTES = 16
+DEFAULT_MEGABYTES = 16
+
+#data layout: bound 2 bits | depth 7 bits | move 20 bits | score 32 bits | age 3 bits
+DEPTH_SHIFT = 2
+MOVE_SHIFT = 9
+SCORE_SHIFT = 29
+AGE_SHIFT = 61
+SCORE_OFFSET = 1 << 31
+MAX_DEPTH = 127
+
+#Transposition table class
+class TranspositionTable:
+    def __init__(self, megabytes: float = DEFAULT_MEGABYTES):
+        #Each bucket holds two entries: slot 0 is depth-preferred (kept unless the new result is
+        #at least as deep or the stored one is from an older search), slot 1 is always replaced.
+        max_buckets = int(megabytes * 1024 * 1024) // (2 * ENTRY_BYTES)
+        if max_buckets < 1:
+            raise ValueError(f"Transposition table too small: {megabytes} MB")
+        buckets = 1 << (max_buckets.bit_length() - 1) #round down to a power of two
+        self.bucket_mask = buckets - 1
+        self.keys = array('Q', bytes(8 * 2 * buckets))
+        self.data = array('Q', bytes(8 * 2 * buckets))
+        self.age = 0
+
+        #counters for sizing the table
+        self.probes = 0
+        self.hits = 0
+        self.stores = 0
+        self.replacements = 0
+        self.used = 0
+
+    @property
+    def capacity(self) -> int:
+        return len(self.keys)
+
+    @property
+    def megabytes(self) -> float:
+        return self.capacity * ENTRY_BYTES / (1024 * 1024)
+
+    @property
+    def hit_rate(self) -> float:
+        return self.hits / self.probes if self.probes else 0.0
+
+    def new_search(self) -> None:
+        #marks entries from earlier searches as stale for the depth-preferred slot
+        self.age = (self.age + 1) & 7
+
+    def clear(self) -> None:
+        size = len(self.keys)
+        self.keys = array('Q', bytes(8 * size))
+        self.data = array('Q', bytes(8 * size))
+        self.used = 0
+
+    # ==== PROBE / STORE ==== #
+
+    def probe(self, key: int) -> tuple[int, int, int, int] | None:
+        #returns (depth, score, bound, move) for 'key' or None
+        self.probes += 1
+        index = (key & self.bucket_mask) << 1
+        keys = self.keys
+        if keys[index] == key:
+            data = self.data[index]
+        elif keys[index + 1] == key:
+            data = self.data[index + 1]
+        else:
+            return None
+        if not data:
+            return None
+
+        self.hits += 1
+        return (
+            (data >> DEPTH_SHIFT) & MAX_DEPTH,
+            ((data >> SCORE_SHIFT) & 0xFFFFFFFF) - SCORE_OFFSET,
+            data & 3,
+            (data >> MOVE_SHIFT) & 0xFFFFF,
+        )
+
+    def store(self, key: int, depth: int, score: int, bound: int, move: int) -> None:
+        self.stores += 1
+        index = (key & self.bucket_mask) << 1
+        keys = self.keys
+        data = self.data
+
+        stored = data[index]
+        if (
+            keys[index] == key
+            or not stored
+            or depth >= (stored >> DEPTH_SHIFT) & MAX_DEPTH
+            or stored >> AGE_SHIFT != self.age
+        ):
+            #the replaced depth-preferred entry still gets a second life in the other slot
+            if stored and keys[index] != key:
+                self._put(index + 1, keys[index], stored)
+        else:
+            index += 1
+
+        self._put(index, key, (
+            (self.age << AGE_SHIFT)
+            | ((score + SCORE_OFFSET) << SCORE_SHIFT)
+            | (move << MOVE_SHIFT)
+            | (min(depth, MAX_DEPTH) << DEPTH_SHIFT)
+            | bound
+        ))
+
+    def _put(self, index: int, key: int, value: int) -> None:
+        if not self.data[index]:
+            self.used += 1
+        elif self.keys[index] != key:
+            self.replacements += 1
+        self.keys[index] = key
+        self.data[index] = value
+
+    # ==== STATS ==== #
+
+    def stats(self) -> dict:
+        return {
+            "entries": self.capacity,
+            "used": self.used,
+            "megabytes": round(self.megabytes, 2),
+            "probes": self.probes,
+            "hits": self.hits,
+            "hit_rate": round(self.hit_rate, 4),
+            "stores": self.stores,
+            "replacements": self.replacements,
+        }
@@ -0,0 +1,213 @@
+#UCI front-end
+#Speaks the Universal Chess Interface on stdin/stdout so ChessEngine can be driven by chess GUIs,
+#match runners (see selfplay.py) and testing tools without going through Flask.
+#
+#   python uci.py
+#
+#Supported: uci, isready, setoption (Hash, OwnBook), ucinewgame, position, go (depth, nodes,
+#movetime, wtime/btime/winc/binc/movestogo, infinite), stop and quit. The engine's own prints go
+#to stderr so they never mix with the protocol.
+import sys
+import threading
+import time
+
+from chess_engine import ChessEngine, SIDES, BLACK, MAX_SEARCH_DEPTH, move_to_uci
+from transposition import DEFAULT_MEGABYTES
+from fen import STARTING_FEN, parse_fen
+from opening_book import DEFAULT_BOOK_PATH, open_book
+
+#===== Constants =====#
+ENGINE_NAME = "ChessEngine"
+ENGINE_AUTHOR = "Chess AI project"
+#clock management: expected moves left when the GUI doesn't say, and time kept in reserve
+DEFAULT_MOVES_TO_GO = 30
+MOVE_OVERHEAD = 0.05
+
+def parse_uci_move(engine: ChessEngine, side: int, text: str) -> int:
+    #the legal move written as 'e2e4' / 'e7e8q' for 'side', ValueError if there is none
+    for move in engine._generate_legal_moves(side):
+        if move_to_uci(move) == text:
+            return move
+    raise ValueError(f"Illegal move: {text}")
+
+def time_for_move(time_left: float, increment: float = 0.0, moves_to_go: int | None = None) -> float:
+    #seconds to spend on this move: an even share of the clock plus most of the increment,
+    #never more than half of what is left
+    share = time_left / (moves_to_go or DEFAULT_MOVES_TO_GO) + increment * 0.8
+    return max(0.01, min(share, time_left / 2) - MOVE_OVERHEAD)
+
+#UCI engine class
+class UciEngine:
+    def __init__(self, output=None):
+        #output is where protocol lines are written (stdout by default)
+        self.output = output or sys.stdout
+        self.hash_megabytes = DEFAULT_MEGABYTES
+        self.own_book = False
+        self.engine = ChessEngine({}, tt_megabytes=self.hash_megabytes)
+        self.engine.on_iteration = self._report_iteration
+        self.side = SIDES['w']
+        #arguments of the last position command that loaded, to go back to if one fails
+        self._position = None
+        self._search_thread = None
+        self._search_start = 0.0
+        #the search thread reports while the main thread answers commands
+        self._output_lock = threading.Lock()
+
+    def send(self, line: str) -> None:
+        with self._output_lock:
+            self.output.write(line + '\n')
+            self.output.flush()
+
+    def handle(self, line: str) -> bool:
+        #processes one command line; False after 'quit'. A command that can't be carried out is
+        #answered with 'info string <error>' and changes nothing.
+        tokens = line.split()
+        if not tokens:
+            return True
+        try:
+            return self._dispatch(tokens[0], tokens[1:])
+        except (ValueError, IndexError) as e:
+            self.send(f"info string error in '{' '.join(tokens)}': {e}")
+            return True
+
+    def _dispatch(self, command: str, args: list[str]) -> bool:
+        if command == 'uci':
+            self.send(f"id name {ENGINE_NAME}")
+            self.send(f"id author {ENGINE_AUTHOR}")
+            self.send(f"option name Hash type spin default {DEFAULT_MEGABYTES} min 1 max 1024")
+            self.send("option name OwnBook type check default false")
+            self.send("uciok")
+        elif command == 'isready':
+            self.send("readyok")
+        elif command == 'setoption':
+            self.set_option(args)
+        elif command == 'ucinewgame':
+            self.stop()
+            self.engine.tt.clear()
+        elif command == 'position':
+            self.stop()
+            self.set_position(args)
+        elif command == 'go':
+            self.stop()
+            self.go(args)
+        elif command == 'stop':
+            self.stop()
+        elif command == 'quit':
+            self.stop()
+            return False
+        return True
+
+    # ==== COMMANDS ==== #
+
+    def set_option(self, args: list[str]) -> None:
+        #setoption name <name> value <value>
+        if 'name' not in args:
+            return
+        value_index = args.index('value') if 'value' in args else len(args)
+        name = ' '.join(args[args.index('name') + 1:value_index]).lower()
+        value = ' '.join(args[value_index + 1:])
+        if name == 'hash':
+            self.stop()
+            engine = ChessEngine({}, tt_megabytes=int(value))
+            engine.on_iteration = self._report_iteration
+            self.engine = engine
+            self.hash_megabytes = int(value)
+            self._position = None
+        elif name == 'ownbook':
+            self.own_book = value.lower() == 'true'
+
+    def set_position(self, args: list[str]) -> None:
+        #position startpos | fen <6 fields> [moves m1 m2 ...]; ValueError, with the previous
+        #position loaded again, for a bad FEN or an illegal move
+        try:
+            self._load_position(args)
+        except ValueError:
+            self._load_position(self._position)
+            raise
+        self._position = args
+
+    def _load_position(self, args: list[str] | None) -> None:
+        #None is the empty board the engine starts with
+        if args is None:
+            self.engine.set_board_state({})
+            self.side = SIDES['w']
+            self.engine.side_to_move = 'w'
+            return
+        moves_index = args.index('moves') if 'moves' in args else len(args)
+        fen = STARTING_FEN if args[:1] == ['startpos'] else ' '.join(args[1:moves_index])
+        parsed = parse_fen(fen)
+        engine = self.engine
+        engine.set_board_state(parsed["board_state"], parsed["castling"], parsed["en_passant"])
+        side = SIDES[parsed["side_to_move"]]
+        for text in args[moves_index + 1:]:
+            engine._make(parse_uci_move(engine, side, text))
+            side ^= BLACK
+        self.side = side
+        engine.side_to_move = 'b' if side == BLACK else 'w'
+
+    def go(self, args: list[str]) -> None:
+        #go [depth d] [nodes n] [movetime ms] [wtime ms btime ms winc ms binc ms movestogo n] [infinite]
+        options = {}
+        for index, token in enumerate(args):
+            if token in ('depth', 'nodes', 'movetime', 'wtime', 'btime', 'winc', 'binc', 'movestogo'):
+                options[token] = int(args[index + 1])
+
+        time_limit = None
+        if 'movetime' in options:
+            time_limit = options['movetime'] / 1000
+        else:
+            clock, increment = ('btime', 'binc') if self.side == BLACK else ('wtime', 'winc')
+            if clock in options:
+                time_limit = time_for_move(
+                    options[clock] / 1000, options.get(increment, 0) / 1000, options.get('movestogo')
+                )
+        max_depth = options.get('depth')
+        if max_depth is None and 'infinite' in args:
+            max_depth = MAX_SEARCH_DEPTH
+
+        self.engine.opening_book = open_book(DEFAULT_BOOK_PATH) if self.own_book else None
+        self._search_start = time.perf_counter()
+        self._search_thread = threading.Thread(
+            target=self._search, args=(time_limit, options.get('nodes'), max_depth), daemon=True
+        )
+        self._search_thread.start()
+
+    def _search(self, time_limit: float | None, node_limit: int | None, max_depth: int | None) -> None:
+        engine = self.engine
+        engine.find_best_move(engine.side_to_move, time_limit=time_limit, node_limit=node_limit, max_depth=max_depth)
+        #a search stopped before its first iteration finished still owes a legal move
+        moves = engine.principal_variation or sorted(engine._generate_legal_moves(self.side))
+        self.send(f"bestmove {move_to_uci(moves[0])}" if moves else "bestmove 0000")
+
+    def _report_iteration(self, depth: int, move: int, score: int) -> None:
+        #runs on the search thread after every completed iteration
+        engine = self.engine
+        milliseconds = int((time.perf_counter() - self._search_start) * 1000)
+        nps = engine.nodes * 1000 // milliseconds if milliseconds else 0
+        line = ' '.join(move_to_uci(pv_move) for pv_move in engine.principal_variation)
+        self.send(f"info depth {depth} score cp {score} nodes {engine.nodes} nps {nps} time {milliseconds} pv {line}")
+
+    def stop(self) -> None:
+        #ends a running search; it still answers with its bestmove
+        thread = self._search_thread
+        if thread is None:
+            return
+        #the search clears 'stopped' when it starts, so keep setting it until the thread ends
+        while thread.is_alive():
+            self.engine.stopped = True
+            thread.join(0.01)
+        self._search_thread = None
+
+# === Command Line === #
+def main() -> int:
+    output = sys.stdout
+    #everything else the engine prints goes to stderr
+    sys.stdout = sys.stderr
+    uci = UciEngine(output)
+    for line in sys.stdin:
+        if not uci.handle(line):
+            break
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,94 @@
+#Batch classification
+#Replays a chat log through the bot to measure intent coverage: utterances are read lazily from a
+#file or stdin, one per line, classified in chunks on a pool of worker processes, and written as
+#CSV rows (line, utterance, tag, response, confidence) as each chunk finishes, so in completion
+#order. Only a few chunks are in flight at a time, so memory stays flat however long the log is.
+#Workers pick up edits to intents.json between chunks.
+#
+#   python batch_classify.py chat_log.txt > coverage.csv
+#   cat chat_log.txt | python batch_classify.py - --workers 4 --chunk-size 500
+import argparse
+import csv
+import itertools
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from contextlib import nullcontext
+
+#===== Constants =====#
+DEFAULT_CHUNK_SIZE = 256
+#chunks handed to the pool ahead of the results being written, per worker
+DEFAULT_IN_FLIGHT_PER_WORKER = 2
+COLUMNS = ["line", "utterance", "tag", "response", "confidence"]
+
+def _init_worker():
+	#each worker loads the bot (intents, matcher, NLTK, semantic index) once, for all its chunks
+	import chatbot
+	chatbot.load()
+
+def _classify_chunk(chunk):
+	#[(line, utterance, tag, response, confidence), ...] for [(line, utterance), ...]
+	import chatbot
+	try:
+		chatbot.reload_if_changed()
+	except (OSError, ValueError) as e:
+		print(f"Error: {chatbot.INTENTS_PATH} not reloaded ({e}), keeping the loaded intents", file=sys.stderr)
+	rows = []
+	for line, utterance in chunk:
+		tag, response, confidence = chatbot.chatbot_reply(utterance)
+		rows.append((line, utterance, tag, response, round(confidence, 4)))
+	return rows
+
+def read_utterances(lines):
+	#(line number, utterance) for every non-blank line
+	for number, line in enumerate(lines, 1):
+		utterance = line.strip()
+		if utterance:
+			yield number, utterance
+
+def classify_utterances(utterances, workers=None, chunk_size=DEFAULT_CHUNK_SIZE, max_in_flight=None):
+	#Yields one row per utterance, a chunk at a time as chunks finish. utterances is an iterable
+	#of (line number, text). Closing the generator cancels what is queued.
+	workers = workers or os.cpu_count() or 1
+	max_in_flight = max_in_flight or workers * DEFAULT_IN_FLIGHT_PER_WORKER
+	utterances = iter(utterances)
+	executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker)
+	in_flight = set()
+	exhausted = False
+	try:
+		while True:
+			while not exhausted and len(in_flight) < max_in_flight:
+				chunk = list(itertools.islice(utterances, chunk_size))
+				if not chunk:
+					exhausted = True
+					break
+				in_flight.add(executor.submit(_classify_chunk, chunk))
+
+			if not in_flight:
+				return
+			done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+			for future in done:
+				yield from future.result()
+	finally:
+		executor.shutdown(cancel_futures=True)
+
+# === Command Line === #
+def main(argv=None):
+	parser = argparse.ArgumentParser(description="Classify a chat log, writing tag/response/confidence CSV rows.")
+	parser.add_argument("utterances", help="file with one utterance per line, or - for stdin")
+	parser.add_argument("--workers", type=int, help="worker processes (default: CPU cores)")
+	parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="utterances per task")
+	args = parser.parse_args(argv)
+
+	writer = csv.writer(sys.stdout)
+	writer.writerow(COLUMNS)
+	#stdin is left open, a named file is closed
+	with (nullcontext(sys.stdin) if args.utterances == '-' else open(args.utterances, encoding='utf-8', errors='replace')) as lines:
+		rows = classify_utterances(read_utterances(lines), args.workers, args.chunk_size)
+		for row in rows:
+			writer.writerow(row)
+	sys.stdout.flush()
+	return 0
+
+if __name__ == "__main__":
+	sys.exit(main())
@@ -0,0 +1,73 @@
+#Startup and throughput benchmark
+#Times how long a fresh interpreter takes to import the bot and answer its first message (what a
+#short-lived chat worker pays), then how many messages per second it answers once warm.
+#
+#   python benchmark.py
+#   python benchmark.py --messages 20000 --runs 5
+import argparse
+import os
+import random
+import subprocess
+import sys
+import time
+
+#the fresh interpreters run in this folder so that they can import chatbot
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+#messages in the style of intents.json, plus some it has no answer for
+SAMPLE_MESSAGES = [
+	"hello", "hi there", "good morning", "what is your name", "who are you",
+	"who created you", "what time is it", "tell me the time", "thanks a lot",
+	"thank you so much", "bye", "see you later", "i cannot find my keys",
+	"what is the weather like today", "can you help me?", "Hey! How are you doing",
+	"i am thankful to you", "is it late?", "tell me a joke", "you are great",
+]
+
+COLD_START = """
+import time
+start = time.perf_counter()
+import chatbot
+imported = time.perf_counter()
+chatbot.chatbot_response({message!r})
+answered = time.perf_counter()
+print(imported - start, answered - imported)
+"""
+
+def cold_start(message):
+	#(seconds to import chatbot, seconds for its first answer) in a new interpreter
+	output = subprocess.run(
+		[sys.executable, "-c", COLD_START.format(message=message)],
+		cwd=HERE, capture_output=True, text=True, check=True,
+	).stdout
+	import_seconds, first_seconds = output.split()
+	return float(import_seconds), float(first_seconds)
+
+def messages_per_second(chatbot, messages):
+	start = time.perf_counter()
+	for message in messages:
+		chatbot.chatbot_response(message)
+	return len(messages) / (time.perf_counter() - start)
+
+def main():
+	parser = argparse.ArgumentParser(description="Startup and throughput benchmark for the chatbot")
+	parser.add_argument("--runs", type=int, default=3, help="cold starts to time")
+	parser.add_argument("--messages", type=int, default=10000, help="messages for the throughput run")
+	args = parser.parse_args()
+
+	for run in range(args.runs):
+		import_seconds, first_seconds = cold_start(SAMPLE_MESSAGES[0])
+		print(f"cold start {run + 1}: import {import_seconds * 1000:7.1f} ms   first answer {first_seconds * 1000:7.1f} ms")
+
+	os.chdir(HERE)
+	sys.path.insert(0, HERE)
+	import chatbot
+	rng = random.Random(0)
+	messages = [rng.choice(SAMPLE_MESSAGES) for _ in range(args.messages)]
+	chatbot.lemmatize.cache_clear()
+	print(f"throughput (cold lemma cache): {messages_per_second(chatbot, messages):9.0f} messages/s")
+	print(f"throughput (warm lemma cache): {messages_per_second(chatbot, messages):9.0f} messages/s")
+	print(f"lemma cache: {chatbot.lemmatize.cache_info()}")
+	return 0
+
+if __name__ == "__main__":
+	sys.exit(main())
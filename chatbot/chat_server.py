@@ -0,0 +1,121 @@
+#Chat server
+#Serves many conversations from one process with asyncio, instead of one process per input()
+#loop. Every connection is one session speaking line-delimited text over TCP: the server greets,
+#then answers each line with one line, and "exit" ends the session. All sessions share the
+#intents, matcher and semantic index loaded by chatbot.py. Edits to intents.json are picked up
+#while running, recompiling only the intents that changed.
+#
+#   python chat_server.py --port 8765
+#   nc localhost 8765
+#
+#Backpressure: a session's next line is only read once its answer has been written out and the
+#socket has drained, so a client that stops reading stops being served (TCP then pushes back on
+#it) without buffering in the server; at most --max-sessions are served at once and later
+#connections wait to be greeted.
+import argparse
+import asyncio
+import sys
+
+import chatbot
+
+#===== Constants =====#
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_MAX_SESSIONS = 10000
+#longest line read from a client; a longer one ends the session
+MAX_LINE_BYTES = 4096
+#a session that sends nothing for this long is closed
+IDLE_TIMEOUT = 300.0
+#seconds between checks of intents.json for edits
+RELOAD_INTERVAL = 2.0
+GREETING = "Hi there! Type 'exit' to end the conversation."
+FAREWELL = "Goodbye!"
+
+class ChatServer:
+	def __init__(self, max_sessions=DEFAULT_MAX_SESSIONS, idle_timeout=IDLE_TIMEOUT):
+		self.idle_timeout = idle_timeout
+		self._slots = asyncio.Semaphore(max_sessions)
+		self.active_sessions = 0
+		self.total_sessions = 0
+		self.messages = 0
+
+	async def handle(self, reader, writer):
+		#one session, from greeting to "exit", timeout or disconnect
+		async with self._slots:
+			self.active_sessions += 1
+			self.total_sessions += 1
+			try:
+				await self._send(writer, GREETING)
+				while True:
+					try:
+						line = await asyncio.wait_for(reader.readline(), self.idle_timeout)
+					except (asyncio.TimeoutError, ValueError):
+						#idle too long, or a line longer than MAX_LINE_BYTES
+						break
+					if not line:
+						break
+					user_input = line.decode('utf-8', errors='replace').strip()
+					if user_input.lower() == 'exit':
+						await self._send(writer, FAREWELL)
+						break
+					self.messages += 1
+					await self._send(writer, chatbot.chatbot_response(user_input))
+			except ConnectionError:
+				pass
+			finally:
+				self.active_sessions -= 1
+				writer.close()
+				try:
+					await writer.wait_closed()
+				except ConnectionError:
+					pass
+
+	@staticmethod
+	async def _send(writer, text):
+		#one line per answer; waits until the socket can take more
+		writer.write(text.replace('\n', ' ').encode('utf-8') + b'\n')
+		await writer.drain()
+
+async def watch_intents(interval=RELOAD_INTERVAL):
+	#reloads intents.json whenever it is saved; sessions see the new intents from their next line
+	while True:
+		await asyncio.sleep(interval)
+		try:
+			if chatbot.reload_if_changed():
+				print(f"Reloaded {chatbot.INTENTS_PATH}", file=sys.stderr)
+		except (OSError, ValueError) as e:
+			print(f"Error: {chatbot.INTENTS_PATH} not reloaded ({e}), keeping the loaded intents", file=sys.stderr)
+
+async def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, max_sessions=DEFAULT_MAX_SESSIONS, reload_interval=RELOAD_INTERVAL):
+	#NLTK and the semantic index are loaded before the first session, not during it
+	chatbot.load()
+	watcher = asyncio.create_task(watch_intents(reload_interval)) if reload_interval else None
+	server = ChatServer(max_sessions)
+	listener = await asyncio.start_server(server.handle, host, port, limit=MAX_LINE_BYTES, backlog=1024)
+	address = ', '.join(str(sock.getsockname()) for sock in listener.sockets)
+	print(f"Chat server listening on {address} (up to {max_sessions} sessions)", file=sys.stderr)
+	try:
+		async with listener:
+			await listener.serve_forever()
+	finally:
+		if watcher is not None:
+			watcher.cancel()
+		print(f"Served {server.total_sessions} sessions, {server.messages} messages", file=sys.stderr)
+
+# === Command Line === #
+def main(argv=None):
+	parser = argparse.ArgumentParser(description="Serve the chatbot to many clients over TCP, one line per message.")
+	parser.add_argument("--host", default=DEFAULT_HOST)
+	parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+	parser.add_argument("--max-sessions", type=int, default=DEFAULT_MAX_SESSIONS, help="sessions served at once")
+	parser.add_argument("--reload-interval", type=float, default=RELOAD_INTERVAL,
+		help="seconds between checks of intents.json for edits (0: never reload)")
+	args = parser.parse_args(argv)
+	try:
+		asyncio.run(serve(args.host, args.port, args.max_sessions, args.reload_interval))
+	except KeyboardInterrupt:
+		pass
+	return 0
+
+if __name__ == "__main__":
+	sys.exit(main())
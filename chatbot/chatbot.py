@@ -2,31 +2,192 @@
 import json
 import random
 import datetime
-import nltk
-from nltk.stem import WordNetLemmatizer
+import os
+import re
+import sys
+import threading
+from functools import lru_cache
+from intent_matcher import IntentMatcher, NO_MATCH
 
-lemmatizer = WordNetLemmatizer()
 BOT_NAME = "Friday"
+#how many distinct words keep their lemma cached
+LEMMA_CACHE_SIZE = 4096
+#next to this file, wherever the bot is started from (batch_classify.py's workers included)
+INTENTS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'intents.json')
+
+def file_stamp(path):
+	#(modification time, size): changes whenever the file is saved
+	status = os.stat(path)
+	return status.st_mtime_ns, status.st_size
+
 # 1. SETUP
-# load intents data once when scripts starts
+def check_intents(data):
+	#raises ValueError unless data looks like intents.json: {"intents": [{"tag": ..., "patterns":
+	#[...], "responses": [...]}, ...]}, patterns being optional
+	if not isinstance(data, dict) or not isinstance(data.get('intents'), list):
+		raise ValueError('expected an object with an "intents" list')
+	for number, intent in enumerate(data['intents'], 1):
+		if not isinstance(intent, dict) or not isinstance(intent.get('tag'), str):
+			raise ValueError(f"intent {number} has no tag")
+		responses = intent.get('responses')
+		if not isinstance(responses, list) or not responses or not all(isinstance(r, str) for r in responses):
+			raise ValueError(f"intent {intent['tag']!r} needs a list of responses")
+		patterns = intent.get('patterns', [])
+		if not isinstance(patterns, list) or not all(isinstance(p, str) for p in patterns):
+			raise ValueError(f"intent {intent['tag']!r} has patterns that are not a list of strings")
+
+# load intents data once when scripts starts (reload_intents() picks up later edits)
 try:
-	with open('intents.json') as file:
+	with open(INTENTS_PATH) as file:
 		intents = json.load(file)
+	check_intents(intents)
+	intents_stamp = file_stamp(INTENTS_PATH)
 except FileNotFoundError:
-	print("Erro: intents.json not found. Make sure the file is in the same directory.")
+	print(f"Error: {INTENTS_PATH} not found. Make sure the file is in the same directory.", file=sys.stderr)
 	intents = {"intents": []}
+	intents_stamp = None
+except ValueError as e:
+	print(f"Error: {INTENTS_PATH} not loaded ({e}).", file=sys.stderr)
+	intents = {"intents": []}
+	intents_stamp = None
+
+#(intents, matcher, semantic index): the loaded intents.json with every pattern compiled once
+#into a single matcher (see intent_matcher.py) and the TF-IDF index for input no pattern is part
+#of (see semantic_index.py), None until it is first needed. A reload replaces all three with one
+#assignment, so a message read against _loaded once is classified and answered from one version.
+_loaded = (intents, IntentMatcher(intents['intents']), None)
+#held while _loaded is replaced; readers don't need it
+_loaded_lock = threading.Lock()
 
 #Processing the Input
 #def preprocess_input(user_input):
 	#convert input to lowercase and remove leading/trailing spaces
 #	return user_input.lower().strip()
 
+#Plain ASCII input (letters, digits, spaces, ? and !) is split here exactly as nltk.word_tokenize
+#would split it, so most messages never load NLTK's tokenizer
+_SIMPLE_INPUT = re.compile(r"[A-Za-z0-9 \t\r\n?!]*")
+_SIMPLE_TOKEN = re.compile(r"[A-Za-z0-9]+|[?!]")
+#words nltk splits in two ("cannot" -> "can", "not"), with where the split goes
+_SPLIT_WORDS = {'cannot': 3, 'gimme': 3, 'gonna': 3, 'gotta': 3, 'lemme': 3, 'wanna': 3}
+
+#NLTK is slow to import, so it is only loaded the first time a message needs it
+_lemmatizer = None
+
+def get_lemmatizer():
+	global _lemmatizer
+	if _lemmatizer is None:
+		from nltk.stem import WordNetLemmatizer
+		_lemmatizer = WordNetLemmatizer()
+	return _lemmatizer
+
+#NumPy is slow to import too, so the semantic index is built once, the first time it is needed
+def get_semantic_index(loaded=None):
+	#the index of loaded (the current intents by default), built if it isn't yet
+	global _loaded
+	loaded = loaded or _loaded
+	if loaded[2] is not None:
+		return loaded[2]
+	from semantic_index import SemanticIndex
+	with _loaded_lock:
+		if _loaded[0] is loaded[0] and _loaded[2] is not None:
+			return _loaded[2]
+		index = SemanticIndex(loaded[0]['intents'])
+		#kept only if no reload came in between
+		if _loaded[0] is loaded[0]:
+			_loaded = (loaded[0], loaded[1], index)
+	return index
+
+#Reloading the intents
+def reload_intents(path=INTENTS_PATH):
+	#Rereads intents.json in a running process and returns how many intents are new or changed.
+	#The matcher and the semantic index only compile the patterns they haven't seen, and are
+	#left alone when no pattern changed. Both are built aside and published with the intents in
+	#one step, so messages being answered meanwhile keep using the old ones. Raises OSError /
+	#ValueError (keeping the old intents) if the file can't be read or isn't laid out like
+	#intents.json (see check_intents).
+	global intents, intents_stamp
+	stamp = file_stamp(path)
+	with open(path) as file:
+		new_intents = json.load(file)
+	check_intents(new_intents)
+	with _loaded_lock:
+		changed = _reload(new_intents)
+		intents = new_intents
+		intents_stamp = stamp
+	return changed
+
+def _reload(new_intents):
+	#publishes new_intents with their matcher and index; returns how many intents changed
+	global _loaded
+	old_intents, matcher, index = _loaded
+	old_list = old_intents['intents']
+	new_list = new_intents['intents']
+
+	old_keys = {}
+	for intent in old_list:
+		key = json.dumps(intent, sort_keys=True)
+		old_keys[key] = old_keys.get(key, 0) + 1
+	changed = 0
+	for intent in new_list:
+		key = json.dumps(intent, sort_keys=True)
+		if old_keys.get(key):
+			old_keys[key] -= 1
+		else:
+			changed += 1
+
+	#both compile only the patterns, in file order
+	if [intent.get('patterns', []) for intent in old_list] != [intent.get('patterns', []) for intent in new_list]:
+		matcher = matcher.copy()
+		matcher.update(new_list)
+		if index is not None:
+			from semantic_index import SemanticIndex
+			index = SemanticIndex(new_list, index.threshold, previous=index)
+	_loaded = (new_intents, matcher, index)
+	return changed
+
+def reload_if_changed(path=INTENTS_PATH):
+	#reloads intents.json if it was saved since it was last read; True if it was
+	if file_stamp(path) == intents_stamp:
+		return False
+	reload_intents(path)
+	return True
+
+def load():
+	#everything loaded on first use, loaded now
+	get_lemmatizer()
+	get_semantic_index()
+
+def warm_up():
+	#loads NLTK and builds the semantic index on a background thread, e.g. while waiting for
+	#the first message
+	threading.Thread(target=load, daemon=True).start()
+
+def tokenize(user_input):
+	if not _SIMPLE_INPUT.fullmatch(user_input):
+		import nltk
+		return nltk.word_tokenize(user_input)
+	tokens = []
+	for token in _SIMPLE_TOKEN.findall(user_input):
+		split = _SPLIT_WORDS.get(token.lower())
+		if split:
+			tokens.append(token[:split])
+			tokens.append(token[split:])
+		else:
+			tokens.append(token)
+	return tokens
+
+#most words come up again and again, so each one is only lemmatized once
+@lru_cache(maxsize=LEMMA_CACHE_SIZE)
+def lemmatize(word):
+	return get_lemmatizer().lemmatize(word)
+
 def preprocess_input(user_input):
     # 1. Tokenize (split sentence into individual words)
-    tokens = nltk.word_tokenize(user_input)
+    tokens = tokenize(user_input)
     
     # 2. Lemmatize and lowercase each word
-    lemmas = [lemmatizer.lemmatize(word.lower()) for word in tokens]
+    lemmas = [lemmatize(word.lower()) for word in tokens]
     
     # 3. Join them back into a string for matching
     return ' '.join(lemmas)
@@ -45,42 +206,60 @@ def get_current_time():
 	return now.strftime("The current time is %I:%M %p.")
 
 
+#Finding the intent
+def classify(processed_input, loaded=None):
+	#(intent index, confidence). One pass over the user's cleaned input finds the first intent
+	#(in file order) with a pattern inside it, a sure match; failing that, the most similar
+	#pattern is used if it is similar enough. (NO_MATCH, similarity) when neither finds one.
+	#The index is into loaded[0]['intents'], loaded being the current _loaded by default.
+	loaded = loaded or _loaded
+	index = loaded[1].match(processed_input)
+	if index != NO_MATCH:
+		return index, 1.0
+	return get_semantic_index(loaded).match(processed_input)
+
 #Finding the response
-def chatbot_response(user_input):
+def chatbot_reply(user_input):
+	#(tag, response, confidence) for one message; the tag is 'noanswer' for the fallback, whose
+	#confidence is how close the most similar pattern came.
 	processed_input = preprocess_input(user_input)
+	#one version of the intents for the whole answer, even if they are reloaded meanwhile
+	loaded = _loaded
+	intent_list = loaded[0]['intents']
+
+	index, confidence = classify(processed_input, loaded)
+	if index != NO_MATCH:
+		intent = intent_list[index]
+		#Found a match! Pick a random response
+		response = random.choice(intent['responses'])
+
+		#check for name placeholder and format if necessary
+		if "{BOT_NAME}" in response:
+			return intent['tag'], response.format(BOT_NAME=BOT_NAME), confidence
+		#=== time/context logic
+		if intent['tag'] == 'greeting':
+			return intent['tag'], get_time_based_greeting(), confidence
+		elif intent['tag'] == 'time_query':
+			#if user asks for time
+			return intent['tag'], get_current_time(), confidence
+		#Default logic	
+		return intent['tag'], response, confidence
 
-	#Loop through every intent
-	for intent in intents['intents']:
-		#Loop through every pattern within the current intent
-		for pattern in intent.get('patterns', []):
-			#Check if the exact pattern is found inside the user's cleaned input
-			if pattern in processed_input:
-				#Found a match! Pick a random response and stop the function immediately
-				response = random.choice(intent['responses'])
-
-				#check for name placeholder and format if necessary
-				if "{BOT_NAME}" in response:
-					return response.format(BOT_NAME=BOT_NAME)
-				#=== time/context logic
-				if intent['tag'] == 'greeting':
-					return get_time_based_greeting()
-				elif intent['tag'] == 'time_query':
-					#if user asks for time
-					return get_current_time()
-				#Default logic	
-				return response
-				
 
 	# === FALLBACK ===
 	#If the code reaches this point, no match was found.
 	#We find and return a response from the 'fallback' intent.
-	for intent in intents['intents']:
+	for intent in intent_list:
 		if intent['tag'] == 'noanswer':
-			return random.choice(intent['responses'])
-	return "Error: Fallback intent not defined."
+			return 'noanswer', random.choice(intent['responses']), confidence
+	return 'noanswer', "Error: Fallback intent not defined.", confidence
+
+def chatbot_response(user_input):
+	return chatbot_reply(user_input)[1]
 
 #Main chat Loop
 def chat():
+	warm_up()
 	print("Chatbot: Hi there! Type 'exit' to end the conversation.")
 	while True:
 		user_input = input("You: ")
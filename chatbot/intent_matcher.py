@@ -0,0 +1,115 @@
+#Intent matcher
+#All the patterns of intents.json compiled into one Aho-Corasick automaton, so finding which
+#patterns occur in the input takes a single pass over it, however many patterns there are.
+#It matches exactly like the old loop ("pattern in input", substrings included) and, when
+#several intents match, returns the first one in file order.
+from collections import deque
+
+NO_MATCH = -1
+#update() starts the automaton afresh once it holds more patterns no intent uses than ones in use
+STALE_PATTERN_RATIO = 1.0
+
+class IntentMatcher:
+	def __init__(self, intents):
+		#intents is the list under "intents" in intents.json
+		self._reset()
+		self.update(intents)
+
+	def _reset(self):
+		#state 0 is the root; goto[state] maps a character to the next state
+		self.goto = [{}]
+		#fail[state]: the state of the longest proper suffix that is also a prefix of a pattern
+		self.fail = [0]
+		#best[state]: the first intent (file order) with a pattern ending here, NO_MATCH if none
+		self.best = [NO_MATCH]
+		#pattern -> the state it ends in; states in breadth-first order (the root excluded)
+		self.pattern_states = {}
+		self._order = []
+
+	def copy(self):
+		#a matcher with the same automaton that can be updated while this one is still matching
+		other = IntentMatcher.__new__(IntentMatcher)
+		other.goto = [dict(transitions) for transitions in self.goto]
+		other.fail = list(self.fail)
+		other.best = self.best
+		other.pattern_states = dict(self.pattern_states)
+		other._order = list(self._order)
+		other.pattern_count = self.pattern_count
+		return other
+
+	def update(self, intents):
+		#Recompiles for a new version of the intents. Patterns already in the automaton are kept,
+		#so only the patterns of new or changed intents are added (then the fail links redone);
+		#an intent that only moved or changed its responses costs no more than one pass over the states.
+		first_intent = {}
+		self.pattern_count = 0
+		for index, intent in enumerate(intents):
+			for pattern in intent.get('patterns', []):
+				first_intent.setdefault(pattern, index)
+				self.pattern_count += 1
+
+		if len(self.pattern_states) - len(first_intent) > STALE_PATTERN_RATIO * len(first_intent):
+			self._reset()
+		new_patterns = [pattern for pattern in first_intent if pattern not in self.pattern_states]
+		for pattern in new_patterns:
+			self.pattern_states[pattern] = self._add(pattern)
+		if new_patterns:
+			self._link()
+
+		#best of the state a pattern ends in, then, breadth first, of the states it is a suffix of
+		best = [NO_MATCH] * len(self.goto)
+		for pattern, state in self.pattern_states.items():
+			best[state] = first_intent.get(pattern, NO_MATCH)
+		fail = self.fail
+		for state in self._order:
+			fail_best = best[fail[state]]
+			if fail_best != NO_MATCH and (best[state] == NO_MATCH or fail_best < best[state]):
+				best[state] = fail_best
+		self.best = best
+
+	def _add(self, pattern):
+		#the state the pattern ends in, adding the states it needs
+		state = 0
+		for char in pattern:
+			next_state = self.goto[state].get(char)
+			if next_state is None:
+				next_state = len(self.goto)
+				self.goto[state][char] = next_state
+				self.goto.append({})
+				self.fail.append(0)
+			state = next_state
+		return state
+
+	def _link(self):
+		#breadth first, so a state's fail target is always finished before the state itself
+		order = []
+		queue = deque(self.goto[0].values())
+		while queue:
+			state = queue.popleft()
+			order.append(state)
+			for char, next_state in self.goto[state].items():
+				fallback = self.fail[state]
+				while fallback and char not in self.goto[fallback]:
+					fallback = self.fail[fallback]
+				self.fail[next_state] = self.goto[fallback].get(char, 0)
+				queue.append(next_state)
+		self._order = order
+
+	def match(self, text):
+		#index of the first intent (file order) with a pattern inside text, or NO_MATCH
+		goto = self.goto
+		fail = self.fail
+		best = self.best
+		#an empty pattern matches every input
+		found = best[0]
+		state = 0
+		for char in text:
+			while state and char not in goto[state]:
+				state = fail[state]
+			state = goto[state].get(char, 0)
+			index = best[state]
+			if index != NO_MATCH and (found == NO_MATCH or index < found):
+				found = index
+				if found == 0:
+					break
+		return found
@@ -0,0 +1,80 @@
+#Load test for chat_server.py
+#Opens many sessions at once, each sending messages one at a time and waiting for the answer,
+#and reports the latency of every answer (p50/p99) and the overall message rate.
+#
+#   python chat_server.py &
+#   python load_test.py --sessions 2000 --messages 20
+import argparse
+import asyncio
+import math
+import random
+import sys
+import time
+
+from benchmark import SAMPLE_MESSAGES
+
+#===== Constants =====#
+#chat_server.py's defaults; not imported from it, which would load the bot into the client
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+def percentile(sorted_values, fraction):
+	#nearest-rank percentile of an already sorted list
+	if not sorted_values:
+		return 0.0
+	rank = max(1, math.ceil(fraction * len(sorted_values)))
+	return sorted_values[rank - 1]
+
+async def run_session(host, port, messages, latencies, rng):
+	reader, writer = await asyncio.open_connection(host, port)
+	try:
+		#the greeting
+		await reader.readline()
+		for _ in range(messages):
+			start = time.perf_counter()
+			writer.write(rng.choice(SAMPLE_MESSAGES).encode('utf-8') + b'\n')
+			await writer.drain()
+			if not await reader.readline():
+				raise ConnectionError("server closed the session")
+			latencies.append(time.perf_counter() - start)
+		writer.write(b'exit\n')
+		await writer.drain()
+		await reader.readline()
+	finally:
+		writer.close()
+		await writer.wait_closed()
+
+async def run_load(host, port, sessions, messages, seed=0):
+	#(latencies in seconds, failed sessions, wall-clock seconds)
+	latencies = []
+	rng = random.Random(seed)
+	start = time.perf_counter()
+	results = await asyncio.gather(
+		*(run_session(host, port, messages, latencies, random.Random(rng.random())) for _ in range(sessions)),
+		return_exceptions=True,
+	)
+	elapsed = time.perf_counter() - start
+	failures = [result for result in results if isinstance(result, Exception)]
+	return latencies, failures, elapsed
+
+# === Command Line === #
+def main(argv=None):
+	parser = argparse.ArgumentParser(description="Load test for the chat server")
+	parser.add_argument("--host", default=DEFAULT_HOST)
+	parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+	parser.add_argument("--sessions", type=int, default=1000, help="concurrent sessions")
+	parser.add_argument("--messages", type=int, default=20, help="messages per session")
+	args = parser.parse_args(argv)
+
+	latencies, failures, elapsed = asyncio.run(run_load(args.host, args.port, args.sessions, args.messages))
+	latencies.sort()
+	print(f"{args.sessions} sessions, {len(latencies)} messages in {elapsed:.2f}s "
+		f"({len(latencies) / elapsed:.0f} messages/s), {len(failures)} failed sessions")
+	if failures:
+		print(f"first failure: {failures[0]!r}")
+	print(f"latency p50 {percentile(latencies, 0.50) * 1000:.2f} ms   "
+		f"p99 {percentile(latencies, 0.99) * 1000:.2f} ms   max {(latencies[-1] if latencies else 0) * 1000:.2f} ms")
+	return 1 if failures else 0
+
+if __name__ == "__main__":
+	sys.exit(main())
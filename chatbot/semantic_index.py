@@ -0,0 +1,124 @@
+#Semantic index
+#A TF-IDF matrix over every pattern of intents.json, built once with NumPy, for input where no
+#pattern is a substring. Features are the words of a pattern plus the character trigrams of each
+#word, so "helo" or "thank u" still land near "hello" and "thank you". Scoring an input against
+#every pattern is one sparse matrix-vector product (no loop over the patterns) giving the cosine
+#similarity, which is the match's confidence.
+import math
+import re
+
+import numpy as np
+
+from intent_matcher import NO_MATCH
+
+#===== Constants =====#
+#below this cosine similarity an input counts as unmatched
+DEFAULT_THRESHOLD = 0.45
+_WORD = re.compile(r"\w+")
+
+def features(text):
+	#words of the text and the trigrams of each word, e.g. "#he", "hel", ..., "lo#"
+	found = []
+	for word in _WORD.findall(text.lower()):
+		found.append(word)
+		marked = '#' + word + '#'
+		found.extend(marked[i:i + 3] for i in range(len(marked) - 2))
+	return found
+
+def count_features(text):
+	#feature -> how often it occurs in text
+	counts = {}
+	for feature in features(text):
+		counts[feature] = counts.get(feature, 0) + 1
+	return counts
+
+class SemanticIndex:
+	def __init__(self, intents, threshold=DEFAULT_THRESHOLD, previous=None):
+		#intents is the list under "intents" in intents.json. previous is the index of an earlier
+		#version of them: the features of patterns it already had are reused, so a reload only
+		#extracts those of new or changed intents before the (NumPy) rebuild of the matrix.
+		self.threshold = threshold
+		known = previous.pattern_features if previous is not None else {}
+		#pattern -> its feature counts; pattern_intent[row] is the intent of each pattern (row)
+		self.pattern_features = {}
+		pattern_intent = []
+		row_counts = []
+		for index, intent in enumerate(intents):
+			for pattern in intent.get('patterns', []):
+				counts = self.pattern_features.get(pattern)
+				if counts is None:
+					counts = known.get(pattern)
+					if counts is None:
+						counts = count_features(pattern)
+					self.pattern_features[pattern] = counts
+				if counts:
+					pattern_intent.append(index)
+					row_counts.append(counts)
+		self.pattern_intent = np.array(pattern_intent, dtype=np.int64)
+
+		#feature -> column, and the matrix entries as flat (row, column, count) arrays
+		self.vocabulary = {}
+		vocabulary = self.vocabulary
+		columns, rows, weights = [], [], []
+		for row_index, counts in enumerate(row_counts):
+			for feature, count in counts.items():
+				columns.append(vocabulary.setdefault(feature, len(vocabulary)))
+				rows.append(row_index)
+				weights.append(count)
+		columns = np.array(columns, dtype=np.int64)
+		rows = np.array(rows, dtype=np.int64)
+		weights = np.array(weights, dtype=np.float64)
+
+		#idf as scikit-learn smooths it; a feature no pattern has gets the largest possible weight
+		patterns = len(row_counts)
+		document_frequency = np.bincount(columns, minlength=len(vocabulary))
+		self.idf = np.log((1 + patterns) / (1 + document_frequency)) + 1
+		self.unknown_idf = math.log(1 + patterns) + 1
+		#TF-IDF weights, each row scaled to unit length
+		weights *= self.idf[columns]
+		weights /= np.sqrt(np.bincount(rows, weights=weights * weights, minlength=patterns))[rows]
+
+		#the matrix is stored by column (CSC): the rows of column c and their weights are
+		#rows[offsets[c]:offsets[c + 1]] and weights[offsets[c]:offsets[c + 1]]
+		order = np.argsort(columns, kind='stable')
+		self.rows = rows[order]
+		self.weights = weights[order]
+		self.offsets = np.zeros(len(vocabulary) + 1, dtype=np.int64)
+		np.cumsum(document_frequency, out=self.offsets[1:])
+
+	def scores(self, text):
+		#cosine similarity of text with every pattern, as an array in pattern order
+		query = {}
+		unknown = {}
+		for feature in features(text):
+			column = self.vocabulary.get(feature)
+			if column is None:
+				unknown[feature] = unknown.get(feature, 0) + 1
+			else:
+				query[column] = query.get(column, 0) + 1
+		if not query:
+			return np.zeros(len(self.pattern_intent))
+		columns = np.fromiter(query, dtype=np.int64, count=len(query))
+		query_weights = np.fromiter(query.values(), dtype=np.float64, count=len(query)) * self.idf[columns]
+		#features no pattern uses still count in the input's length, making it less like all of them
+		unknown_squares = sum(count * count for count in unknown.values()) * self.unknown_idf ** 2
+		norm = math.sqrt(float(query_weights @ query_weights) + unknown_squares)
+
+		starts, ends = self.offsets[columns], self.offsets[columns + 1]
+		lengths = ends - starts
+		#positions of every stored entry of the query's columns, in one gather
+		positions = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+		products = self.weights[positions] * np.repeat(query_weights / norm, lengths)
+		return np.bincount(self.rows[positions], weights=products, minlength=len(self.pattern_intent))
+
+	def match(self, text):
+		#(intent index, confidence) of the most similar pattern, (NO_MATCH, best score) below the
+		#threshold; on a tie the first pattern in file order wins
+		scores = self.scores(text)
+		if not len(scores):
+			return NO_MATCH, 0.0
+		best = int(np.argmax(scores))
+		confidence = float(scores[best])
+		if confidence < self.threshold:
+			return NO_MATCH, confidence
+		return int(self.pattern_intent[best]), confidence
@@ -0,0 +1,6 @@
+import os
+import sys
+
+#the chatbot modules import each other by name, as when they are run from this folder
+CHATBOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, CHATBOT_DIR)
@@ -0,0 +1,106 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+import batch_classify
+import chatbot
+
+CHATBOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SHIPPED_INTENTS = os.path.join(CHATBOT_DIR, "intents.json")
+
+GREETING = {"tag": "greeting", "patterns": ["hello"], "responses": ["Hi!"]}
+FAREWELL = {"tag": "goodbye", "patterns": ["bye"], "responses": ["Bye!"]}
+
+
+def write_intents(path, data):
+	path.write_text(json.dumps(data) if not isinstance(data, str) else data)
+	#a new modification time even on file systems with coarse timestamps
+	stamp = os.stat(path).st_mtime_ns
+	os.utime(path, ns=(stamp + 1_000_000_000, stamp + 1_000_000_000))
+	return str(path)
+
+
+@pytest.fixture
+def intents_file(tmp_path):
+	path = write_intents(tmp_path / "intents.json", {"intents": [GREETING]})
+	chatbot.reload_intents(path)
+	yield tmp_path / "intents.json"
+	chatbot.reload_intents(SHIPPED_INTENTS)
+
+
+@pytest.mark.parametrize("data", [
+	{"patterns": ["hello"]},
+	{"intents": {"tag": "greeting"}},
+	{"intents": ["hello"]},
+	{"intents": [{"patterns": ["hello"], "responses": ["Hi!"]}]},
+	{"intents": [{"tag": "greeting", "patterns": ["hello"]}]},
+	{"intents": [{"tag": "greeting", "patterns": "hello", "responses": ["Hi!"]}]},
+	[GREETING],
+])
+def test_reload_rejects_bad_schema_and_keeps_intents(intents_file, data):
+	before = chatbot.intents
+	write_intents(intents_file, data)
+	with pytest.raises(ValueError):
+		chatbot.reload_intents(str(intents_file))
+	assert chatbot.intents is before
+	assert chatbot.classify("hello") == (0, 1.0)
+
+
+def test_reload_rejects_broken_json_and_keeps_intents(intents_file):
+	before = chatbot.intents
+	write_intents(intents_file, '{"intents": [')
+	with pytest.raises(ValueError):
+		chatbot.reload_if_changed(str(intents_file))
+	assert chatbot.intents is before
+
+
+def test_reload_picks_up_edits(intents_file):
+	path = str(intents_file)
+	assert chatbot.reload_if_changed(path) is False
+	write_intents(intents_file, {"intents": [FAREWELL, GREETING]})
+	assert chatbot.reload_if_changed(path) is True
+	assert chatbot.classify("bye") == (0, 1.0)
+	assert chatbot.classify("hello") == (1, 1.0)
+	assert chatbot.reload_if_changed(path) is False
+
+
+def test_reload_counts_changed_intents(intents_file):
+	write_intents(intents_file, {"intents": [GREETING, FAREWELL]})
+	assert chatbot.reload_intents(str(intents_file)) == 1
+
+
+def test_intents_found_from_any_directory(tmp_path):
+	environment = dict(os.environ, PYTHONPATH=os.pathsep.join([CHATBOT_DIR] + sys.path))
+	result = subprocess.run(
+		[sys.executable, "-c", "import chatbot; print(len(chatbot.intents['intents']))"],
+		cwd=tmp_path, env=environment, capture_output=True, text=True, check=True,
+	)
+	assert chatbot.INTENTS_PATH == SHIPPED_INTENTS
+	assert int(result.stdout) > 0
+	assert result.stderr == ""
+
+
+def test_batch_chunk_survives_bad_intents(intents_file, monkeypatch, capsys):
+	chatbot.reload_intents(write_intents(intents_file, {"intents": [FAREWELL]}))
+	write_intents(intents_file, {"intents": {"tag": "goodbye"}})
+	#the WordNet corpus may not be installed; "bye" is its own lemma anyway
+	monkeypatch.setattr(chatbot, "lemmatize", lambda word: word)
+	reload_if_changed = chatbot.reload_if_changed
+	monkeypatch.setattr(chatbot, "reload_if_changed", lambda: reload_if_changed(str(intents_file)))
+	rows = batch_classify._classify_chunk([(1, "bye")])
+	assert [row[:4] for row in rows] == [(1, "bye", "goodbye", "Bye!")]
+	assert "not reloaded" in capsys.readouterr().err
+
+
+def test_reload_leaves_earlier_snapshot_intact(intents_file):
+	chatbot.reload_intents(write_intents(intents_file, {"intents": [GREETING, FAREWELL]}))
+	loaded = chatbot._loaded
+	chatbot.reload_intents(write_intents(intents_file, {"intents": [FAREWELL, GREETING]}))
+	#a message classified against the old version is answered from the old version
+	assert chatbot.classify("bye", loaded) == (1, 1.0)
+	assert loaded[0]["intents"][1]["tag"] == "goodbye"
+	assert chatbot.classify("bye") == (0, 1.0)
+	assert chatbot._loaded[0] is chatbot.intents